@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for WhoAteMyRAM hot paths
+(synthetic /proc trees and a stub Ollama server, results as JSON)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import py_compile
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import wamr
+from wamr import MemoryAnalyzer, OllamaClient, StreamingJSONParser, print_analysis
+
+# Canned model output used by the stub server
+STUB_ANALYSIS = {
+    "summary": "Memory use is dominated by a few large worker pools; nothing critical.",
+    "high_priority": [
+        {
+            "process": f"worker-{i}",
+            "pid": 1000 + i,
+            "memory_mb": 512.0 + i,
+            "reason": "Resident set has grown well beyond its peers",
+            "action": "Restart the worker during the next maintenance window",
+            "command": f"kill -HUP {1000 + i}"
+        }
+        for i in range(3)
+    ],
+    "medium_priority": [
+        {
+            "process": "postgres",
+            "pid": 2001,
+            "memory_mb": 900.0,
+            "reason": "Shared buffers sized for a larger host",
+            "action": "Lower shared_buffers"
+        }
+    ],
+    "safe_to_ignore": [
+        {"process": f"svc-{i}", "pid": 3000 + i, "memory_mb": 20.0 + i, "reason": "Normal footprint"}
+        for i in range(8)
+    ],
+    "total_reclaimable_mb": 2048.0
+}
+
+USERS = ['root', 'postgres', 'www-data', 'nobody']
+NAMES = ['chrome', 'postgres', 'gunicorn', 'node', 'java', 'redis-server', 'nginx', 'python3']
+
+
+def make_proc_tree(root: str, count: int, seed: int = 0):
+    """Write a synthetic /proc with count processes under root"""
+    rng = random.Random(seed)
+    with open(os.path.join(root, 'meminfo'), 'w') as f:
+        f.write("MemTotal:       65536000 kB\nMemFree:         1024000 kB\n"
+                "MemAvailable:   16384000 kB\nBuffers:          204800 kB\nCached:          8192000 kB\n")
+    
+    parents = [1]
+    for pid in range(1, count + 1):
+        name = NAMES[pid % len(NAMES)]
+        ppid = 0 if pid == 1 else rng.choice(parents[-50:])
+        rss_pages = 0 if pid % 20 == 0 else rng.randint(100, 500000)  # Some kernel threads
+        uid = pid % len(USERS)
+        directory = os.path.join(root, str(pid))
+        os.mkdir(directory)
+        with open(os.path.join(directory, 'statm'), 'w') as f:
+            f.write(f"{rss_pages * 2} {rss_pages} 100 10 0 {rss_pages} 0\n")
+        with open(os.path.join(directory, 'stat'), 'w') as f:
+            fields = ['S', str(ppid)] + ['0'] * 17 + [str(pid * 7)] + ['0', str(rss_pages)] + ['0'] * 28
+            f.write(f"{pid} ({name}) {' '.join(fields)}\n")
+        with open(os.path.join(directory, 'status'), 'w') as f:
+            f.write(f"Name:\t{name}\nUmask:\t0022\nState:\tS (sleeping)\nTgid:\t{pid}\nPid:\t{pid}\n"
+                    f"PPid:\t{ppid}\nUid:\t{uid}\t{uid}\t{uid}\t{uid}\n")
+        with open(os.path.join(directory, 'cmdline'), 'wb') as f:
+            if rss_pages:
+                f.write(f"/usr/bin/{name}\0--worker\0{pid}\0".encode())
+        with open(os.path.join(directory, 'smaps_rollup'), 'w') as f:
+            kb = rss_pages * 4
+            f.write(f"Rss: {kb} kB\nPss: {kb // 2} kB\nPrivate_Clean: {kb // 8} kB\n"
+                    f"Private_Dirty: {kb // 4} kB\nSwap: 0 kB\n")
+        if rss_pages:
+            parents.append(pid)
+
+
+class StubOllama:
+    """Local /api/generate stand-in with configurable latency and token rate"""
+    
+    def __init__(self, latency: float = 0.05, tokens_per_second: float = 2000.0,
+                 response: dict = STUB_ANALYSIS):
+        text = json.dumps(response)
+        # Roughly 4 characters per token
+        self.tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Like Ollama (Go sets TCP_NODELAY): otherwise the headers and body
+            # writes wait on delayed ACKs and every reused connection costs 40 ms
+            disable_nagle_algorithm = True
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests += 1
+                if not body.get('prompt'):
+                    self._send_json({'response': '', 'done': True})  # Warm-up
+                    return
+                time.sleep(stub.latency)
+                delay = 1.0 / stub.tokens_per_second
+                # Like Ollama, only tokens after a passed-in context are evaluated
+                prompt_tokens = len(body['prompt']) // 4
+                stats = {'done': True, 'load_duration': 0, 'prompt_eval_count': prompt_tokens,
+                         'prompt_eval_duration': int(stub.latency * 1e9), 'eval_count': len(stub.tokens),
+                         'eval_duration': int(delay * len(stub.tokens) * 1e9),
+                         'context': body.get('context', []) + [0] * (prompt_tokens + len(stub.tokens))}
+                if body.get('stream'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/x-ndjson')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for token in stub.tokens:
+                        time.sleep(delay)
+                        self._chunk({'response': token, 'done': False})
+                    self._chunk({'response': '', **stats})
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    time.sleep(delay * len(stub.tokens))
+                    self._send_json({'response': ''.join(stub.tokens), **stats})
+            
+            def _chunk(self, data: dict):
+                line = json.dumps(data).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            
+            def _send_json(self, data: dict):
+                payload = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def timed(fn, runs: int) -> dict:
+    """Best and mean wall time of fn over runs, in ms"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'best_ms': round(min(times), 3), 'mean_ms': round(sum(times) / len(times), 3), 'runs': runs}
+
+
+def bench_backends(top_n: int = 20, runs: int = 10) -> list:
+    """Compare the /proc scanner against the ps fallback on this machine"""
+    results = []
+    for backend in ('proc', 'ps'):
+        result = timed(lambda: MemoryAnalyzer(backend=backend).get_processes(top_n=top_n), runs)
+        results.append({'name': f'get_processes[{backend}]', 'size': 'live', **result})
+    return results
+
+
+def bench_collection(size: int, runs: int) -> list:
+    """Collection stages against a synthetic /proc with size processes"""
+    root = tempfile.mkdtemp(prefix='wamr-bench-proc-')
+    try:
+        make_proc_tree(root, size)
+        analyzer = MemoryAnalyzer(proc_root=root, backend='proc')
+        pss = MemoryAnalyzer(proc_root=root, backend='proc', accounting='pss')
+        return [
+            {'name': 'get_system_memory', 'size': size, **timed(analyzer.get_system_memory, runs)},
+            {'name': 'get_processes', 'size': size, **timed(analyzer.get_processes, runs)},
+            {'name': 'get_processes[pss]', 'size': size, **timed(pss.get_processes, runs)},
+            {'name': 'get_applications', 'size': size, **timed(analyzer.get_applications, runs)},
+            {'name': 'build_prompt', 'size': size,
+             **timed(lambda: analyzer.build_prompt(analyzer.get_system_memory(), analyzer.processes, []), runs)},
+        ] + bench_process_table(analyzer, size, runs)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_process_table(analyzer: MemoryAnalyzer, size: int, runs: int) -> list:
+    """Memory held by a full scan as a ProcessTable versus ProcessInfo objects, and top-N over it"""
+    import tracemalloc
+    
+    def allocated(build):
+        tracemalloc.start()
+        try:
+            kept = build()
+            return tracemalloc.get_traced_memory()[0], kept
+        finally:
+            tracemalloc.stop()
+    
+    table_bytes, table = allocated(analyzer._scan_proc_tree)
+    # Fresh name strings per row, as decoding each /proc entry produces
+    objects_bytes, _ = allocated(lambda: [wamr.ProcessInfo(pid=p.pid, name=''.join(p.name), user=p.user,
+                                                           rss_mb=p.rss_mb, cmd=p.cmd) for p in table])
+    memory = {'table_kb': round(table_bytes / 1024, 1), 'objects_kb': round(objects_bytes / 1024, 1)}
+    return [
+        {'name': 'process_table[memory]', 'size': size, **memory},
+        {'name': 'process_table[top]', 'size': size, **timed(lambda: table.top(20), runs)},
+        {'name': 'process_table[group_by]', 'size': size, **timed(table.group_by, runs)},
+    ]
+
+
+def bench_llm(latency: float, tokens_per_second: float, runs: int) -> list:
+    """Request, parsing and rendering stages against the stub server"""
+    results = []
+    text = json.dumps(STUB_ANALYSIS)
+    mem_data = {'total_mb': 65536.0, 'used_mb': 49152.0, 'free_mb': 16384.0, 'used_percent': 75.0}
+    
+    def parse_stream():
+        parser = StreamingJSONParser()
+        for i in range(0, len(text), 4):
+            parser.feed(text[i:i + 4])
+    
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_analysis(STUB_ANALYSIS, mem_data)
+    
+    results.append({'name': 'parse_json', 'size': len(text), **timed(lambda: json.loads(text), runs * 10)})
+    results.append({'name': 'parse_stream', 'size': len(text), **timed(parse_stream, runs * 10)})
+    results.append({'name': 'render', 'size': len(text), **timed(render, runs * 10)})
+    
+    with StubOllama(latency, tokens_per_second) as stub:
+        analyzer = MemoryAnalyzer()
+        analyzer.client = OllamaClient(url=stub.url)
+        mem_data, processes = analyzer.sample()
+        
+        def blocking():
+            analyzer.analyze_with_llm(mem_data=mem_data, processes=processes)
+        
+        first_event = []
+        
+        def streaming():
+            started = time.perf_counter()
+            seen = []
+            
+            def on_event(key, value):
+                if not seen:
+                    seen.append(key)
+                    first_event.append((time.perf_counter() - started) * 1000)
+            analyzer.analyze_with_llm(mem_data=mem_data, processes=processes, on_event=on_event)
+        
+        size = f"{latency * 1000:g}ms+{tokens_per_second:g}tok/s"
+        results.append({'name': 'llm_blocking', 'size': size, **timed(blocking, runs)})
+        results.append({'name': 'llm_stream', 'size': size, **timed(streaming, runs)})
+        if first_event:
+            results.append({'name': 'llm_stream_first_output', 'size': size,
+                            'best_ms': round(min(first_event), 3),
+                            'mean_ms': round(sum(first_event) / len(first_event), 3),
+                            'runs': len(first_event)})
+        
+        # Incremental mode: a full prompt, then deltas with one process grown
+        analyzer.incremental = True
+        analyzer.use_signatures = False
+        analyzer.analyze_with_llm(mem_data=mem_data, processes=processes)
+        full_tokens = analyzer.profiler.counters.get('prompt_eval_count', 0)
+        
+        def delta():
+            processes[0].rss_mb += 100
+            analyzer.analyze_with_llm(mem_data=mem_data, processes=processes)
+        
+        results.append({'name': 'llm_incremental', 'size': size, **timed(delta, runs),
+                        'prompt_tokens': analyzer.profiler.counters.get('prompt_eval_count', 0),
+                        'full_prompt_tokens': full_tokens})
+    return results
+
+
+# Runs wamr the way the installed launcher does (module import, cached bytecode)
+LAUNCHER = 'import sys, wamr; sys.argv[0] = "wamr"; wamr.main()'
+
+
+def bench_startup(runs: int) -> list:
+    """Wall time of whole wamr invocations, against a bare interpreter
+    
+    LLM mode talks to an instant stub, so only wamr's own overhead is timed.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    # Like install.sh: with PYTHONDONTWRITEBYTECODE set, every run would recompile wamr
+    py_compile.compile(os.path.join(here, 'wamr.py'))
+    
+    def run(args):
+        subprocess.run([sys.executable, '-c', LAUNCHER] + args, cwd=here, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    results = [{'name': 'startup[python]', 'size': 'cli',
+                **timed(lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True), runs)}]
+    for mode in ('--no-llm', '--demo'):
+        results.append({'name': f'startup[{mode}]', 'size': 'cli', **timed(lambda: run([mode]), runs)})
+    with StubOllama(0.0, float('inf')) as stub:
+        results.append({'name': 'startup[llm]', 'size': 'instant model', **timed(
+            lambda: run(['--ollama-url', stub.url, '--no-cache', '--no-warmup']), runs)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhoAteMyRAM benchmarks')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='Synthetic /proc sizes, comma separated (default: 1000,10000,100000)')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per benchmark (default: 5)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub model latency in seconds (default: 0.05)')
+    parser.add_argument('--token-rate', type=float, default=2000.0,
+                        help='Stub model tokens per second (default: 2000)')
+    parser.add_argument('--backends', action='store_true', help='Only compare the proc and ps backends')
+    parser.add_argument('--startup', action='store_true', help='Only time whole wamr invocations')
+    parser.add_argument('-o', '--output', help='Write JSON results here instead of stdout')
+    args = parser.parse_args()
+    
+    if args.startup:
+        results = bench_startup(args.runs * 4)
+    else:
+        results = bench_backends(runs=args.runs)
+    if not args.backends and not args.startup:
+        for size in (int(s) for s in args.sizes.split(',') if s):
+            results.extend(bench_collection(size, args.runs))
+        results.extend(bench_llm(args.latency, args.token_rate, args.runs))
+        results.extend(bench_startup(args.runs * 4))
+    
+    report = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'prompt_version': wamr.PROMPT_VERSION,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
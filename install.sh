@@ -13,6 +13,7 @@ NC='\033[0m' # No Color
 
 # Configuration
 INSTALL_DIR="/usr/local/bin"
+LIB_DIR="/usr/local/lib/wamr"
 SCRIPT_NAME="wamr"
 
 echo -e "${GREEN}╔════════════════════════════════════════╗${NC}"
@@ -76,33 +77,25 @@ else
     fi
 fi
 
-# Install Python dependencies
-echo ""
-echo "Installing Python dependencies..."
-if python3 -m pip install --user requests &> /dev/null; then
-    echo -e "${GREEN}✓${NC} Python dependencies installed"
-else
-    echo -e "${YELLOW}⚠${NC} Could not install requests library"
-    echo "Install manually with: pip install requests"
-fi
-
-# Install the script
+# Install the module with precompiled bytecode, plus a small launcher:
+# a script run directly is recompiled from source on every start
 echo ""
 echo "Installing wamr to $INSTALL_DIR..."
 
-if [ -w "$INSTALL_DIR" ]; then
-    # Can write directly
-    cp wamr.py "$INSTALL_DIR/$SCRIPT_NAME"
-    chmod +x "$INSTALL_DIR/$SCRIPT_NAME"
-    echo -e "${GREEN}✓${NC} Installed to $INSTALL_DIR/$SCRIPT_NAME"
-else
-    # Need sudo
+SUDO=""
+if [ ! -w "$INSTALL_DIR" ] || ! mkdir -p "$LIB_DIR" 2> /dev/null; then
     echo "Need sudo privileges to install to $INSTALL_DIR"
-    sudo cp wamr.py "$INSTALL_DIR/$SCRIPT_NAME"
-    sudo chmod +x "$INSTALL_DIR/$SCRIPT_NAME"
-    echo -e "${GREEN}✓${NC} Installed to $INSTALL_DIR/$SCRIPT_NAME"
+    SUDO="sudo"
 fi
 
+$SUDO mkdir -p "$LIB_DIR"
+$SUDO cp wamr.py demo.py "$LIB_DIR/"
+$SUDO python3 -m compileall -q "$LIB_DIR"
+printf '#!/usr/bin/env python3\nimport sys\nsys.path.insert(0, "%s")\nfrom wamr import main\nmain()\n' "$LIB_DIR" \
+    | $SUDO tee "$INSTALL_DIR/$SCRIPT_NAME" > /dev/null
+$SUDO chmod +x "$INSTALL_DIR/$SCRIPT_NAME"
+echo -e "${GREEN}✓${NC} Installed to $INSTALL_DIR/$SCRIPT_NAME"
+
 echo ""
 echo -e "${GREEN}╔════════════════════════════════════════╗${NC}"
 echo -e "${GREEN}║     Installation Complete! 🎉          ║${NC}"
@@ -0,0 +1,90 @@
+"""Shared fixtures for wamr's tests
+
+Run from the repository root with: python3 -m pytest -q
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_proc(tmp_path):
+    """Build a small /proc under tmp_path
+
+    Takes (pid, ppid, name, rss_kb, pss_kb) tuples; processes with a
+    pss_kb of None have no smaps_rollup. Returns the root's path.
+    """
+    def build(processes):
+        root = tmp_path / 'proc'
+        root.mkdir()
+        (root / 'meminfo').write_text("MemTotal:        8192000 kB\nMemFree:         1024000 kB\n"
+                                      "MemAvailable:    4096000 kB\n")
+        for pid, ppid, name, rss_kb, pss_kb in processes:
+            directory = root / str(pid)
+            directory.mkdir()
+            pages = rss_kb * 1024 // os.sysconf('SC_PAGE_SIZE')
+            (directory / 'statm').write_text(f"{pages * 2} {pages} 100 10 0 {pages} 0\n")
+            fields = ['S', str(ppid)] + ['0'] * 17 + [str(pid * 7)] + ['0', str(pages)] + ['0'] * 28
+            (directory / 'stat').write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+            (directory / 'status').write_text(f"Name:\t{name}\nPid:\t{pid}\nPPid:\t{ppid}\nUid:\t0\t0\t0\t0\n")
+            (directory / 'cmdline').write_bytes(f"/usr/bin/{name}\0--serve\0".encode())
+            if pss_kb is not None:
+                (directory / 'smaps_rollup').write_text(
+                    f"Rss:  {rss_kb} kB\nPss:  {pss_kb} kB\nPrivate_Clean:  0 kB\n"
+                    f"Private_Dirty:  {pss_kb // 2} kB\nSwap:  0 kB\n")
+        return str(root)
+    return build
+
+
+class FakeResponse:
+    """What FakeOllama.generate() returns, shaped like OllamaResponse"""
+
+    def __init__(self, text: str, context):
+        self.status_code = 200
+        self.text = text
+        self.context = context
+
+    def json(self):
+        return {'response': self.text, 'done': True, 'context': self.context}
+
+    def iter_lines(self):
+        for i in range(0, len(self.text), 4):
+            yield json.dumps({'response': self.text[i:i + 4], 'done': False}).encode()
+        yield json.dumps({'response': '', 'done': True, 'context': self.context}).encode()
+
+
+class FakeOllama:
+    """Stands in for OllamaClient, answering each request with the next canned answer
+
+    Answers are dicts (sent as JSON) or raw text; every payload is kept.
+    """
+    url = 'http://ollama.invalid'
+    keep_alive = '10m'
+    last_connect_s = 0.0
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.payloads = []
+
+    def generate(self, payload, stream=False, timeout=60):
+        self.payloads.append(payload)
+        answer = self.answers.pop(0)
+        text = answer if isinstance(answer, str) else json.dumps(answer)
+        return FakeResponse(text, [len(self.payloads)])
+
+    def warm_up(self, model, timeout=60):
+        return True
+
+    def cancel(self):
+        pass
+
+
+@pytest.fixture
+def fake_ollama():
+    """Build a FakeOllama from its answers"""
+    return lambda *answers: FakeOllama(answers)
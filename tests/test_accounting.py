@@ -0,0 +1,45 @@
+"""PSS/USS accounting from smaps_rollup"""
+
+import wamr
+
+
+def test_read_smaps_rollup(tmp_path):
+    path = tmp_path / 'smaps_rollup'
+    path.write_bytes(b"""\
+55d0c0a00000-7ffd1c411000 ---p 00000000 00:00 0                          [rollup]
+Rss:               10240 kB
+Pss:                5120 kB
+Shared_Clean:       4096 kB
+Private_Clean:      1024 kB
+Private_Dirty:      2048 kB
+Private_Hugetlb:    2048 kB
+Swap:                512 kB
+SwapPss:             512 kB
+""")
+    assert wamr.read_smaps_rollup(str(path)) == (5.0, 3.0, 0.5)
+    assert wamr.read_smaps_rollup(str(tmp_path / 'gone')) is None
+
+
+def test_pss_accounting_ranks_by_pss(fake_proc):
+    root = fake_proc([
+        (1, 0, 'init', 4096, 2048),
+        (10, 1, 'postgres', 800000, 200000),   # Mostly shared buffers
+        (20, 1, 'java', 600000, 580000),
+        (30, 1, 'agent', 300000, None),        # smaps_rollup unreadable
+    ])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, accounting='pss')
+    top = analyzer.get_processes(top_n=3)
+
+    assert [proc.name for proc in top] == ['java', 'agent', 'postgres']
+    java, agent, postgres = top
+    assert round(java.pss_mb, 1) == round(580000 / 1024, 1)
+    assert java.uss_mb == 290000 / 1024
+    assert agent.pss_mb is None and agent.mem_mb == agent.rss_mb  # Left at RSS
+    assert postgres.rss_mb == 800000 / 1024 and postgres.mem_mb == postgres.pss_mb
+
+
+def test_rss_accounting_leaves_pss_alone(fake_proc):
+    root = fake_proc([(10, 1, 'postgres', 800000, 200000), (20, 1, 'java', 600000, 580000)])
+    top = wamr.MemoryAnalyzer(proc_root=root).get_processes(top_n=2)
+    assert [proc.name for proc in top] == ['postgres', 'java']
+    assert all(proc.pss_mb is None for proc in top)
@@ -0,0 +1,85 @@
+"""Repairing and validating the model's analysis"""
+
+import wamr
+
+
+def test_parse_analysis_tolerates_surrounding_text_and_trailing_commas():
+    text = 'Here you go: {"summary": "ok", "high_priority": [{"process": "a", "pid": 1,},], "medium_priority": []} Done'
+    analysis, cut = wamr.parse_analysis(text)
+    assert analysis == {'summary': 'ok', 'high_priority': [{'process': 'a', 'pid': 1}], 'medium_priority': []}
+    assert cut == []
+
+
+def test_parse_analysis_repairs_truncated_json():
+    text = ('{"summary": "ok", "high_priority": [{"process": "a", "pid": 1, "memory_mb": 10}, '
+            '{"process": "b", "pid": 2, "mem')
+    analysis, cut = wamr.parse_analysis(text)
+    assert analysis == {'summary': 'ok', 'high_priority': [{'process': 'a', 'pid': 1, 'memory_mb': 10}]}
+    assert cut == ['high_priority']
+    assert wamr.missing_fields(analysis, cut) == ['high_priority', 'medium_priority']
+
+
+def test_parse_analysis_without_anything_usable():
+    assert wamr.parse_analysis('no JSON here') == (None, [])
+    assert wamr.parse_analysis('{"summary": "all go') == (None, ['summary'])
+
+
+def known_processes():
+    return {
+        10: wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, '', pss_mb=700.0, uss_mb=650.0, swap_mb=0.0),
+        20: wamr.ProcessInfo(20, 'nginx', 'www', 120.0, ''),
+        30: wamr.ProcessInfo(30, 'redis', 'redis', 80.0, ''),
+    }
+
+
+def test_validate_analysis_fixes_entries():
+    analysis = {
+        'summary': 'busy',
+        'high_priority': [
+            {'process': 'postgres', 'pid': 10, 'memory_mb': 500},   # Wrong size
+            {'process': 'nginx', 'pid': 99, 'memory_mb': 120},      # Wrong PID
+            {'process': 'ghost', 'pid': 77},                        # Not in the snapshot
+        ],
+        'medium_priority': [{'process': 'postgres', 'pid': 10}],    # Listed twice
+        'safe_to_ignore': [{'process': 'Redis server', 'pid': '30'}, 'junk'],
+    }
+    counts = wamr.validate_analysis(analysis, known_processes())
+    assert counts == {'dropped': 3, 'corrected': 3}
+    assert [(e['pid'], e['process'], e['memory_mb']) for e in analysis['high_priority']] == [
+        (10, 'postgres', 700.0), (20, 'nginx', 120.0)]  # PSS where known
+    assert analysis['medium_priority'] == []
+    assert analysis['safe_to_ignore'] == [{'process': 'redis', 'pid': 30, 'memory_mb': 80.0}]
+    assert analysis['total_reclaimable_mb'] == 770.0  # USS for postgres, RSS for nginx
+
+
+def test_validate_analysis_of_cached_answer_rechecks_pids():
+    # Cached for an earlier snapshot where nginx was PID 5 and PID 20 was something else
+    analysis = {
+        'summary': 'ok',
+        'high_priority': [{'process': 'nginx', 'pid': 5, 'command': 'kill -HUP 5'}],
+        'medium_priority': [{'process': 'memcached', 'pid': 20}],
+    }
+    counts = wamr.validate_analysis(analysis, known_processes(), cached=True)
+    assert analysis['high_priority'] == [{'process': 'nginx', 'pid': 20, 'command': 'kill -HUP 20',
+                                          'memory_mb': 120.0}]
+    assert analysis['medium_priority'] == []
+    assert counts['dropped'] == 1
+    assert analysis['summary'] == 'ok' and analysis['safe_to_ignore'] == []
+
+
+def test_cut_off_answer_is_completed_by_a_follow_up(fake_ollama):
+    processes = list(known_processes().values())
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.use_signatures = False
+    analyzer.client = fake_ollama(
+        '{"summary": "busy", "high_priority": [{"process": "postgres", "pid": 10}, {"process": "ngi',
+        {'high_priority': [{'process': 'nginx', 'pid': 20}], 'medium_priority': [{'process': 'redis', 'pid': 30}]},
+    )
+    analysis = analyzer.analyze_with_llm(mem_data={'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0,
+                                                   'used_percent': 75.0}, processes=processes)
+    follow_up = analyzer.client.payloads[1]['prompt']
+    assert 'containing only: high_priority, medium_priority' in follow_up
+    assert "Don't list these again, they are already covered: postgres (PID 10)" in follow_up
+    assert analysis['summary'] == 'busy'
+    assert [entry['pid'] for entry in analysis['high_priority']] == [10, 20]  # Complete entries are kept
+    assert [entry['pid'] for entry in analysis['medium_priority']] == [30]
@@ -0,0 +1,62 @@
+"""Process-tree aggregation into applications"""
+
+import wamr
+
+
+def test_aggregate_folds_same_named_subtrees():
+    rows = [
+        (1, 0, 'systemd', 10.0, 'root'),
+        (100, 1, 'chrome', 300.0, 'ann'),
+        (101, 100, 'chrome', 200.0, 'ann'),
+        (102, 101, 'chrome', 100.0, 'ann'),    # Grandchild of the same tree
+        (103, 100, 'bash', 5.0, 'ann'),
+        (104, 103, 'chrome', 50.0, 'ann'),     # Separate tree under another program
+        (200, 1, 'gunicorn', 40.0, 'www'),
+        (201, 200, 'gunicorn', 400.0, 'www'),
+        (202, 200, 'gunicorn', 400.0, 'www'),
+    ]
+    apps = wamr.aggregate_processes(rows)
+    assert [(app.name, app.pid, app.count, app.rss_mb) for app in apps] == [
+        ('gunicorn', 200, 3, 840.0),
+        ('chrome', 100, 3, 600.0),
+        ('chrome', 104, 1, 50.0),
+        ('systemd', 1, 1, 10.0),
+        ('bash', 103, 1, 5.0),
+    ]
+    assert sorted(apps[0].pids) == [200, 201, 202]
+    assert apps[0].user == 'www'
+
+
+def test_aggregate_survives_parent_cycles():
+    apps = wamr.aggregate_processes([(5, 6, 'x', 1.0, 'u'), (6, 5, 'x', 2.0, 'u')])
+    assert sum(app.count for app in apps) == 2
+
+
+def test_get_applications_from_proc(fake_proc):
+    root = fake_proc([
+        (1, 0, 'init', 4096, 2048),
+        (10, 1, 'postgres', 200000, 100000),
+        (11, 10, 'postgres', 300000, 40000),
+        (12, 10, 'postgres', 300000, 40000),
+        (20, 1, 'java', 600000, 590000),
+    ])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, view='app')
+    apps = analyzer.get_applications(top_n=2)
+    assert [(app.name, app.pid, app.count) for app in apps] == [('postgres', 10, 3), ('java', 20, 1)]
+    assert apps[0].cmd == '/usr/bin/postgres --serve'
+    assert analyzer.process_rss_total_mb == (4096 + 800000 + 600000) / 1024
+
+    pss = wamr.MemoryAnalyzer(proc_root=root, view='app', accounting='pss').get_applications(top_n=2)
+    assert [(app.name, app.pss_mb) for app in pss] == [('java', 590000 / 1024), ('postgres', 180000 / 1024)]
+
+
+def test_app_prompt_lists_applications(fake_proc):
+    workers = [(11 + i, 10, 'worker', 100000, None) for i in range(20)]
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'worker', 4096, None)] + workers)
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, view='app')
+    mem_data = analyzer.get_system_memory()
+    processes = analyzer.get_processes()
+    apps = analyzer.get_applications()
+    prompt = analyzer.build_prompt(mem_data, processes, [], apps)
+    assert '1. worker (root PID 10) - 21 processes' in prompt
+    assert 'PID 11' not in prompt
@@ -0,0 +1,111 @@
+"""Snapshot validation and wamr batch"""
+
+import json
+
+import pytest
+
+import wamr
+
+
+def make_snapshot(**extra):
+    snapshot = {
+        'memory': {'total_mb': 8000, 'used_mb': 6000, 'free_mb': 2000},
+        'processes': [
+            {'pid': 10, 'name': 'postgres', 'user': 'pg', 'rss_mb': 900.0, 'cmd': 'postgres: main'},
+            {'pid': 20, 'name': 'nginx', 'user': 'www', 'rss_mb': 120, 'cmd': 'nginx: worker'},
+        ],
+    }
+    snapshot.update(extra)
+    return snapshot
+
+
+CGROUP = {'path': 'system.slice/nginx.service', 'label': 'nginx.service', 'current_mb': 130.0}
+SHARED = {'path': '/dev/shm/pool', 'kind': 'shm', 'device': '00:1a', 'inode': 7, 'nprocs': 3,
+          'size_mb': 64.0, 'resident_mb': 64.0, 'per_process_mb': 21.3}
+
+def test_validate_snapshot_normalises():
+    snapshot = make_snapshot()
+    snapshot['processes'][0]['cmd'] = 'x' * 300
+    result = wamr.validate_snapshot(snapshot)
+    assert result['memory']['used_percent'] == 75.0
+    assert result['processes'][1]['rss_mb'] == 120.0
+    assert len(result['processes'][0]['cmd']) == 100
+    assert result['cgroups'] == [] and result['shared'] == [] and result['kernel'] is None
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda s: s.update(memory=None), "missing 'memory'"),
+    (lambda s: s['memory'].update(total_mb=0), 'total_mb must be positive'),
+    (lambda s: s['memory'].update(used_mb=True), 'used_mb must be a non-negative number'),
+    (lambda s: s['processes'][0].update(pid='10'), 'integer pid'),
+    (lambda s: s['processes'][0].update(rss_mb=-1), 'rss_mb must be a non-negative number'),
+    (lambda s: s['processes'][0].update(pss_mb=100.0), 'pss_mb, uss_mb and swap_mb together'),
+    (lambda s: s['processes'][0].update(pss_mb='1', uss_mb=1, swap_mb=0), 'together'),
+    (lambda s: s.update(cgroups={}), "'cgroups' must be a list"),
+    (lambda s: s.update(cgroups=[{'path': 'a', 'label': 'a'}]), "cgroups[0] is missing 'current_mb'"),
+    (lambda s: s.update(cgroups=[dict(CGROUP, max_mb='1G')]), 'cgroups[0].max_mb must be Optional[float]'),
+    (lambda s: s.update(mappings=[{'pid': 1, 'name': 'a', 'categories': [], 'extra': 1}]), "unknown field 'extra'"),
+    (lambda s: s.update(mappings=[{'pid': 1, 'name': 'a', 'categories': []}]), 'mappings[0].categories'),
+    (lambda s: s.update(kernel={'categories': {}}), "kernel is missing 'process_rss_mb'"),
+    (lambda s: s.update(shared=[dict(SHARED, nprocs=2.5)]), 'shared[0].nprocs must be int'),
+    (lambda s: s.update(shared_costs=[[10, 'postgres']]), 'shared_costs'),
+])
+def test_validate_snapshot_rejects(change, message):
+    snapshot = make_snapshot()
+    change(snapshot)
+    with pytest.raises(ValueError) as excinfo:
+        wamr.validate_snapshot(snapshot)
+    assert message in str(excinfo.value)
+
+
+def test_validate_snapshot_sections_round_trip():
+    kernel = {'categories': {'shmem': 64.0}, 'process_rss_mb': 1020.0, 'unattributed_mb': 10.0,
+              'reclaim': {'oom_kill': 0}, 'zram': {}, 'slab_top': [['dentry', 12.5]]}
+    snapshot = make_snapshot(cgroups=[CGROUP], kernel=kernel, shared=[SHARED], shared_costs=[[10, 'postgres', 21.3]])
+    snapshot['processes'][0].update(pss_mb=700.0, uss_mb=650.0, swap_mb=0)
+    result = wamr.validate_snapshot(json.loads(json.dumps(snapshot)))
+
+    analyzer = wamr.MemoryAnalyzer.from_snapshot(result)
+    assert analyzer.processes[0].uss_mb == 650.0
+    assert analyzer.cgroups[0].label == 'nginx.service'
+    assert analyzer.kernel.slab_top == [['dentry', 12.5]]
+    assert analyzer.shared[0].nprocs == 3
+
+    again = wamr.validate_snapshot(json.loads(json.dumps(analyzer.to_snapshot(result['memory']))))
+    assert again['processes'] == result['processes']
+    assert again['cgroups'][0]['current_mb'] == 130.0
+    assert again['shared_costs'] == [[10, 'postgres', 21.3]]
+
+
+def test_analyze_snapshot_retries_a_failed_answer(fake_ollama, monkeypatch):
+    monkeypatch.setattr(wamr.time, 'sleep', lambda seconds: None)
+    snapshot = wamr.validate_snapshot(make_snapshot())
+    answer = {'summary': 'ok', 'high_priority': [], 'medium_priority': [], 'safe_to_ignore': []}
+    client = fake_ollama('not json', 'still not json', answer)  # The first attempt also asks again
+    analysis, attempts = wamr.analyze_snapshot(snapshot, 'm', client, retries=3)
+    assert attempts == 2 and analysis['summary'] == 'ok'
+
+    client = fake_ollama(*['not json'] * 4)
+    assert wamr.analyze_snapshot(snapshot, 'm', client, retries=1) == (None, 2)
+
+
+def test_batch_writes_one_record_per_host(tmp_path, capsys):
+    from bench import StubOllama
+
+    files = []
+    for host in ('db1', 'db2'):
+        files.append(tmp_path / f'{host}.json')
+        files[-1].write_text(json.dumps(make_snapshot(host=host)))
+    files.append(tmp_path / 'broken.json')
+    files[-1].write_text('{"host": "broken"}')
+    output = tmp_path / 'out.jsonl'
+
+    with StubOllama(latency=0.0, tokens_per_second=100000) as stub:
+        with pytest.raises(SystemExit) as excinfo:
+            wamr.batch_main([str(f) for f in files] + ['-o', str(output), '--ollama-url', stub.url,
+                                                       '--no-cache', '--workers', '1'])
+    assert excinfo.value.code == 1  # One host failed
+    records = {r.get('host', r.get('file')): r for r in map(json.loads, output.read_text().splitlines())}
+    assert records['db1']['ok'] and records['db2']['ok'] and records['db1']['attempts'] == 1
+    assert not records[str(files[2])]['ok'] and 'invalid snapshot' in records[str(files[2])]['error']
+    assert '2 hosts analyzed, 1 failed' in capsys.readouterr().err
@@ -0,0 +1,36 @@
+"""The benchmark suite's synthetic /proc trees and stub Ollama server"""
+
+import json
+
+import bench
+import wamr
+
+
+def test_synthetic_proc_tree_is_readable(tmp_path):
+    bench.make_proc_tree(str(tmp_path), 100)
+    analyzer = wamr.MemoryAnalyzer(proc_root=str(tmp_path), backend='proc')
+    processes = analyzer.get_processes(top_n=1000)
+    assert len(processes) == 95  # Every 20th PID is a kernel thread
+    assert processes == sorted(processes, key=lambda p: p.rss_mb, reverse=True)
+    assert analyzer.get_system_memory()['total_mb'] == 64000.0
+    apps = analyzer.get_applications(top_n=1000)
+    assert sum(app.count for app in apps) == 95
+
+
+def test_collection_bench_reports_each_stage():
+    results = bench.bench_collection(50, runs=2)
+    assert {result['name'] for result in results} >= {'get_processes', 'get_processes[pss]', 'get_applications'}
+    timings = [result for result in results if 'best_ms' in result]
+    assert all(result['size'] == 50 and result['runs'] == 2 and result['best_ms'] > 0 for result in timings)
+
+
+def test_stub_streams_the_canned_analysis_and_extends_the_context():
+    with bench.StubOllama(latency=0.0, tokens_per_second=100000) as stub:
+        client = wamr.OllamaClient(url=stub.url)
+        response = client.generate({'model': 'm', 'prompt': 'x' * 40, 'stream': True, 'context': [7]}, stream=True)
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+    assert json.loads(''.join(chunk['response'] for chunk in chunks)) == bench.STUB_ANALYSIS
+    final = chunks[-1]
+    assert final['done'] and final['prompt_eval_count'] == 10
+    assert final['context'][0] == 7 and len(final['context']) == 1 + 10 + len(stub.tokens)
+    assert stub.requests == 1
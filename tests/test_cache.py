@@ -0,0 +1,70 @@
+"""On-disk LLM analysis cache and snapshot fingerprints"""
+
+import os
+import time
+
+import wamr
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+
+ANSWER = {
+    'summary': 'postgres is large but expected',
+    'high_priority': [],
+    'medium_priority': [{'process': 'postgres', 'pid': 10, 'memory_mb': 900, 'reason': 'r', 'action': 'a'}],
+    'safe_to_ignore': [],
+}
+
+
+def processes(postgres_mb=900.0, nginx_pid=20):
+    return [wamr.ProcessInfo(10, 'postgres', 'pg', postgres_mb, 'postgres: main'),
+            wamr.ProcessInfo(nginx_pid, 'nginx', 'www', 120.0, 'nginx: worker')]
+
+
+def test_fingerprint_ignores_small_drift_and_pids():
+    key = wamr.snapshot_fingerprint(MEM, processes(), 'llama3.2:3b')
+    assert wamr.snapshot_fingerprint(dict(MEM, used_percent=76.0), processes(950.0, nginx_pid=21),
+                                     'llama3.2:3b') == key
+    assert wamr.snapshot_fingerprint(MEM, processes(1500.0), 'llama3.2:3b') != key
+    assert wamr.snapshot_fingerprint(MEM, processes(), 'qwen2.5:1.5b') != key
+    assert wamr.snapshot_fingerprint(MEM, processes()[:1], 'llama3.2:3b') != key
+    assert wamr.snapshot_fingerprint(MEM, processes(), 'llama3.2:3b', extra=('pss',)) != key
+
+
+def test_cache_expires_and_evicts_least_recently_used(tmp_path):
+    cache = wamr.AnalysisCache(path=str(tmp_path), ttl=60, max_entries=2)
+    cache.put('a', {'summary': 'a'})
+    cache.put('b', {'summary': 'b'})
+    assert cache.get('a') == {'summary': 'a'}
+    assert cache.get('missing') is None
+
+    old = time.time() - 3600
+    os.utime(tmp_path / 'b.json', (old, old))  # 'a' was just used, so 'b' goes first
+    cache.put('c', {'summary': 'c'})
+    assert sorted(os.listdir(tmp_path)) == ['a.json', 'c.json']
+
+    expired = wamr.AnalysisCache(path=str(tmp_path), ttl=0)
+    time.sleep(0.01)
+    assert expired.get('a') is None
+    assert not (tmp_path / 'a.json').exists()
+
+
+def test_analyze_with_llm_reuses_a_cached_answer(tmp_path, fake_ollama):
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.use_signatures = False
+    analyzer.cache = wamr.AnalysisCache(path=str(tmp_path))
+    analyzer.client = fake_ollama(ANSWER)
+
+    first = analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    assert not analyzer.last_cache_hit
+    assert first['medium_priority'][0]['memory_mb'] == 900.0
+
+    # Next run: postgres grew a little and nginx was restarted
+    again = analyzer.analyze_with_llm(mem_data=MEM, processes=processes(950.0, nginx_pid=21))
+    assert analyzer.last_cache_hit
+    assert len(analyzer.client.payloads) == 1
+    assert again['medium_priority'][0]['memory_mb'] == 950.0  # Re-validated against the new snapshot
+
+    analyzer.refresh_cache = True
+    analyzer.client.answers.append(ANSWER)
+    analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    assert not analyzer.last_cache_hit and len(analyzer.client.payloads) == 2
@@ -0,0 +1,59 @@
+"""cgroup v2 memory accounting"""
+
+import pytest
+
+import wamr
+
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize('path, label', [
+    ('system.slice/nginx.service', 'nginx.service'),
+    ('system.slice/docker-0123456789abcdef0123.scope', 'docker:0123456789ab'),
+    ('docker/fedcba9876543210', 'docker:fedcba987654'),
+    ('machine.slice/libpod-abcdef1234567890.scope', 'libpod:abcdef123456'),
+    ('kubepods.slice/kubepods-burstable.slice/kubepods-burstable-pod1234_5678.slice', 'pod:1234_5678'),
+    ('', '/'),
+])
+def test_cgroup_label(path, label):
+    assert wamr.cgroup_label(path) == label
+
+
+def make_cgroup(directory, procs, current_mb, limit=b'max', stat=None):
+    directory.mkdir(parents=True)
+    (directory / 'cgroup.procs').write_text(''.join(f"{pid}\n" for pid in procs))
+    (directory / 'memory.current').write_text(f"{int(current_mb * MB)}\n")
+    (directory / 'memory.max').write_bytes(limit + b'\n')
+    (directory / 'memory.stat').write_text(''.join(f"{key} {int(mb * MB)}\n" for key, mb in (stat or {}).items()))
+
+
+def test_get_cgroups(tmp_path):
+    root = tmp_path / 'cgroup'
+    root.mkdir()
+    (root / 'cgroup.controllers').write_text('cpu memory\n')
+    (root / 'cgroup.procs').write_text('1\n')
+    make_cgroup(root / 'system.slice', [], 900)   # Parent: its counters include its children
+    make_cgroup(root / 'system.slice' / 'postgresql.service', [10, 11], 700, str(1024 * MB).encode(),
+                {'anon': 500, 'file': 190, 'kernel': 10, 'shmem': 64, 'pgfault': 12345})
+    make_cgroup(root / 'system.slice' / 'docker-0123456789abcdef.scope', [20], 150)
+    make_cgroup(root / 'user.slice' / 'session-1.scope', [30], 20)
+
+    analyzer = wamr.MemoryAnalyzer(cgroup_root=str(root))
+    analyzer.processes = [wamr.ProcessInfo(10, 'postgres', 'pg', 600.0, ''),
+                          wamr.ProcessInfo(20, 'nginx', 'www', 100.0, '')]
+    cgroups = analyzer.get_cgroups(top_n=2)
+
+    assert [(cg.path, cg.label, cg.current_mb) for cg in cgroups] == [
+        ('system.slice/postgresql.service', 'postgresql.service', 700.0),
+        ('system.slice/docker-0123456789abcdef.scope', 'docker:0123456789ab', 150.0),
+    ]
+    postgres, docker = cgroups
+    assert postgres.max_mb == 1024.0 and docker.max_mb is None
+    assert (postgres.anon_mb, postgres.file_mb, postgres.kernel_mb, postgres.shmem_mb) == (500, 190, 10, 64)
+    assert postgres.nprocs == 2 and postgres.top_processes == ['postgres']
+    assert docker.top_processes == ['nginx']
+
+
+def test_get_cgroups_without_a_unified_hierarchy(tmp_path):
+    analyzer = wamr.MemoryAnalyzer(cgroup_root=str(tmp_path))
+    assert analyzer.get_cgroups() == [] and analyzer.cgroups == []
@@ -0,0 +1,64 @@
+"""Startup: the argparse-free fast path, lazy imports and the stdlib HTTP client"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from bench import StubOllama
+
+import wamr
+
+
+def full_parse(argv):
+    parser = argparse.ArgumentParser()
+    for flags, kwargs in wamr.MAIN_OPTIONS:
+        parser.add_argument(*flags, **kwargs)
+    return vars(parser.parse_args(argv))
+
+
+@pytest.mark.parametrize('argv', [
+    [],
+    ['--no-llm', '--mappings', '5'],
+    ['--mappings=5', '--accounting', 'pss', '--view=app', '--timings'],
+    ['--deadline', '1.5s', '--hedge', 'a,b', '--watch', '2'],
+])
+def test_quick_parse_matches_argparse(argv):
+    assert vars(wamr._parse_args_quick(argv)) == full_parse(argv)
+
+
+@pytest.mark.parametrize('argv', [
+    ['--help'],
+    ['--no-ll'],                # Abbreviation
+    ['--mappings', 'five'],
+    ['--mappings'],
+    ['--model', '-m'],
+    ['--accounting', 'uss'],    # Not a choice
+    ['--json=yes'],
+    ['stray'],
+])
+def test_quick_parse_leaves_the_rest_to_argparse(argv):
+    assert wamr._parse_args_quick(argv) is None
+
+
+def test_import_defers_heavy_modules():
+    code = ("import sys, wamr; print(' '.join(m for m in ('argparse', 'json', 'dataclasses', 'http.client', "
+            "'subprocess', 'inspect') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_cancel_stops_a_streamed_response():
+    with StubOllama(latency=0.0, tokens_per_second=50) as stub:
+        client = wamr.OllamaClient(url=stub.url)
+        response = client.generate({'model': 'm', 'prompt': 'x', 'stream': True}, stream=True)
+        threading.Timer(0.2, client.cancel).start()
+        started = time.monotonic()
+        lines = sum(1 for _ in response.iter_lines())
+        assert time.monotonic() - started < 2  # The full answer takes over 10 s
+        assert 0 < lines < len(stub.tokens)
+        assert not client._active and not client._idle
+
+        assert client.warm_up('m')  # The client is still usable
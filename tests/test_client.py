@@ -0,0 +1,35 @@
+"""OllamaClient's kept-alive connections and the background model warm-up"""
+
+from bench import StubOllama
+
+import wamr
+
+
+def test_connections_are_kept_alive():
+    with StubOllama(latency=0.0, tokens_per_second=100000) as stub:
+        client = wamr.OllamaClient(url=stub.url)
+        first = client.generate({'model': 'm', 'prompt': 'hello'})
+        assert first.status_code == 200 and first.json()['done']
+        assert client.last_connect_s > 0
+
+        streamed = client.generate({'model': 'm', 'prompt': 'hello', 'stream': True}, stream=True)
+        lines = [line for line in streamed.iter_lines() if line]
+        assert client.last_connect_s == 0.0  # Reused
+        assert len(lines) > 1
+        assert len(client._idle) == 1 and not client._active
+
+
+def test_warm_up_runs_alongside_collection():
+    with StubOllama(latency=0.0, tokens_per_second=100000) as stub:
+        analyzer = wamr.MemoryAnalyzer()
+        analyzer.client = wamr.OllamaClient(url=stub.url)
+        analyzer.start_warmup('m')
+        analyzer.start_warmup('m')  # Already running: no second request
+        analyzer._wait_warmup()
+        assert stub.requests == 1
+        assert 'warmup' in analyzer.profiler.timings and 'warmup_wait' in analyzer.profiler.timings
+        assert analyzer.client._idle  # The model request can reuse its connection
+
+
+def test_warm_up_reports_an_unreachable_server():
+    assert wamr.OllamaClient(url='http://127.0.0.1:9').warm_up('m', timeout=1) is False
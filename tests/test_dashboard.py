@@ -0,0 +1,91 @@
+"""wamr top: minimal-diff redraws and the dashboard layout"""
+
+import curses
+import time
+
+import pytest
+
+import wamr
+
+
+@pytest.mark.parametrize('old, new, span', [
+    ('abcdef', 'abcdef', (6, 6)),
+    ('abcdef', 'abXdef', (2, 3)),
+    ('abcdef', 'Xbcdef', (0, 1)),
+    ('abcdef', 'abcdeX', (5, 6)),
+    ('12.0 MB  ok', '13.5 MB  ok', (1, 4)),
+])
+def test_changed_span(old, new, span):
+    assert wamr._changed_span(old, new) == span
+
+
+class Window:
+    """Records what curses would have been asked to write"""
+
+    def __init__(self, height=5, width=21):
+        self.size = (height, width)
+        self.writes = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def addstr(self, y, x, text, attr=0):
+        self.writes.append((y, x, text, attr))
+
+    def erase(self):
+        self.writes.append('erase')
+
+    def noutrefresh(self):
+        pass
+
+
+def test_only_changed_cells_are_written(monkeypatch):
+    monkeypatch.setattr(curses, 'doupdate', lambda: None)
+    window = Window()
+    screen = wamr.ScreenDiff(window, {'high': 7})
+
+    screen.draw([('title', ''), ('pid 10  900 MB', ''), ('pid 20  120 MB', '')])
+    assert screen.cells == 3 * 20 and len(window.writes) == 3
+
+    window.writes = []
+    screen.draw([('title', ''), ('pid 10  950 MB', ''), ('pid 20  120 MB', '')])
+    assert window.writes == [(1, 9, '5', 0)] and screen.cells == 1
+
+    window.writes = []
+    screen.draw([('title', ''), ('pid 10  950 MB', 'high')])  # Restyled, and one line fewer
+    assert window.writes == [(1, 0, 'pid 10  950 MB'.ljust(20), 7), (2, 0, ' ' * 14, 0)]  # Just the old text
+
+    window.writes = []
+    screen.draw([('title', ''), ('pid 10  950 MB', 'high')])
+    assert window.writes == [] and screen.cells == 0
+
+    screen.reset()
+    screen.draw([('title', '')])
+    assert window.writes == ['erase', (0, 0, 'title'.ljust(20), 0)]
+
+
+def test_dashboard_shows_verdicts_from_the_background_analysis(fake_proc, fake_ollama):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 200000, None), (20, 1, 'java', 600000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.use_signatures = False
+    analyzer.client = fake_ollama({'summary': 'java is large', 'medium_priority': [],
+                                   'high_priority': [{'process': 'java', 'pid': 20, 'reason': 'heap too big'}]})
+    dashboard = wamr.Dashboard(analyzer, 'm')
+    dashboard.collect(top_n=5)
+    assert [proc.pid for proc in dashboard.processes][:2] == [20, 10]
+
+    before = dashboard.lines(width=100, height=12, interval=1.0)
+    assert len(before) == 12 and before[2] == ('LLM: no analysis yet', 'dim')
+
+    dashboard.start_analysis()
+    for _ in range(100):
+        if not dashboard.analyzing:
+            break
+        time.sleep(0.01)
+    lines = dashboard.lines(width=100, height=12, interval=1.0)
+    assert lines[2][0].startswith('LLM (m, 0s ago): java is large')
+    [java] = [line for line in lines if line[0].startswith('20 ')]
+    assert 'HIGH' in java[0] and 'heap too big' in java[0] and java[1] == 'high'
+
+    dashboard.set_view('app')
+    assert dashboard.analysis is None
@@ -0,0 +1,91 @@
+"""Delta-only re-analysis that continues the model's context"""
+
+import wamr
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+FULL = {
+    'summary': 'postgres dominates',
+    'high_priority': [{'process': 'postgres', 'pid': 10, 'memory_mb': 900, 'reason': 'big', 'action': 'tune'}],
+    'medium_priority': [],
+    'safe_to_ignore': [{'process': 'java', 'pid': 11, 'memory_mb': 400, 'reason': 'normal'},
+                       {'process': 'redis', 'pid': 12, 'memory_mb': 80, 'reason': 'normal'}],
+}
+
+
+def processes(java_mb=400.0, redis=True):
+    procs = [wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, 'postgres: main'),
+             wamr.ProcessInfo(11, 'java', 'app', java_mb, 'java -jar app.jar')]
+    if redis:
+        procs.append(wamr.ProcessInfo(12, 'redis', 'redis', 80.0, 'redis-server'))
+    return procs
+
+
+def analyzer_for(client, state_path=None):
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.use_signatures = False
+    analyzer.incremental = True
+    analyzer.state_path = state_path
+    analyzer.client = client
+    return analyzer
+
+
+def test_merge_analysis():
+    update = {'summary': 'java grew', 'high_priority': [{'process': 'java', 'pid': 11}], 'medium_priority': []}
+    merged = wamr.merge_analysis(dict(FULL, validation={'dropped': 1}), update, exited=[12])
+    assert merged['summary'] == 'java grew' and 'validation' not in merged
+    assert [entry['pid'] for entry in merged['high_priority']] == [11, 10]  # Moved up from safe_to_ignore
+    assert merged['safe_to_ignore'] == []
+    assert FULL['safe_to_ignore'][0]['pid'] == 11  # The previous analysis is left alone
+    assert wamr.merge_analysis(FULL, {})['summary'] == FULL['summary']
+
+
+def test_only_changes_are_sent_in_the_previous_context(fake_ollama, tmp_path):
+    update = {'summary': 'java grew', 'high_priority': [{'process': 'java', 'pid': 11, 'reason': 'grew'}],
+              'medium_priority': [], 'safe_to_ignore': []}
+    state_path = str(tmp_path / 'state.json')
+    analyzer = analyzer_for(fake_ollama(FULL, update), state_path)
+    analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    assert not analyzer.last_delta and 'context' not in analyzer.client.payloads[0]
+
+    # A new run picks up where the saved state left off
+    analyzer = analyzer_for(analyzer.client, state_path)
+    analysis = analyzer.analyze_with_llm(mem_data=MEM, processes=processes(java_mb=700.0, redis=False))
+    assert analyzer.last_delta
+    payload = analyzer.client.payloads[1]
+    assert payload['context'] == [1]
+    assert 'java (PID 11) 400.0 MB -> 700.0 MB' in payload['prompt']
+    assert 'EXITED: redis (PID 12)' in payload['prompt'] and 'postgres' not in payload['prompt']
+    assert analysis['summary'] == 'java grew'
+    assert [(e['pid'], e['memory_mb']) for e in analysis['high_priority']] == [(11, 700.0), (10, 900.0)]
+    assert analysis['safe_to_ignore'] == []
+    assert wamr.load_state(state_path).deltas == 1
+
+
+def test_unchanged_snapshot_needs_no_request(fake_ollama):
+    analyzer = analyzer_for(fake_ollama(FULL))
+    analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    analysis = analyzer.analyze_with_llm(mem_data=MEM, processes=processes(java_mb=405.0))
+    assert analyzer.last_delta and len(analyzer.client.payloads) == 1
+    assert analysis['safe_to_ignore'][0]['memory_mb'] == 405.0
+
+
+def test_cut_off_delta_is_completed_in_the_same_context(fake_ollama):
+    analyzer = analyzer_for(fake_ollama(
+        FULL,
+        '{"summary": "java grew", "high_priority": [{"process": "java", "pid": 11, "rea',
+        {'high_priority': [{'process': 'java', 'pid': 11, 'reason': 'grew'}], 'medium_priority': []},
+    ))
+    analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    analysis = analyzer.analyze_with_llm(mem_data=MEM, processes=processes(java_mb=700.0))
+    follow_up = analyzer.client.payloads[2]
+    assert follow_up['context'] == [1] and 'UPDATE since your last analysis' in follow_up['prompt']
+    assert [entry['pid'] for entry in analysis['high_priority']] == [11, 10]
+    assert analysis['validation']['requeried'] == ['high_priority', 'medium_priority']
+
+
+def test_mostly_new_processes_get_a_full_prompt(fake_ollama):
+    analyzer = analyzer_for(fake_ollama(FULL, FULL))
+    analyzer.analyze_with_llm(mem_data=MEM, processes=processes())
+    others = [wamr.ProcessInfo(20 + i, f'job{i}', 'app', 100.0, '') for i in range(3)]
+    analyzer.analyze_with_llm(mem_data=MEM, processes=others)
+    assert not analyzer.last_delta and 'context' not in analyzer.client.payloads[1]
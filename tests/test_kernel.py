@@ -0,0 +1,91 @@
+"""Kernel-side memory: meminfo categories, reclaim counters, slab and zram"""
+
+import os
+
+import wamr
+
+MEMINFO = b"""\
+MemTotal:        8192000 kB
+MemAvailable:    4096000 kB
+Buffers:          102400 kB
+Cached:          2048000 kB
+Shmem:            512000 kB
+SReclaimable:     204800 kB
+SUnreclaim:       102400 kB
+KernelStack:       20480 kB
+PageTables:        40960 kB
+VmallocUsed:       30720 kB
+Percpu:            10240 kB
+HugePages_Total:       2
+Hugepagesize:       2048 kB
+"""
+
+VMSTAT = b"""\
+nr_free_pages 123
+pgscan_kswapd 1000
+pgscan_direct 50
+allocstall_dma32 1
+allocstall_normal 4
+allocstall_weird 100
+workingset_refault_anon 7
+workingset_refault_file 3
+oom_kill 2
+"""
+
+SLABINFO = b"""\
+slabinfo - version: 2.1
+# name            <active_objs> <num_objs> <objsize> <objperslab> <pagesperslab> : tunables <limit> <batchcount> <sharedfactor> : slabdata <active_slabs> <num_slabs> <sharedavail>
+dentry            100000 100000    192   21    1 : tunables    0    0    0 : slabdata   5000   5120      0
+kmalloc-4k          2000   2048   4096    8    8 : tunables    0    0    0 : slabdata    256    256      0
+inode_cache        10000  10000    600   26    4 : tunables    0    0    0 : slabdata    400    400      0
+"""
+
+
+def test_parse_meminfo_and_categories():
+    meminfo = wamr.parse_meminfo(MEMINFO)
+    assert meminfo['MemTotal'] == 8000.0 and meminfo['HugePages_Total'] == 2
+    categories = wamr.kernel_categories(meminfo)
+    assert list(categories) == list(wamr.KERNEL_CATEGORIES)
+    assert categories['page_cache'] == 100 + 2000 - 500  # Shmem is counted as shmem, not cache
+    assert categories['hugepages'] == 4.0
+    assert categories['slab_reclaimable'] == 200.0 and categories['percpu'] == 10.0
+
+
+def test_parse_vmstat_sums_zone_and_type_variants():
+    counters = wamr.parse_vmstat(VMSTAT)
+    assert list(counters) == list(wamr.VMSTAT_COUNTERS)
+    assert counters['allocstall'] == 5 and counters['workingset_refault'] == 10
+    assert counters['pgscan_kswapd'] == 1000 and counters['oom_kill'] == 2 and counters['pswpin'] == 0
+
+
+def test_parse_slabinfo_ranks_caches_by_size():
+    page_mb = wamr.PAGE_SIZE_KB / 1024
+    assert wamr.parse_slabinfo(SLABINFO, top_n=2) == [['dentry', 5120 * page_mb], ['kmalloc-4k', 2048 * page_mb]]
+    assert wamr.parse_slabinfo(b'') == []
+
+
+def test_get_kernel_memory(fake_proc, tmp_path):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 1024000, None)])
+    with open(os.path.join(root, 'meminfo'), 'wb') as f:
+        f.write(MEMINFO)
+    with open(os.path.join(root, 'vmstat'), 'wb') as f:
+        f.write(VMSTAT)
+    zram = tmp_path / 'block' / 'zram0'
+    zram.mkdir(parents=True)
+    (zram / 'mm_stat').write_text(f"{300 << 20} {100 << 20} {110 << 20} 0 0 0 0\n")
+
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.block_root = str(tmp_path / 'block')
+    analyzer.get_system_memory()
+    analyzer.get_processes()
+    kernel = analyzer.get_kernel_memory()
+
+    assert kernel.categories['shmem'] == 500.0
+    assert kernel.reclaim['allocstall'] == 5
+    assert kernel.slab_top == []  # No slabinfo: usually root-only
+    assert kernel.zram == {'orig_mb': 300.0, 'compressed_mb': 100.0, 'used_mb': 110.0}
+    assert kernel.process_rss_mb == (4096 + 1024000) / 1024
+    assert kernel.unattributed_mb == analyzer.used_mem_mb - kernel.process_rss_mb
+
+    analyzer.live = False
+    assert analyzer.get_kernel_memory() is None
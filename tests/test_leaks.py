@@ -0,0 +1,61 @@
+"""Memory-leak detection over per-PID time series"""
+
+import pytest
+
+import wamr
+
+LEAKY = (10, 1000)    # (pid, start time)
+STEADY = (20, 2000)
+
+
+def feed(detector, samples, **series):
+    """One sample a minute; each series maps a key to a function of the sample index"""
+    for i in range(samples):
+        detector.update(i * 60.0, [(key, fn(i)) for key, fn in series.values()])
+
+
+def test_sustained_growth_is_reported():
+    detector = wamr.LeakDetector(min_slope_mb_per_hour=10)
+    feed(detector, 30, leaky=(LEAKY, lambda i: 100.0 + i), steady=(STEADY, lambda i: 500.0 + (i % 3)))
+
+    findings = detector.findings(available_mb=600.0)
+    assert [finding['pid'] for finding in findings] == [10]
+    leak = findings[0]
+    assert leak['growth_mb_per_hour'] == pytest.approx(60.0)
+    assert leak['r2'] == pytest.approx(1.0)
+    assert leak['memory_mb'] == 129.0 and leak['samples'] == 30
+    assert leak['hours_to_exhaustion'] == pytest.approx(10.0)
+
+
+def test_too_few_samples_or_mostly_falling_is_not_a_leak():
+    detector = wamr.LeakDetector(min_slope_mb_per_hour=10, min_samples=10)
+    feed(detector, 5, leaky=(LEAKY, lambda i: 100.0 + 10 * i))
+    assert detector.findings(available_mb=600.0) == []
+
+    # A sawtooth that ends higher still falls at most steps
+    detector = wamr.LeakDetector(min_slope_mb_per_hour=1, min_r2=0.0)
+    feed(detector, 40, saw=(LEAKY, lambda i: 100.0 + i * 2 - 3 * (i % 4)))
+    assert detector.findings(available_mb=600.0) == []
+
+
+def test_exited_processes_are_forgotten_and_reused_pids_start_afresh():
+    detector = wamr.LeakDetector()
+    feed(detector, 12, leaky=(LEAKY, lambda i: 100.0 + i), steady=(STEADY, lambda i: 500.0))
+    assert len(detector) == 2 and detector.samples(LEAKY) == 12
+
+    # PID 10 exits and comes back as a new process
+    reused = (10, 9000)
+    detector.update(800.0, [(STEADY, 500.0), (reused, 50.0)])
+    assert len(detector) == 2
+    assert detector.samples(LEAKY) == 0
+    assert detector.samples(reused) == 1
+    assert detector.trend(reused) is None
+
+
+def test_live_keeps_processes_missing_from_values():
+    detector = wamr.LeakDetector()
+    detector.update(0.0, [(LEAKY, 100.0), (STEADY, 500.0)])
+    detector.update(60.0, [(LEAKY, 101.0)], live={LEAKY, STEADY})
+    assert detector.samples(STEADY) == 1
+    detector.update(120.0, [(LEAKY, 102.0)], live={LEAKY})
+    assert detector.samples(STEADY) == 0
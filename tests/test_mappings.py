@@ -0,0 +1,63 @@
+"""Per-mapping memory breakdown from /proc/<pid>/smaps"""
+
+import os
+
+import pytest
+
+import wamr
+
+
+SMAPS = b"""\
+55d0c1000000-55d0c1400000 rw-p 00000000 00:00 0                          [heap]
+Size:               4096 kB
+Rss:                3000 kB
+Pss:                3000 kB
+Private_Dirty:      3000 kB
+Swap:                100 kB
+7f1c2a000000-7f1c2e000000 rw-s 00000000 00:1a 7                          /dev/shm/pool
+Size:              65536 kB
+Rss:               65536 kB
+Pss:               21845 kB
+Swap:                  0 kB
+7f1c2e000000-7f1c2e200000 r-xp 00000000 08:01 262                        /usr/lib/libc.so.6
+Rss:                1500 kB
+Pss:                 300 kB
+Swap:                  0 kB
+7f1c2e400000-7f1c2e600000 rw-p 00000000 00:00 0
+Rss:                2048 kB
+Pss:                2048 kB
+Swap:                 12 kB
+7f1c2e800000-7f1c2e900000 r-xp 00000000 08:01 262                        /usr/lib/libc.so.6
+Rss:                 500 kB
+Pss:                 100 kB
+Swap:                  0 kB
+"""
+
+
+@pytest.mark.parametrize('chunk_size', [1 << 20, 64])
+def test_read_smaps(tmp_path, chunk_size):
+    path = tmp_path / 'smaps'
+    path.write_bytes(SMAPS)
+    totals, mappings, complete = wamr.read_smaps(str(path), deadline=float('inf'), chunk_size=chunk_size)
+    assert mappings == 5 and complete
+    assert totals == {'heap': [3000, 3000, 100], 'shmem': [65536, 21845, 0],
+                      'file': [2000, 400, 0], 'anon': [2048, 2048, 12]}
+    assert wamr.read_smaps(str(tmp_path / 'gone'), deadline=float('inf')) is None
+
+
+def test_get_mappings_breaks_down_the_largest_processes(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'python3', 200000, None),
+                      (20, 1, 'redis', 100000, None), (30, 1, 'cron', 50000, None)])
+    for pid in (10, 30):
+        with open(os.path.join(root, str(pid), 'smaps'), 'wb') as f:
+            f.write(SMAPS)
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.get_processes()
+    mappings = analyzer.get_mappings(top_n=2)
+
+    assert [(m.pid, m.name, m.mappings, m.complete) for m in mappings] == [(10, 'python3', 5, True)]  # No smaps for 20
+    assert list(mappings[0].categories) == ['shmem', 'heap', 'anon', 'file']  # Largest RSS first
+    assert mappings[0].categories['heap'] == {'rss_mb': 3000 / 1024, 'pss_mb': 3000 / 1024, 'swap_mb': 100 / 1024}
+
+    analyzer.mappings_budget = -1
+    assert analyzer.get_mappings(top_n=2) == []
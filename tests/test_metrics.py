@@ -0,0 +1,56 @@
+"""Prometheus exporter: metric rendering and the cached collection"""
+
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import wamr
+
+MB = 1024 * 1024
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+
+
+def test_render_metrics():
+    processes = [wamr.ProcessInfo(10, 'post"gres', 'pg', 900.0, '', pss_mb=700.0),
+                 wamr.ProcessInfo(20, 'nginx', 'www', 120.0, '')]
+    apps = [wamr.AppInfo('nginx', 20, 'www', 3, 360.0, pids=[20, 21, 22])]
+    analysis = {'high_priority': [{}], 'medium_priority': [], 'safe_to_ignore': [{}, {}], 'total_reclaimable_mb': 1}
+    text = wamr.render_metrics(MEM, processes, apps, analysis, {'collections_total': 4}).decode()
+    lines = text.splitlines()
+
+    assert f'wamr_memory_used_bytes {6000 * MB}' in lines
+    assert f'wamr_process_resident_bytes{{pid="10",name="post\\"gres",user="pg"}} {900 * MB}' in lines
+    assert f'wamr_process_pss_bytes{{pid="10",name="post\\"gres",user="pg"}} {700 * MB}' in lines
+    assert not any(line.startswith('wamr_process_pss_bytes{pid="20"') for line in lines)
+    assert 'wamr_application_processes{name="nginx",pid="20",user="www"} 3' in lines
+    assert 'wamr_analysis_items{priority="safe_to_ignore"} 2' in lines
+    assert '# TYPE wamr_collections_total counter' in lines and 'wamr_collections_total 4' in lines
+
+    bare = wamr.render_metrics(MEM, processes[1:], [], None, None).decode()
+    assert 'wamr_process_pss_bytes' not in bare and 'wamr_analysis_items' not in bare
+
+
+def test_scrapes_serve_the_published_page(fake_proc, fake_ollama):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 200000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.use_signatures = False
+    analyzer.client = fake_ollama({'summary': 'ok', 'high_priority': [], 'medium_priority': [],
+                                   'safe_to_ignore': [{'process': 'postgres', 'pid': 10, 'reason': 'r'}]})
+    exporter = wamr.MetricsExporter(analyzer, 'm')
+    exporter.collect()
+    exporter.analyze()
+    assert b'wamr_analysis_items{priority="safe_to_ignore"} 1' in exporter.body
+    assert b'wamr_collections_total 1' in exporter.body
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), exporter.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        for _ in range(3):
+            with urllib.request.urlopen(url) as response:
+                assert response.read() == exporter.body
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(analyzer.client.payloads) == 1  # Scrapes never analyze
+    assert b'wamr_collections_total 1' in exporter.body  # ...or collect
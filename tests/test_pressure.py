@@ -0,0 +1,61 @@
+"""PSI-triggered analysis"""
+
+import json
+import time
+
+import pytest
+
+import wamr
+
+PRESSURE = ("some avg10=12.50 avg60=3.00 avg300=0.50 total=9000000\n"
+            "full avg10=4.00 avg60=1.00 avg300=0.10 total=3000000\n")
+
+
+def test_parse_pressure():
+    text = ("some avg10=1.50 avg60=0.25 avg300=0.00 total=12345\n"
+            "full avg10=0.00 avg60=0.10 avg300=0.00 total=678\n")
+    pressure = wamr.parse_pressure(text)
+    assert pressure['some'] == {'avg10': 1.5, 'avg60': 0.25, 'avg300': 0.0, 'total': 12345.0}
+    assert pressure['full']['avg60'] == 0.1
+    assert wamr.parse_pressure('') == {}
+
+
+class ScriptedTrigger(wamr.PressureTrigger):
+    """Fires as scripted instead of waiting on the kernel; ends the run when the script does"""
+    script = []
+
+    def open(self):
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        if not self.script:
+            raise KeyboardInterrupt
+        fired = self.script.pop(0)
+        if not fired:
+            time.sleep(timeout)
+        return fired
+
+    def read(self):
+        return wamr.parse_pressure(PRESSURE)
+
+
+def test_triggers_are_debounced_then_cooled_down(monkeypatch, capsys):
+    # Fires, fires again within the debounce, goes quiet, then fires during the cooldown
+    monkeypatch.setattr(ScriptedTrigger, 'script', [True, True, False, True])
+    monkeypatch.setattr(wamr, 'PressureTrigger', ScriptedTrigger)
+    wamr.trigger_main(['--no-llm', '--json', '--debounce', '0.05', '--cooldown', '60', '--top', '3'])
+
+    out, err = capsys.readouterr()
+    [line] = out.splitlines()
+    result = json.loads(line)
+    assert result['pressure']['some']['avg10'] == 12.5 and result['analysis'] is None
+    assert len(result['snapshot']['processes']) <= 3
+    assert 'Memory pressure: some avg10=12.50%' in err
+    assert '3 triggers, 1 analyses, 1 ignored during cooldown' in err
+
+
+def test_trigger_reports_an_unusable_pressure_file(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        wamr.trigger_main(['--pressure-file', str(tmp_path / 'missing')])
+    assert 'cannot register a pressure trigger' in capsys.readouterr().err
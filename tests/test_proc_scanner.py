@@ -0,0 +1,39 @@
+"""The native /proc scanner behind get_processes"""
+
+import os
+
+import wamr
+
+
+def test_top_processes_from_proc(fake_proc):
+    root = fake_proc([
+        (1, 0, 'init', 4096, None),
+        (2, 0, 'kthreadd', 0, None),        # Kernel thread: nothing resident
+        (10, 1, 'postgres', 800000, None),
+        (20, 1, 'java', 600000, None),
+        (30, 1, 'agent', 300000, None),
+    ])
+    with open(os.path.join(root, '30', 'cmdline'), 'wb'):
+        pass  # No command line, as for a zombie
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    processes = analyzer.get_processes(top_n=3)
+
+    assert [(proc.pid, proc.name, proc.user) for proc in processes] == [
+        (10, 'postgres', 'root'), (20, 'java', 'root'), (30, 'agent', 'root')]
+    assert processes[0].cmd == '/usr/bin/postgres --serve'
+    assert processes[0].rss_mb == 800000 / 1024
+    assert processes[2].cmd == '[agent]'
+    assert all(proc.pid != 2 for proc in analyzer.get_processes(top_n=10))
+
+
+def test_process_exiting_mid_scan_is_skipped(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 800000, None)])
+    os.remove(os.path.join(root, '10', 'status'))
+    processes = wamr.MemoryAnalyzer(proc_root=root, backend='proc').get_processes(top_n=5)
+    assert [proc.pid for proc in processes] == [1]
+
+
+def test_auto_backend_reads_proc(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 800000, None)])
+    processes = wamr.MemoryAnalyzer(proc_root=root).get_processes(top_n=5)
+    assert [proc.pid for proc in processes] == [10, 1]
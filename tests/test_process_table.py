@@ -0,0 +1,60 @@
+"""Columnar process storage"""
+
+import pytest
+
+import wamr
+
+PROCESSES = [
+    wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, 'postgres: main', pss_mb=300.0, uss_mb=250.0, swap_mb=0.5),
+    wamr.ProcessInfo(11, 'postgres', 'pg', 400.0, 'postgres: writer', pss_mb=100.0, uss_mb=50.0, swap_mb=0.0),
+    wamr.ProcessInfo(20, 'nginx', 'www', 120.0, 'nginx: worker'),
+    wamr.ProcessInfo(30, 'java', 'app', 200.0, 'java -jar app.jar'),
+]
+
+
+def test_rows_round_trip_through_the_columns():
+    table = wamr.ProcessTable.from_processes(PROCESSES)
+    assert len(table) == 4
+    assert list(table) == PROCESSES
+    assert table[2].pss_mb is None
+    assert table.strings.count('postgres') == 1 and table.strings.count('pg') == 1  # Interned
+    assert list(table.mem_mb) == [300.0, 100.0, 120.0, 200.0]  # PSS where known
+
+
+def test_order_top_select_and_group_by():
+    table = wamr.ProcessTable.from_processes(PROCESSES)
+    assert table.order() == [0, 3, 2, 1]
+    assert table.order('name', reverse=False) == [3, 2, 0, 1]
+    assert table.top(2, 'rss_mb') == [0, 1]
+
+    calls = []
+    postgres = table.select('name', lambda name: calls.append(name) or name == 'postgres')
+    assert postgres == [0, 1] and len(calls) == 3  # Once per distinct name
+    assert table.select('rss_mb', lambda mb: mb < 150) == [2]
+
+    subset = table.take([3, 0])
+    assert [proc.pid for proc in subset] == [30, 10]
+    assert subset.strings is table.strings
+    assert table.group_by('user') == {'pg': (2, 400.0), 'www': (1, 120.0), 'app': (1, 200.0)}
+
+    with pytest.raises(ValueError):
+        table.order('colour')
+    with pytest.raises(ValueError):
+        table.group_by('rss_mb')
+
+
+def test_smaller_than_process_objects():
+    many = [wamr.ProcessInfo(i, 'worker', 'www', 10.0, '/srv/worker --serve') for i in range(1000)]
+    table = wamr.ProcessTable.from_processes(many)
+    assert table.nbytes < 50 * len(table)
+
+
+def test_application_scan_keeps_every_process(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 200000, None),
+                      (11, 10, 'postgres', 100000, None), (20, 1, 'java', 600000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, view='app')
+    analyzer.get_applications(top_n=1)
+    table = analyzer.process_table
+    assert sorted(table.pid) == [1, 10, 11, 20]
+    assert table[table.top(1)[0]].name == 'java'
+    assert sorted(table.rows())[2] == (11, 10, 'postgres', 100000 / 1024, '')  # Users only for the top apps
@@ -0,0 +1,40 @@
+"""Per-stage timing instrumentation"""
+
+import wamr
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+
+
+def test_stages_hooks_and_ollama_durations():
+    profiler = wamr.Profiler()
+    seen = []
+    profiler.add_hook(lambda stage, wall, cpu: seen.append((stage, cpu is None)))
+    with profiler.stage('collect'):
+        sum(range(10000))
+    profiler.record_ollama({'load_duration': 5e8, 'eval_duration': 2e9, 'eval_count': 100, 'done': True})
+
+    assert seen == [('collect', False), ('ollama_load', True), ('ollama_eval', True)]
+    assert profiler.timings['ollama_eval'] == 2.0 and profiler.timings['collect'] > 0
+    result = profiler.to_dict()
+    assert result['stages']['ollama_load'] == {'wall_ms': 500.0, 'cpu_ms': None}
+    assert result['counters'] == {'eval_count': 100}
+
+    profiler.reset()
+    assert profiler.stages == {} and profiler.counters == {}
+
+
+def test_analysis_run_is_profiled(fake_ollama, capsys):
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.use_signatures = False
+    analyzer.client = fake_ollama({'summary': 'ok', 'high_priority': [], 'medium_priority': [],
+                                   'safe_to_ignore': []})
+    processes = [wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, 'postgres: main')]
+    assert analyzer.analyze_with_llm(mem_data=MEM, processes=processes)
+    assert {'prompt_build', 'http_connect', 'llm', 'parse'} <= set(analyzer.profiler.stages)
+    assert analyzer.profiler.counters['prompt_chars'] > 0
+
+    analyzer.profiler.record_ollama({'eval_duration': 2e9, 'eval_count': 100})
+    wamr.print_profile(analyzer.profiler)
+    err = capsys.readouterr().err
+    assert '(kept-alive connection reused)' in err
+    assert 'generated: 100 tokens (50.0 tokens/s)' in err
@@ -0,0 +1,125 @@
+"""Hedged model requests under a latency budget"""
+
+import json
+import sys
+import threading
+
+import pytest
+
+import wamr
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+PROCESSES = [wamr.ProcessInfo(10, 'myapp', 'www', 2500.0, '/srv/myapp'),
+             wamr.ProcessInfo(20, 'worker', 'www', 100.0, '/srv/worker')]
+ANSWER = {'summary': 'ok', 'high_priority': [], 'medium_priority': [],
+          'safe_to_ignore': [{'process': 'myapp', 'pid': 10, 'reason': 'r'}]}
+
+
+def test_model_stats_rank_and_persist(tmp_path):
+    path = str(tmp_path / 'models.json')
+    stats = wamr.ModelStats(path, history=3)
+    for latency in (9.0, 1.0, 2.0, 3.0):
+        stats.record('slow-but-sure', latency)
+    for latency in (0.5, None, 0.7):
+        stats.record('fast', latency)
+    for latency in (None, None, 0.1):
+        stats.record('flaky', latency)
+    assert stats.models['slow-but-sure'] == [1.0, 2.0, 3.0]
+    assert stats.median_latency('slow-but-sure') == 2.0 and stats.median_latency('new') is None
+    assert stats.success_rate('fast') == 2 / 3
+
+    models = ['flaky', 'new', 'slow-but-sure', 'fast']
+    assert stats.rank(models, deadline=5.0) == ['fast', 'slow-but-sure', 'new', 'flaky']
+    assert stats.rank(models, deadline=1.0) == ['fast', 'new', 'slow-but-sure', 'flaky']
+
+    stats.save()
+    assert wamr.ModelStats(path).models == stats.models
+    with open(path, 'w') as f:
+        f.write('not json')
+    assert wamr.ModelStats(path).models == {}
+
+
+class Reply:
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
+
+    def json(self):
+        return {'response': self.text, 'done': True}
+
+
+class ModelClient:
+    """OllamaClient stand-in: each model answers after its own delay unless cancelled"""
+    delays = {}
+    answers = {}
+    requests = []
+
+    def __init__(self, url='', keep_alive='10m'):
+        self.url = url
+        self.keep_alive = keep_alive
+        self._cancelled = threading.Event()
+
+    def generate(self, payload, stream=False, timeout=60):
+        model = payload['model']
+        ModelClient.requests.append(model)
+        if self._cancelled.wait(self.delays.get(model, 0.0)):
+            raise ConnectionAbortedError('cancelled')
+        return Reply(self.answers.get(model, json.dumps(ANSWER)))
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+@pytest.fixture
+def race(tmp_path, monkeypatch):
+    monkeypatch.setattr(wamr, 'OllamaClient', ModelClient)
+    monkeypatch.setattr(ModelClient, 'requests', [])
+
+    def configure(deadline, hedge, delays, answers=None, hedge_delay=0.05):
+        monkeypatch.setattr(ModelClient, 'delays', delays)
+        monkeypatch.setattr(ModelClient, 'answers', answers or {})
+        analyzer = wamr.MemoryAnalyzer()
+        analyzer.use_signatures = False
+        analyzer.client = ModelClient('http://ollama.invalid')
+        analyzer.deadline = deadline
+        analyzer.hedge_models = hedge
+        analyzer.hedge_delay = hedge_delay
+        analyzer.model_stats = wamr.ModelStats(str(tmp_path / 'models.json'))
+        return analyzer
+    return configure
+
+
+def test_hedge_model_wins_when_the_first_is_slow(race):
+    analyzer = race(deadline=2.0, hedge=['small'], delays={'big': 1.5, 'small': 0.0})
+    analysis = analyzer.analyze_with_llm(model='big', mem_data=MEM, processes=PROCESSES)
+    assert analysis['model'] == 'small' and analyzer.last_model == 'small'
+    assert ModelClient.requests == ['big', 'small']
+    assert analyzer.model_stats.models['big'] == [None]  # Lost the race
+    assert analyzer.model_stats.models['small'][0] < 0.5
+    assert analyzer.profiler.counters['models_tried'] == 2
+
+
+def test_a_failed_answer_starts_the_next_model_at_once(race):
+    analyzer = race(deadline=2.0, hedge=['small'], delays={}, answers={'big': 'not json'}, hedge_delay=10.0)
+    analysis = analyzer.analyze_with_llm(model='big', mem_data=MEM, processes=PROCESSES)
+    assert analysis['model'] == 'small'
+    assert analyzer.model_stats.models['big'] == [None]
+
+
+def test_no_answer_in_time_falls_back_to_heuristics(race):
+    analyzer = race(deadline=0.2, hedge=['small'], delays={'big': 5.0, 'small': 5.0})
+    analysis = analyzer.analyze_with_llm(model='big', mem_data=MEM, processes=PROCESSES)
+    assert analysis['source'] == 'heuristic' and analyzer.last_model is None
+    assert [entry['pid'] for entry in analysis['high_priority']] == [10]     # 31% of RAM
+    assert [entry['pid'] for entry in analysis['safe_to_ignore']] == [20]
+    assert analyzer.model_stats.models == {'big': [None], 'small': [None]}
+
+
+@pytest.mark.parametrize('flag', ['--stream', '--incremental'])
+def test_deadline_is_rejected_with(flag, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['wamr', '--deadline', '5s', flag])
+    with pytest.raises(SystemExit) as excinfo:
+        wamr.main()
+    assert excinfo.value.code == 2
+    assert f'--deadline: not allowed with argument {flag}' in capsys.readouterr().err
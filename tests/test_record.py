@@ -0,0 +1,106 @@
+"""wamr record's append-only file format and wamr replay"""
+
+import os
+
+import pytest
+
+import wamr
+
+
+def record(path, samples):
+    writer = wamr.SnapshotWriter(str(path))
+    try:
+        for timestamp, processes in samples:
+            writer.append(timestamp, {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0}, processes)
+    finally:
+        writer.close()
+
+
+PROCESSES = [
+    wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, 'postgres: main', pss_mb=700.0, uss_mb=650.0, swap_mb=1.5),
+    wamr.ProcessInfo(20, 'nginx', 'www', 120.0, 'nginx: worker'),
+]
+
+
+def test_record_round_trip(tmp_path):
+    path = tmp_path / 'wamr.rec'
+    record(path, [(1000.0, PROCESSES), (1010.0, PROCESSES[1:])])
+
+    reader = wamr.SnapshotReader(str(path))
+    try:
+        assert len(reader) == 2
+        assert list(reader.timestamps) == [1000.0, 1010.0]
+        first = wamr.validate_snapshot(reader.read(0))
+        assert first['memory']['used_mb'] == 6000.0
+        assert [(p['pid'], p['name'], p['user'], p['cmd']) for p in first['processes']] == [
+            (10, 'postgres', 'pg', 'postgres: main'), (20, 'nginx', 'www', 'nginx: worker')]
+        assert first['processes'][0]['pss_mb'] == 700.0
+        assert first['processes'][1]['pss_mb'] is None
+        assert [p['pid'] for p in reader.read(1)['processes']] == [20]
+        assert reader.find(1005.0) == 0
+        assert reader.find(1010.0) == 1
+        with pytest.raises(ValueError):
+            reader.find(999.0)
+    finally:
+        reader.close()
+
+
+def test_record_torn_tail_is_dropped_and_appending_continues(tmp_path):
+    path = tmp_path / 'wamr.rec'
+    record(path, [(1000.0, PROCESSES), (1010.0, PROCESSES)])
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)  # Crash mid-write of the second sample
+
+    reader = wamr.SnapshotReader(str(path))
+    assert len(reader) == 1
+    reader.close()
+
+    record(path, [(1020.0, PROCESSES + [wamr.ProcessInfo(30, 'redis', 'redis', 80.0, 'redis-server')])])
+    reader = wamr.SnapshotReader(str(path))
+    try:
+        assert list(reader.timestamps) == [1000.0, 1020.0]
+        assert [p['name'] for p in reader.read(1)['processes']] == ['postgres', 'nginx', 'redis']
+    finally:
+        reader.close()
+
+
+def test_record_rejects_other_files(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_text('not a recording\n')
+    with pytest.raises(ValueError):
+        wamr.SnapshotReader(str(path))
+    with pytest.raises(ValueError):
+        wamr.SnapshotWriter(str(path))
+
+
+def test_record_truncates_long_strings(tmp_path):
+    path = tmp_path / 'wamr.rec'
+    cmd = 'java -' + 'é' * 40000  # 80006 bytes of UTF-8, 2 per é
+    record(path, [(1000.0, [wamr.ProcessInfo(40, 'java', 'app', 900.0, cmd)])])
+
+    reader = wamr.SnapshotReader(str(path))
+    try:
+        stored = reader.read(0)['processes'][0]['cmd']
+    finally:
+        reader.close()
+    assert cmd.startswith(stored)
+    assert len(stored.encode('utf-8')) == 0xFFFF - 1  # Not cut mid-character
+
+
+def test_replay_lists_and_picks_samples(tmp_path, capsys):
+    path = tmp_path / 'wamr.rec'
+    record(path, [(1000.0, PROCESSES), (1010.0, PROCESSES[1:])])
+
+    wamr.replay_main([str(path), '--list'])
+    assert len(capsys.readouterr().out.splitlines()) == 2
+
+    wamr.replay_main([str(path), '--index', '0', '--no-llm'])
+    out = capsys.readouterr().out
+    assert 'postgres' in out and 'nginx' in out
+
+    wamr.replay_main([str(path), '--no-llm'])  # Latest sample by default
+    assert 'postgres' not in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        wamr.replay_main([str(path), '--index', '2'])
+    assert 'out of range' in capsys.readouterr().err
@@ -0,0 +1,83 @@
+"""Cross-process index of shared files and memory segments"""
+
+import os
+import re
+
+import wamr
+
+
+MAPS = b"""\
+55d0c0a00000-55d0c0a21000 r--p 00000000 08:01 131090 /usr/bin/python3.11
+7f1c2a000000-7f1c2e000000 rw-s 00000000 00:1a 7 /dev/shm/pool
+7f1c2e000000-7f1c2e200000 r-xp 00000000 08:01 262 /usr/lib/libc.so.6
+7f1c2e400000-7f1c2e600000 rw-p 00000000 00:00 0
+7ffd1c3f0000-7ffd1c411000 rw-p 00000000 00:00 0                          [stack]
+"""
+
+
+def test_read_maps(tmp_path):
+    path = tmp_path / 'maps'
+    path.write_bytes(MAPS)
+    mapped = wamr.read_maps(str(path), re.compile(wamr.MAPS_PATTERN, re.M))
+    assert mapped == {b'08:01 131090': b'/usr/bin/python3.11', b'00:1a 7': b'/dev/shm/pool',
+                      b'08:01 262': b'/usr/lib/libc.so.6'}
+    assert wamr.read_maps(str(tmp_path / 'gone'), re.compile(wamr.MAPS_PATTERN, re.M)) is None
+
+
+SYSVIPC = b"""\
+       key      shmid perms                  size  cpid  lpid nattch   uid   gid  cuid  cgid      atime      dtime      ctime                   rss                  swap
+         0          5   600              67108864    10    11      2     0     0     0     0          0          0          0              33554432                     0
+"""
+
+
+def test_read_sysv_shm(tmp_path):
+    (tmp_path / 'sysvipc').mkdir()
+    (tmp_path / 'sysvipc' / 'shm').write_bytes(SYSVIPC)
+    assert wamr.read_sysv_shm(str(tmp_path)) == {5: (65536.0, 32768.0)}
+    assert wamr.read_sysv_shm(str(tmp_path / 'gone')) == {}
+
+
+def test_index_counts_processes_per_object():
+    index = wamr.SharedMappingIndex()
+    index.add(10, {b'08:01 262': b'/usr/lib/libc.so.6', b'00:1a 7': b'/dev/shm/pool'})
+    index.add(11, {b'08:01 262': b'/usr/lib/libc.so.6'})
+    index.add(12, {b'08:01 262': b'/usr/lib/libc.so.6', b'08:01 99': b'/usr/bin/only-me'})
+    assert len(index) == 3
+    assert dict(zip(index.keys, index.nprocs)) == {
+        (b'08:01 262', b'/usr/lib/libc.so.6'): 3, (b'00:1a 7', b'/dev/shm/pool'): 1,
+        (b'08:01 99', b'/usr/bin/only-me'): 1}
+    assert index._mappers([0, 2]) == {0: 10, 2: 12}
+
+
+def test_get_shared_sizes_and_attributes_objects(fake_proc, tmp_path):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 200000, None),
+                      (11, 1, 'postgres', 100000, None), (12, 1, 'worker', 50000, None)])
+    os.mkdir(os.path.join(root, 'sysvipc'))
+    with open(os.path.join(root, 'sysvipc', 'shm'), 'wb') as f:
+        f.write(SYSVIPC)
+    data = tmp_path / 'table.dat'
+    data.write_bytes(b'x' * (1 << 20))
+    st = os.stat(data)
+    file_key = f"{os.major(st.st_dev):02x}:{os.minor(st.st_dev):02x} {st.st_ino}"
+
+    sysv = "7f0000000000-7f0004000000 rw-s 00000000 00:01 5 /SYSV00000000 (deleted)\n"
+    memfd = "7f1000000000-7f1000800000 rw-s 00000000 00:01 1025 /memfd:pool (deleted)\n"
+    mapped_file = f"7f2000000000-7f2000100000 r--s 00000000 {file_key} {data}\n"
+    own_lib = "7f3000000000-7f3000010000 r-xp 00000000 08:01 99 /usr/lib/libonly.so\n"
+    for pid, maps in ((10, sysv + memfd + mapped_file), (11, sysv + memfd + mapped_file), (12, memfd + own_lib)):
+        with open(os.path.join(root, str(pid), 'maps'), 'w') as f:
+            f.write(maps)
+        os.symlink('/', os.path.join(root, str(pid), 'root'))
+
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.get_processes()
+    shared = analyzer.get_shared(top_n=5)
+
+    assert [(obj.kind, obj.nprocs) for obj in shared] == [('sysv-shm', 2), ('shm', 3), ('file', 2)]
+    sysv_obj, memfd_obj, file_obj = shared
+    assert (sysv_obj.size_mb, sysv_obj.resident_mb, sysv_obj.per_process_mb) == (64.0, 32.0, 16.0)
+    assert sysv_obj.processes == ['postgres']
+    assert memfd_obj.size_mb == 8.0 and memfd_obj.resident_mb is None  # Sized from the mapping
+    assert file_obj.size_mb == 1.0 and file_obj.path == str(data)
+    assert sorted(pid for pid, _, _ in analyzer.shared_costs) == [10, 11]  # worker maps nothing resident
+    assert analyzer.shared_costs[0][1] == 'postgres' and analyzer.shared_costs[0][2] >= 16.0
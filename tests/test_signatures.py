@@ -0,0 +1,81 @@
+"""Local signatures for well-known processes"""
+
+import json
+
+import pytest
+
+import wamr
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+
+
+def test_match_by_name_command_and_specificity():
+    index = wamr.SignatureIndex(wamr.SIGNATURES)
+    assert index.match('sshd:', 'sshd: ann [priv]').reason.startswith('OpenSSH')
+    assert index.match('-bash', '-bash').reason.startswith('Interactive shell')
+    assert index.match('myapp', '/srv/myapp') is None
+    assert 'Elasticsearch' in index.match('java', '/usr/share/elasticsearch/jdk/bin/java -Xmx4g').reason
+    assert index.match('java', 'java -jar app.jar') is None
+
+    mine = wamr.Signature(('java',), 'safe_to_ignore', 'our batch job', cmd=('app.jar',))
+    index = wamr.SignatureIndex([mine] + list(wamr.SIGNATURES))
+    assert index.match('java', 'java -jar /srv/app.jar') is mine
+
+
+def test_classify_sends_anomalies_to_the_llm():
+    processes = [
+        wamr.ProcessInfo(10, 'postgres', 'postgres', 900.0, 'postgres: main'),
+        wamr.ProcessInfo(11, 'postgres', 'mallory', 900.0, 'postgres: main'),   # Wrong user
+        wamr.ProcessInfo(20, 'sshd', 'root', 5000.0, 'sshd: ann'),              # Over max_mb
+        wamr.ProcessInfo(21, 'sshd', 'root', 8.0, 'sshd: bob'),
+        wamr.ProcessInfo(22, 'sshd', 'root', 8.0, 'sshd: eve'),                 # Growing
+        wamr.ProcessInfo(30, 'myapp', 'www', 300.0, '/srv/myapp'),              # Unknown
+    ]
+    classified, rest = wamr.SignatureIndex(wamr.SIGNATURES).classify(processes, anomalous_pids=[22])
+    assert [entry['pid'] for entry in classified['medium_priority']] == [10]
+    assert classified['medium_priority'][0]['action'].startswith('Lower shared_buffers')
+    assert [entry['pid'] for entry in classified['safe_to_ignore']] == [21]
+    assert classified['safe_to_ignore'][0]['source'] == 'signature'
+    assert [proc.pid for proc in rest] == [11, 20, 22, 30]
+
+
+def test_load_signatures(tmp_path):
+    path = tmp_path / 'signatures.json'
+    path.write_text(json.dumps([{'name': 'myapp', 'bucket': 'safe_to_ignore', 'reason': 'ours',
+                                 'cmd': '--worker', 'max_mb': 512}]))
+    [sig] = wamr.load_signatures(str(path))
+    assert sig.names == ('myapp',) and sig.cmd == ('--worker',) and sig.max_mb == 512
+
+
+@pytest.mark.parametrize('data, message', [
+    ({}, 'expected a JSON list'),
+    (['myapp'], 'signature 0: expected an object'),
+    ([{'bucket': 'safe_to_ignore', 'reason': 'r'}], 'names is required'),
+    ([{'names': 'a', 'bucket': 'high_priority', 'reason': 'r'}], 'bucket must be one of'),
+    ([{'names': ['a', 1], 'bucket': 'safe_to_ignore', 'reason': 'r'}], 'names must be a string or a list'),
+    ([{'names': 'a', 'bucket': 'safe_to_ignore', 'reason': 'r', 'colour': 'red'}], 'signature 0:'),
+    ([{'names': 'a', 'bucket': 'safe_to_ignore', 'reason': 'r', 'max_mb': -1}], 'max_mb must be'),
+])
+def test_load_signatures_rejects(tmp_path, data, message):
+    path = tmp_path / 'signatures.json'
+    path.write_text(json.dumps(data))
+    with pytest.raises(ValueError) as excinfo:
+        wamr.load_signatures(str(path))
+    assert message in str(excinfo.value)
+
+
+def test_only_unknown_processes_reach_the_llm(fake_ollama):
+    processes = [wamr.ProcessInfo(10, 'postgres', 'postgres', 900.0, 'postgres: main'),
+                 wamr.ProcessInfo(30, 'myapp', 'www', 300.0, '/srv/myapp')]
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.client = fake_ollama({'summary': 'ok', 'high_priority': [], 'medium_priority': [],
+                                   'safe_to_ignore': [{'process': 'myapp', 'pid': 30, 'reason': 'r'}]})
+    analysis = analyzer.analyze_with_llm(mem_data=MEM, processes=processes)
+    prompt = analyzer.client.payloads[0]['prompt']
+    assert 'myapp' in prompt and 'postgres: main' not in prompt
+    assert analysis['medium_priority'][0]['source'] == 'signature'
+
+    analyzer.offline = True
+    local = analyzer.analyze_with_llm(mem_data=MEM, processes=processes)
+    assert len(analyzer.client.payloads) == 1 and analyzer.last_local_only
+    assert local['unclassified'][0]['process'] == 'myapp'
@@ -0,0 +1,82 @@
+"""Streamed Ollama responses and progressive rendering"""
+
+import json
+
+import pytest
+
+import wamr
+
+TEXT = ('{"summary": "a \\" } b", "high_priority": [{"process": "x", "pid": 1}, {"process": "y"}], '
+        '"total_reclaimable_mb": 5}')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, len(TEXT)])
+def test_parser_reports_parts_as_they_complete(chunk_size):
+    parser = wamr.StreamingJSONParser()
+    events = []
+    for i in range(0, len(TEXT), chunk_size):
+        events += parser.feed(TEXT[i:i + chunk_size])
+    assert events == [('summary', 'a " } b'), ('high_priority', {'process': 'x', 'pid': 1}),
+                      ('high_priority', {'process': 'y'}), ('total_reclaimable_mb', 5)]
+    assert parser.finished == ['summary', 'high_priority', 'total_reclaimable_mb']
+    assert parser.unfinished is None
+    assert json.loads(parser.text) == json.loads(TEXT)
+
+
+def test_parser_with_a_cut_off_stream():
+    parser = wamr.StreamingJSONParser()
+    events = parser.feed('{"summary": "x", "high_priority": [{"a": 1}, {"b')
+    assert events == [('summary', 'x'), ('high_priority', {'a': 1})]
+    assert parser.unfinished == 'high_priority'
+
+
+MEM = {'total_mb': 8000.0, 'used_mb': 6000.0, 'free_mb': 2000.0, 'used_percent': 75.0}
+PROCESSES = [wamr.ProcessInfo(10, 'postgres', 'pg', 900.0, 'postgres: main'),
+             wamr.ProcessInfo(20, 'nginx', 'www', 120.0, 'nginx: worker')]
+ANSWER = {
+    'summary': 'busy',
+    'high_priority': [
+        {'process': 'postgres', 'pid': 99, 'memory_mb': 900, 'reason': 'big', 'action': 'tune'},  # Wrong PID
+        {'process': 'ghost', 'pid': 77, 'memory_mb': 50, 'reason': 'made up', 'action': 'none'},
+    ],
+    'medium_priority': [],
+    'safe_to_ignore': [{'process': 'nginx', 'pid': 20, 'memory_mb': 120, 'reason': 'normal'}],
+}
+
+
+def test_streamed_analysis_is_rendered_then_corrected(fake_ollama, capsys):
+    analyzer = wamr.MemoryAnalyzer()
+    analyzer.use_signatures = False
+    analyzer.client = fake_ollama(ANSWER)
+    renderer = wamr.StreamingRenderer(MEM)
+    events = []
+
+    def on_event(key, value):
+        events.append(key)
+        renderer.on_event(key, value)
+
+    analysis = analyzer.analyze_with_llm(mem_data=MEM, processes=PROCESSES, on_event=on_event)
+    assert analyzer.client.payloads[0]['stream'] is True
+    assert events == ['summary', 'high_priority', 'high_priority', 'safe_to_ignore']  # Empty lists have no items
+    assert renderer.first_output_s is not None
+    streamed = capsys.readouterr().out
+    assert 'ghost' in streamed and 'postgres' in streamed
+
+    renderer.finish(analysis)
+    finished = capsys.readouterr().out
+    assert '✗ ghost (PID 77) in 🔴 HIGH PRIORITY: dropped, no such process' in finished
+    assert '✎ postgres (PID 99) in 🔴 HIGH PRIORITY: is postgres (PID 10, 900.0 MB)' in finished
+    assert '• postgres' not in finished and '• nginx' not in finished  # Not printed twice
+    assert 'nginx (PID 20)' not in finished  # Unchanged by validation
+
+
+def test_finish_prints_what_was_not_streamed(capsys):
+    renderer = wamr.StreamingRenderer(MEM)
+    renderer.on_event('summary', 'all fine')
+    analysis = {'summary': 'all fine', 'high_priority': [], 'medium_priority': [],
+                'safe_to_ignore': [{'process': 'sshd', 'pid': 5, 'memory_mb': 8.0, 'reason': 'local signature'}]}
+    renderer.finish(analysis)
+    out = capsys.readouterr().out
+    assert out.count('all fine') == 1
+    assert '🟢 SAFE TO IGNORE (1 processes)' in out and '• sshd' in out
+    assert 'Corrected' not in out
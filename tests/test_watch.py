@@ -0,0 +1,72 @@
+"""--watch: cached per-PID static data and the sample ring buffer"""
+
+import argparse
+import json
+import os
+
+import wamr
+
+
+def restart(root, pid, name, start_time):
+    """Replace pid with a new process, as when a PID is reused"""
+    directory = os.path.join(root, str(pid))
+    with open(os.path.join(directory, 'stat')) as f:
+        fields = f.read().split()
+    fields[1] = f'({name})'
+    fields[21] = str(start_time)
+    with open(os.path.join(directory, 'stat'), 'w') as f:
+        f.write(' '.join(fields) + '\n')
+    with open(os.path.join(directory, 'cmdline'), 'wb') as f:
+        f.write(f"/usr/bin/{name}\0".encode())
+
+
+def test_static_data_is_cached_by_pid_and_start_time(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 800000, None),
+                      (20, 1, 'java', 600000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.cache_static = True
+    analyzer.sample(top_n=5)
+    assert set(analyzer._static_cache) == {1, 10, 20}
+
+    # Unchanged process: its cmdline isn't read again
+    with open(os.path.join(root, '10', 'cmdline'), 'wb') as f:
+        f.write(b'/usr/bin/renamed\0')
+    restart(root, 20, 'redis', 99999)
+    _, processes = analyzer.sample(top_n=5)
+    assert [proc.name for proc in processes] == ['postgres', 'redis', 'init']
+
+    os.rename(os.path.join(root, '20'), os.path.join(root, 'gone'))
+    analyzer.sample(top_n=5)
+    assert set(analyzer._static_cache) == {1, 10}  # Exited
+
+
+def test_samples_go_into_a_bounded_ring_buffer(fake_proc):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 800000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    for _ in range(wamr.WATCH_HISTORY + 5):
+        analyzer.sample(top_n=1)
+    assert len(analyzer.samples) == wamr.WATCH_HISTORY
+    assert analyzer.samples[-1].top == ((10, 800000 / 1024),)
+
+
+def test_watch_prints_each_sample(fake_proc, fake_ollama, monkeypatch, capsys):
+    root = fake_proc([(1, 0, 'init', 4096, None), (10, 1, 'postgres', 800000, None)])
+    analyzer = wamr.MemoryAnalyzer(proc_root=root, backend='proc')
+    analyzer.client = fake_ollama()
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(wamr.time, 'sleep', sleep)
+    args = argparse.Namespace(watch=5.0, leak_slope=10.0, no_llm=True, no_warmup=True, offline=False,
+                              model='m', cgroups=False, mappings=0, kernel=False, shared=0, json=True,
+                              view='process', accounting='rss', profile=False)
+    wamr.watch(analyzer, args)
+
+    samples = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+    assert len(samples) == 3 and samples[0]['memory']['total_mb'] == 8000.0
+    assert all(0 < seconds <= 5.0 for seconds in sleeps)
+    assert analyzer.cache_static and analyzer.client.keep_alive == '600s'
+    assert len(analyzer.samples) == 3
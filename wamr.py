@@ -3,437 +3,5345 @@
 WhoAteMyRAM - LLM-powered memory analysis tool
 """
 
+from __future__ import annotations
+
 import sys
-import subprocess
-import json
 import time
 import os
-import platform
-from dataclasses import dataclass
-from typing import List, Dict, Optional
-from pathlib import Path
-
-@dataclass
-class ProcessInfo:
-    pid: int
-    name: str
-    user: str
-    rss_mb: float
-    cmd: str
+import heapq
+import struct
+import math
+from array import array
+from collections import deque, namedtuple
+
+# Everything else is imported where it's used, so quick modes such as
+# --no-llm don't pay for subprocess, threading, http.client and friends
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Dict, Optional, Tuple, Iterable, Callable, Collection
+
+# Size of a memory page in KB, used to convert /proc/<pid>/statm counts
+try:
+    PAGE_SIZE_KB = os.sysconf('SC_PAGE_SIZE') / 1024
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE_KB = 4.0
+
+# Process collection backends: 'proc' reads /proc directly, 'ps' forks ps(1)
+BACKENDS = ('auto', 'proc', 'ps')
+
+# Memory accounting modes: plain RSS, or PSS/USS from smaps_rollup
+ACCOUNTING_MODES = ('rss', 'pss')
+
+# In pss mode, this many RSS-ranked candidates per requested process are
+# read from smaps_rollup before re-ranking by PSS
+PSS_CANDIDATE_FACTOR = 2
+
+# Prompt views: one entry per process, or per application (process tree)
+VIEWS = ('process', 'app')
+
+# Number of samples --watch keeps in memory (one hour at 10s intervals)
+WATCH_HISTORY = 360
+
+# Bump whenever the prompt changes, so cached analyses aren't reused
+PROMPT_VERSION = 3
+
+# Incremental analysis: send a full prompt again after this many deltas
+# or once the last full one is this old, and report processes whose
+# memory moved by at least DELTA_MIN_MB and DELTA_MIN_RATIO
+INCREMENTAL_FULL_EVERY = 10
+INCREMENTAL_MAX_AGE = 3600
+DELTA_MIN_MB = 10.0
+DELTA_MIN_RATIO = 0.1
+
+OLLAMA_URL = 'http://localhost:11434'
+
+# Format version written by --snapshot and read by wamr batch
+SNAPSHOT_VERSION = 1
+
+# wamr record file layout: magic, then (tag, length) framed blocks
+RECORD_MAGIC = b'WAMRREC1'
+_BLOCK_HEADER = struct.Struct('<cI')
+_STRING_HEADER = struct.Struct('<H')
+_STRING_MAX = 0xFFFF                      # Longest string _STRING_HEADER can count, in bytes
+_SAMPLE_HEADER = struct.Struct('<dfffI')  # timestamp, total/used/free MB, count
+_SAMPLE_COLUMNS = 'IIIIffff'              # pid, name/user/cmd ids, rss/pss/uss/swap
+
+
+class _Record:
+    """Base of wamr's record types, whose fields are their __slots__
+    
+    Plain classes rather than dataclasses: importing dataclasses (and
+    inspect with it) took longer than the rest of wamr's startup.
+    """
+    __slots__ = ()
+    
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+    
+    def __repr__(self):
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def asdict(record: _Record) -> Dict:
+    """A record's fields as a new dict (lists and dicts copied)"""
+    return {key: type(value)(value) if isinstance(value, (list, dict)) else value
+            for key, value in ((key, getattr(record, key)) for key in record.__slots__)}
+
+
+class ProcessInfo(_Record):
+    __slots__ = ('pid', 'name', 'user', 'rss_mb', 'cmd', 'pss_mb', 'uss_mb', 'swap_mb')
+    
+    def __init__(self, pid: int, name: str, user: str, rss_mb: float, cmd: str,
+                 pss_mb: Optional[float] = None, uss_mb: Optional[float] = None,
+                 swap_mb: Optional[float] = None):
+        self.pid = pid
+        self.name = name
+        self.user = user
+        self.rss_mb = rss_mb
+        self.cmd = cmd
+        self.pss_mb = pss_mb     # Proportional share, shared pages split
+        self.uss_mb = uss_mb     # Private_Clean + Private_Dirty
+        self.swap_mb = swap_mb
+    
+    @property
+    def mem_mb(self) -> float:
+        """PSS when it was collected, otherwise RSS"""
+        return self.pss_mb if self.pss_mb is not None else self.rss_mb
     
     def __repr__(self):
         return f"ProcessInfo(pid={self.pid}, name={self.name}, rss_mb={self.rss_mb:.1f}MB)"
 
 
-class MemoryAnalyzer:
+class AppInfo(_Record):
+    """An application: a same-named process tree, with summed memory"""
+    __slots__ = ('name', 'pid', 'user', 'count', 'rss_mb', 'cmd', 'pss_mb', 'pids')
+    
+    def __init__(self, name: str, pid: int, user: str, count: int, rss_mb: float, cmd: str = '',
+                 pss_mb: Optional[float] = None, pids: Optional[List[int]] = None):
+        self.name = name
+        self.pid = pid           # Root of the tree
+        self.user = user
+        self.count = count
+        self.rss_mb = rss_mb
+        self.cmd = cmd
+        self.pss_mb = pss_mb
+        self.pids = pids if pids is not None else []
+    
+    @property
+    def mem_mb(self) -> float:
+        """PSS when it was collected, otherwise RSS"""
+        return self.pss_mb if self.pss_mb is not None else self.rss_mb
+
+
+class ProcessTable:
+    """Processes stored column-wise, with names, users and commands interned
+    
+    Each row costs a few dozen bytes of array storage instead of a
+    ProcessInfo plus its strings, which matters for whole-system scans
+    of thousands of processes. The columns mirror wamr record's sample
+    layout (plus ppid); pss/uss/swap are NaN when not collected.
+    Operations work on row indices and raw column values; indexing or
+    iterating gives ProcessInfo views for code that wants objects.
+    """
+    
+    NUMERIC = ('pid', 'ppid', 'rss_mb', 'pss_mb', 'uss_mb', 'swap_mb')
+    STRINGS = ('name', 'user', 'cmd')
+    
+    def __init__(self, strings: Optional[List[str]] = None):
+        self.pid = array('I')
+        self.ppid = array('I')
+        self.name = array('I')     # String ids
+        self.user = array('I')
+        self.cmd = array('I')
+        self.rss_mb = array('f')
+        self.pss_mb = array('f')
+        self.uss_mb = array('f')
+        self.swap_mb = array('f')
+        # Shared with tables made by take(), so ids stay valid across them
+        self.strings: List[str] = strings if strings is not None else []
+        self._ids: Dict[str, int] = {text: i for i, text in enumerate(self.strings)}
+    
+    @classmethod
+    def from_processes(cls, processes: Iterable[ProcessInfo]) -> 'ProcessTable':
+        table = cls()
+        for proc in processes:
+            table.append(proc.pid, proc.name, proc.user, proc.rss_mb, proc.cmd,
+                         pss_mb=proc.pss_mb, uss_mb=proc.uss_mb, swap_mb=proc.swap_mb)
+        return table
+    
+    def intern(self, text: str) -> int:
+        """Id of a string, adding it to the table's string list if new"""
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+    
+    def append(self, pid: int, name: str, user: str, rss_mb: float, cmd: str = '', ppid: int = 0,
+               pss_mb: Optional[float] = None, uss_mb: Optional[float] = None,
+               swap_mb: Optional[float] = None):
+        nan = math.nan
+        self.pid.append(pid)
+        self.ppid.append(ppid)
+        self.name.append(self.intern(name))
+        self.user.append(self.intern(user))
+        self.cmd.append(self.intern(cmd))
+        self.rss_mb.append(rss_mb)
+        self.pss_mb.append(nan if pss_mb is None else pss_mb)
+        self.uss_mb.append(nan if uss_mb is None else uss_mb)
+        self.swap_mb.append(nan if swap_mb is None else swap_mb)
+    
+    def __len__(self) -> int:
+        return len(self.pid)
+    
+    def __getitem__(self, i: int) -> ProcessInfo:
+        """Row i as a ProcessInfo (a new object; changing it doesn't change the table)"""
+        def optional(value: float) -> Optional[float]:
+            return None if math.isnan(value) else value
+        
+        strings = self.strings
+        return ProcessInfo(pid=self.pid[i], name=strings[self.name[i]], user=strings[self.user[i]],
+                           rss_mb=self.rss_mb[i], cmd=strings[self.cmd[i]], pss_mb=optional(self.pss_mb[i]),
+                           uss_mb=optional(self.uss_mb[i]), swap_mb=optional(self.swap_mb[i]))
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+    
+    def rows(self) -> Iterable[Tuple[int, int, str, float, str]]:
+        """(pid, ppid, name, rss_mb, user) per row, as aggregate_processes takes them"""
+        strings = self.strings
+        return ((pid, ppid, strings[name], rss_mb, strings[user])
+                for pid, ppid, name, rss_mb, user in zip(self.pid, self.ppid, self.name, self.rss_mb, self.user))
+    
+    @property
+    def mem_mb(self) -> array:
+        """PSS where collected, otherwise RSS, per row"""
+        return array('f', (rss if math.isnan(pss) else pss for rss, pss in zip(self.rss_mb, self.pss_mb)))
+    
+    def _column(self, column: str):
+        if column == 'mem_mb':
+            return self.mem_mb
+        if column not in self.NUMERIC and column not in self.STRINGS:
+            raise ValueError(f"unknown column '{column}'")
+        return getattr(self, column)
+    
+    def order(self, column: str = 'mem_mb', reverse: bool = True) -> List[int]:
+        """Row indices sorted by a column (strings sort by text)"""
+        values = self._column(column)
+        if column in self.STRINGS:
+            strings = self.strings
+            return sorted(range(len(self)), key=lambda i: strings[values[i]], reverse=reverse)
+        return sorted(range(len(self)), key=values.__getitem__, reverse=reverse)
+    
+    def top(self, n: int, column: str = 'mem_mb') -> List[int]:
+        """Indices of the n rows with the largest values, largest first"""
+        values = self._column(column)
+        return heapq.nlargest(n, range(len(self)), key=values.__getitem__)
+    
+    def select(self, column: str, predicate: Callable[[object], bool]) -> List[int]:
+        """Indices of the rows whose column value satisfies predicate
+        
+        For string columns predicate gets the text, and is called once
+        per distinct string rather than once per row.
+        """
+        values = self._column(column)
+        if column in self.STRINGS:
+            strings = self.strings
+            verdicts: Dict[int, bool] = {}
+            result = []
+            for i, string_id in enumerate(values):
+                verdict = verdicts.get(string_id)
+                if verdict is None:
+                    verdict = verdicts[string_id] = bool(predicate(strings[string_id]))
+                if verdict:
+                    result.append(i)
+            return result
+        return [i for i, value in enumerate(values) if predicate(value)]
+    
+    def take(self, indices: Iterable[int]) -> 'ProcessTable':
+        """A new table with the given rows, in that order, sharing this table's strings"""
+        table = ProcessTable(self.strings)
+        table._ids = self._ids
+        indices = list(indices)
+        for column in self.NUMERIC + self.STRINGS:
+            values = getattr(self, column)
+            setattr(table, column, array(values.typecode, (values[i] for i in indices)))
+        return table
+    
+    def group_by(self, column: str = 'name') -> Dict[str, Tuple[int, float]]:
+        """(row count, total mem_mb) per distinct value of a string column"""
+        if column not in self.STRINGS:
+            raise ValueError(f"can only group by {', '.join(self.STRINGS)}")
+        groups: Dict[int, List[float]] = {}
+        for string_id, mem in zip(getattr(self, column), self.mem_mb):
+            group = groups.get(string_id)
+            if group is None:
+                groups[string_id] = [1, mem]
+            else:
+                group[0] += 1
+                group[1] += mem
+        return {self.strings[string_id]: (int(count), total) for string_id, (count, total) in groups.items()}
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns (not counting the shared strings)"""
+        return sum(getattr(self, c).itemsize * len(self) for c in self.NUMERIC + self.STRINGS)
+
+
+def aggregate_processes(rows: Iterable[Tuple[int, int, str, float, str]]) -> List[AppInfo]:
+    """Group (pid, ppid, name, rss_mb, user) rows into applications, largest first
+    
+    A process belongs to the application rooted at its topmost ancestor
+    with the same executable name, so chrome's renderers or gunicorn's
+    workers fold into one entry while unrelated same-named trees stay apart.
+    """
+    rows = list(rows)
+    parents = {pid: (ppid, name) for pid, ppid, name, _, _ in rows}
+    roots: Dict[int, int] = {}
+    
+    for pid, _, name, _, _ in rows:
+        path = []
+        current = pid
+        while current not in roots:
+            path.append(current)
+            ppid = parents[current][0]
+            parent = parents.get(ppid)
+            if parent is None or parent[1] != name or ppid in path:
+                roots[current] = current
+                break
+            current = ppid
+        root = roots[current]
+        for member in path:
+            roots[member] = root
+    
+    apps: Dict[int, AppInfo] = {}
+    users = {pid: user for pid, _, _, _, user in rows}
+    for pid, _, name, rss_mb, _ in rows:
+        root = roots[pid]
+        app = apps.get(root)
+        if app is None:
+            app = apps[root] = AppInfo(name=name, pid=root, user=users[root], count=0, rss_mb=0.0)
+        app.count += 1
+        app.rss_mb += rss_mb
+        app.pids.append(pid)
+    
+    return sorted(apps.values(), key=lambda a: a.rss_mb, reverse=True)
+
+
+class CgroupInfo(_Record):
+    """Memory charged to one cgroup v2 group (a systemd unit or container)"""
+    __slots__ = ('path', 'label', 'current_mb', 'max_mb', 'anon_mb', 'file_mb', 'kernel_mb', 'shmem_mb',
+                 'nprocs', 'top_processes')
+    
+    def __init__(self, path: str, label: str, current_mb: float, max_mb: Optional[float] = None,
+                 anon_mb: float = 0.0, file_mb: float = 0.0, kernel_mb: float = 0.0, shmem_mb: float = 0.0,
+                 nprocs: int = 0, top_processes: Optional[List[str]] = None):
+        self.path = path                 # Relative to the cgroup root, e.g. system.slice/docker-<id>.scope
+        self.label = label               # Short name: docker:<id>, pod:<uid> or the last path component
+        self.current_mb = current_mb
+        self.max_mb = max_mb             # None when unlimited
+        self.anon_mb = anon_mb
+        self.file_mb = file_mb           # Page cache charged to this cgroup
+        self.kernel_mb = kernel_mb
+        self.shmem_mb = shmem_mb
+        self.nprocs = nprocs
+        self.top_processes = top_processes if top_processes is not None else []
+
+
+class MappingBreakdown(_Record):
+    """One process's memory split by mapping type, from /proc/<pid>/smaps"""
+    __slots__ = ('pid', 'name', 'categories', 'mappings', 'complete')
+    
+    def __init__(self, pid: int, name: str, categories: Dict[str, Dict[str, float]],
+                 mappings: int = 0, complete: bool = True):
+        self.pid = pid
+        self.name = name
+        self.categories = categories     # Category -> rss_mb, pss_mb, swap_mb
+        self.mappings = mappings
+        self.complete = complete         # False when the time budget ran out mid-file
+
+
+class KernelMemory(_Record):
+    """Memory the kernel holds outside any process's RSS, and reclaim activity"""
+    __slots__ = ('categories', 'process_rss_mb', 'unattributed_mb', 'reclaim', 'zram', 'slab_top')
+    
+    def __init__(self, categories: Dict[str, float], process_rss_mb: float, unattributed_mb: float,
+                 reclaim: Dict[str, int], zram: Dict[str, float], slab_top: Optional[List[List]] = None):
+        self.categories = categories             # MB per KERNEL_CATEGORIES entry, from /proc/meminfo
+        self.process_rss_mb = process_rss_mb     # RSS summed over every process
+        self.unattributed_mb = unattributed_mb   # System used minus process_rss_mb (never negative)
+        self.reclaim = reclaim                   # VMSTAT_COUNTERS since boot; empty if /proc/vmstat is unreadable
+        self.zram = zram                         # orig_mb, compressed_mb, used_mb over all zram devices
+        # [cache, MB] of the largest slab caches; empty if slabinfo is unreadable
+        self.slab_top = slab_top if slab_top is not None else []
+
+
+class SharedMapping(_Record):
+    """A file or shared memory segment mapped by several processes"""
+    __slots__ = ('path', 'kind', 'device', 'inode', 'nprocs', 'size_mb', 'resident_mb', 'per_process_mb',
+                 'processes')
+    
+    def __init__(self, path: str, kind: str, device: str, inode: int, nprocs: int, size_mb: float,
+                 resident_mb: Optional[float], per_process_mb: Optional[float],
+                 processes: Optional[List[str]] = None):
+        self.path = path
+        self.kind = kind                         # 'library', 'shm', 'sysv-shm' or 'file'
+        self.device = device
+        self.inode = inode
+        self.nprocs = nprocs                     # Processes mapping it
+        self.size_mb = size_mb                   # File or segment size (mapped size for unnamed objects)
+        self.resident_mb = resident_mb           # In RAM (page cache or shm); None if it couldn't be measured
+        self.per_process_mb = per_process_mb     # resident_mb split evenly between the processes mapping it
+        self.processes = processes if processes is not None else []  # Names of a few of them
+
+
+def cgroup_label(path: str) -> str:
+    """Short name for a cgroup path, recognising Docker and Kubernetes"""
+    name = path.rstrip('/').rsplit('/', 1)[-1] or '/'
+    for prefix in ('docker-', 'cri-containerd-', 'crio-', 'libpod-'):
+        if name.startswith(prefix) and name.endswith('.scope'):
+            return f"{prefix.rstrip('-')}:{name[len(prefix):-6][:12]}"
+    if '/docker/' in f"/{path}":
+        return f"docker:{name[:12]}"
+    if 'kubepods' in path and name.startswith(('kubepods-', 'pod')) and 'pod' in name:
+        return f"pod:{name.rsplit('pod', 1)[-1].replace('.slice', '')[:12]}"
+    return name
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Checks for the annotations used on snapshot record fields
+_FIELD_CHECKS = {
+    'str': lambda v: isinstance(v, str),
+    'int': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'float': _is_number,
+    'bool': lambda v: isinstance(v, bool),
+    'Optional[float]': lambda v: v is None or _is_number(v),
+}
+
+
+def _validate_record(entry, where: str, record_type) -> Dict:
+    """Check a snapshot object holds valid record_type fields and return it
+    
+    Fields, defaults and types come from record_type's __init__ signature.
+    """
+    import inspect
+    
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where} is not an object")
+    known = inspect.signature(record_type).parameters
+    unknown = sorted(set(entry) - set(known))
+    if unknown:
+        raise ValueError(f"{where} has unknown field '{unknown[0]}'")
+    for name, param in known.items():
+        if name not in entry:
+            if param.default is param.empty:
+                raise ValueError(f"{where} is missing '{name}'")
+            continue
+        annotation = param.annotation
+        if annotation.startswith('Optional[') and annotation != 'Optional[float]':
+            annotation = annotation[9:-1]  # List defaults are None in the signature, never in snapshots
+        check = _FIELD_CHECKS.get(annotation)
+        if check is not None:
+            ok = check(entry[name])
+        else:
+            # Dict[...] and List[...] fields: only the container is checked
+            ok = isinstance(entry[name], dict if annotation.startswith('Dict') else list)
+        if not ok:
+            raise ValueError(f"{where}.{name} must be {annotation}")
+    return entry
+
+
+def _validate_records(entries, section: str, record_type) -> List[Dict]:
+    if entries is None:
+        return []
+    if not isinstance(entries, list):
+        raise ValueError(f"'{section}' must be a list")
+    return [_validate_record(entry, f"{section}[{i}]", record_type) for i, entry in enumerate(entries)]
+
+
+def validate_snapshot(data) -> Dict:
+    """Check a snapshot's structure and return it normalised
+    
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("snapshot is not a JSON object")
+    
+    memory = data.get('memory')
+    if not isinstance(memory, dict):
+        raise ValueError("missing 'memory' object")
+    mem_data = {}
+    for key in ('total_mb', 'used_mb', 'free_mb'):
+        value = memory.get(key)
+        if not _is_number(value) or value < 0:
+            raise ValueError(f"memory.{key} must be a non-negative number")
+        mem_data[key] = float(value)
+    if mem_data['total_mb'] <= 0:
+        raise ValueError("memory.total_mb must be positive")
+    mem_data['used_percent'] = float(memory.get('used_percent', mem_data['used_mb'] / mem_data['total_mb'] * 100))
+    
+    processes = data.get('processes')
+    if not isinstance(processes, list):
+        raise ValueError("missing 'processes' list")
+    procs = []
+    for i, proc in enumerate(processes):
+        if not isinstance(proc, dict):
+            raise ValueError(f"processes[{i}] is not an object")
+        if not isinstance(proc.get('pid'), int) or not isinstance(proc.get('name'), str):
+            raise ValueError(f"processes[{i}] needs an integer pid and a string name")
+        if not _is_number(proc.get('rss_mb')) or proc['rss_mb'] < 0:
+            raise ValueError(f"processes[{i}].rss_mb must be a non-negative number")
+        # smaps_rollup figures come together: all three or none
+        rollup = [proc.get(key) for key in ('pss_mb', 'uss_mb', 'swap_mb')]
+        if any(value is not None for value in rollup) and \
+                not all(_is_number(value) and value >= 0 for value in rollup):
+            raise ValueError(f"processes[{i}] needs non-negative pss_mb, uss_mb and swap_mb together")
+        procs.append({
+            'pid': proc['pid'],
+            'name': proc['name'],
+            'user': str(proc.get('user', '')),
+            'rss_mb': float(proc['rss_mb']),
+            'cmd': str(proc.get('cmd', ''))[:100],
+            'pss_mb': proc.get('pss_mb'),
+            'uss_mb': proc.get('uss_mb'),
+            'swap_mb': proc.get('swap_mb'),
+        })
+    
+    kernel = data.get('kernel')
+    if kernel is not None:
+        kernel = _validate_record(kernel, 'kernel', KernelMemory)
+    shared_costs = data.get('shared_costs') or []
+    if not isinstance(shared_costs, list) or not all(
+            isinstance(cost, list) and len(cost) == 3 and _is_number(cost[0])
+            and isinstance(cost[1], str) and _is_number(cost[2]) for cost in shared_costs):
+        raise ValueError("'shared_costs' must be a list of [pid, name, MB]")
+    
+    return {
+        'version': data.get('version', SNAPSHOT_VERSION),
+        'host': str(data.get('host', '')),
+        'timestamp': data.get('timestamp'),
+        'memory': mem_data,
+        'processes': procs,
+        'cgroups': _validate_records(data.get('cgroups'), 'cgroups', CgroupInfo),
+        'mappings': _validate_records(data.get('mappings'), 'mappings', MappingBreakdown),
+        'kernel': kernel,
+        'shared': _validate_records(data.get('shared'), 'shared', SharedMapping),
+        'shared_costs': shared_costs,
+    }
+
+
+def load_snapshot(path: str) -> Dict:
+    """Read and validate a snapshot file written by --snapshot"""
+    import json
+    
+    with open(path, 'r') as f:
+        snapshot = validate_snapshot(json.load(f))
+    if not snapshot['host']:
+        snapshot['host'] = os.path.splitext(os.path.basename(path))[0]
+    return snapshot
+
+
+# One --watch sample, kept compact for the in-memory ring buffer;
+# top is a tuple of (pid, mem_mb) pairs
+Sample = namedtuple('Sample', ['timestamp', 'used_mb', 'top'])
+
+
+def read_smaps_rollup(path: str) -> Optional[Tuple[float, float, float]]:
+    """Parse (pss_mb, uss_mb, swap_mb) from a /proc/<pid>/smaps_rollup file"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None  # Exited, or not ours to read
+    
+    pss = private = swap = 0
+    for line in data.split(b'\n'):
+        if line.startswith(b'Pss:'):
+            pss = int(line.split()[1])
+        elif line.startswith((b'Private_Clean:', b'Private_Dirty:')):
+            private += int(line.split()[1])  # Not Private_Hugetlb, which isn't in Rss
+        elif line.startswith(b'Swap:'):
+            swap = int(line.split()[1])
+    return pss / 1024, private / 1024, swap / 1024
+
+
+MAPPING_CATEGORIES = ('heap', 'anon', 'stack', 'shmem', 'file', 'other')
+
+# A mapping's header line (perms and path), or one of the three fields we sum
+SMAPS_PATTERN = rb'^[0-9a-f]+-[0-9a-f]+ (\S+) \S+ \S+ \d+ *(.*)$|^(Rss|Pss|Swap): +(\d+)'
+
+
+def _mapping_category(perms: bytes, path: bytes) -> str:
+    """Which MAPPING_CATEGORIES entry a mapping belongs to"""
+    if not path:
+        return 'shmem' if perms[3:4] == b's' else 'anon'
+    if path == b'[heap]':
+        return 'heap'
+    if path.startswith(b'[stack'):
+        return 'stack'
+    if path.startswith(b'[anon_shmem:'):
+        return 'shmem'
+    if path.startswith(b'[anon:'):
+        return 'anon'  # Named with PR_SET_VMA_ANON_NAME
+    if path.startswith(b'['):
+        return 'other'  # [vdso], [vvar], [vsyscall]
+    if path.startswith((b'/dev/shm/', b'/memfd:', b'/SYSV', b'/dev/zero')):
+        return 'shmem'
+    return 'file'
+
+
+def read_smaps(path: str, deadline: float,
+               chunk_size: int = 1 << 20) -> Optional[Tuple[Dict[str, List[int]], int, bool]]:
+    """Sum Rss/Pss/Swap (kB) per mapping category from a /proc/<pid>/smaps file
+    
+    Returns (totals, mappings, complete). The file is read in chunks and
+    scanned with one regex, so only headers and the three fields we need
+    become Python objects, never the ~20 other lines of each mapping.
+    Stops at the end of the chunk where time.monotonic() passes deadline.
+    """
+    import re
+    
+    pattern = re.compile(SMAPS_PATTERN, re.M)
+    fields = {b'Rss': 0, b'Pss': 1, b'Swap': 2}
+    totals: Dict[str, List[int]] = {}
+    by_header: Dict[Tuple[bytes, bytes], List[int]] = {}
+    current = [0, 0, 0]
+    mappings = 0
+    complete = True
+    try:
+        with open(path, 'rb') as f:
+            tail = b''
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                chunk = tail + chunk
+                end = chunk.rfind(b'\n') + 1
+                tail = chunk[end:]
+                for perms, name, key, value in pattern.findall(chunk, 0, end):
+                    if key:
+                        current[fields[key]] += int(value)
+                        continue
+                    mappings += 1
+                    current = by_header.get((perms, name))
+                    if current is None:
+                        category = _mapping_category(perms, name)
+                        current = by_header[perms, name] = totals.setdefault(category, [0, 0, 0])
+                if time.monotonic() > deadline:
+                    complete = False
+                    break
+    except OSError:
+        if not mappings:
+            return None  # Exited, or not ours to read
+        complete = False
+    return totals, mappings, complete
+
+
+KERNEL_CATEGORIES = ('slab_reclaimable', 'slab_unreclaimable', 'shmem', 'page_cache', 'hugepages',
+                     'kernel_stack', 'page_tables', 'vmalloc', 'percpu')
+
+# /proc/vmstat counters reported with the kernel breakdown; per-zone and
+# per-type variants (allocstall_normal, workingset_refault_file) are summed
+VMSTAT_COUNTERS = ('pgscan_kswapd', 'pgscan_direct', 'pgsteal_kswapd', 'pgsteal_direct', 'allocstall',
+                   'workingset_refault', 'pswpin', 'pswpout', 'compact_stall', 'oom_kill')
+_VMSTAT_SUFFIXES = ('dma', 'dma32', 'normal', 'high', 'movable', 'device', 'anon', 'file')
+
+
+def parse_meminfo(data: bytes) -> Dict[str, float]:
+    """/proc/meminfo as MB per field (HugePages_* counts are left as counts)"""
+    meminfo = {}
+    for line in data.split(b'\n'):
+        key, _, value = line.partition(b':')
+        fields = value.split()
+        if fields:
+            number = int(fields[0])
+            meminfo[key.decode()] = number / 1024 if len(fields) > 1 else number
+    return meminfo
+
+
+def kernel_categories(meminfo: Dict[str, float]) -> Dict[str, float]:
+    """Split kernel-held memory into KERNEL_CATEGORIES (MB)"""
+    get = meminfo.get
+    hugepages = get('Hugetlb')
+    if hugepages is None:
+        hugepages = get('HugePages_Total', 0) * get('Hugepagesize', 0)
+    return {
+        'slab_reclaimable': get('SReclaimable', 0.0),
+        'slab_unreclaimable': get('SUnreclaim', 0.0),
+        'shmem': get('Shmem', 0.0),  # tmpfs, shared anonymous memory, SysV and POSIX shm
+        'page_cache': max(0.0, get('Cached', 0.0) + get('Buffers', 0.0) - get('Shmem', 0.0)),
+        'hugepages': hugepages,
+        'kernel_stack': get('KernelStack', 0.0),
+        'page_tables': get('PageTables', 0.0) + get('SecPageTables', 0.0),
+        'vmalloc': get('VmallocUsed', 0.0),
+        'percpu': get('Percpu', 0.0),
+    }
+
+
+def parse_vmstat(data: bytes) -> Dict[str, int]:
+    """The VMSTAT_COUNTERS from /proc/vmstat"""
+    counters = dict.fromkeys(VMSTAT_COUNTERS, 0)
+    for line in data.split(b'\n'):
+        key, _, value = line.partition(b' ')
+        name = key.decode()
+        if name not in counters:
+            base, _, suffix = name.rpartition('_')
+            if suffix not in _VMSTAT_SUFFIXES or base not in counters:
+                continue
+            name = base
+        counters[name] += int(value)
+    return counters
+
+
+def parse_slabinfo(data: bytes, top_n: int = 5) -> List[List]:
+    """[cache, MB] of the top_n largest caches in /proc/slabinfo (version 2.x)"""
+    sizes = []
+    for line in data.split(b'\n')[2:]:
+        fields = line.split()
+        # name active_objs num_objs objsize objperslab pagesperslab : tunables ... : slabdata active num shared
+        if len(fields) >= 15:
+            sizes.append((int(fields[14]) * int(fields[5]) * PAGE_SIZE_KB / 1024, fields[0].decode()))
+    return [[name, mb] for mb, name in heapq.nlargest(top_n, sizes)]
+
+
+def read_kernel_memory(proc_root: str = '/proc', block_root: str = '/sys/block',
+                       meminfo: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, float], Dict, List[List], Dict]:
+    """Read the kernel's accounting files in one pass
+    
+    Returns (categories, reclaim counters, slab_top, zram). Each file is
+    read with a single read() and parsed from bytes; meminfo already
+    parsed by get_system_memory is reused. Unreadable files (slabinfo is
+    usually root-only, zram may be absent) give empty results.
+    """
+    def read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    if meminfo is None:
+        meminfo = parse_meminfo(read(f"{proc_root}/meminfo") or b'')
+    vmstat = read(f"{proc_root}/vmstat")
+    slabinfo = read(f"{proc_root}/slabinfo")
+    
+    zram = {}
+    try:
+        devices = [entry.path for entry in os.scandir(block_root) if entry.name.startswith('zram')]
+    except OSError:
+        devices = []
+    for device in devices:
+        # orig_data_size compr_data_size mem_used_total ... (bytes)
+        fields = (read(f"{device}/mm_stat") or b'').split()
+        if len(fields) >= 3:
+            for key, value in zip(('orig_mb', 'compressed_mb', 'used_mb'), fields):
+                zram[key] = zram.get(key, 0.0) + int(value) / (1 << 20)
+    
+    return (kernel_categories(meminfo), parse_vmstat(vmstat) if vmstat else {},
+            parse_slabinfo(slabinfo) if slabinfo else [], zram)
+
+
+# A /proc/<pid>/maps line backed by an inode: "device inode" and path
+MAPS_PATTERN = rb'^[0-9a-f]+-[0-9a-f]+ \S+ \S+ (\S+ [1-9]\d*) +(.+)$'
+
+# The same with the address range, for sizing mappings of unnamed objects
+MAPS_RANGE_PATTERN = rb'^([0-9a-f]+)-([0-9a-f]+) \S+ \S+ (\S+ [1-9]\d*) '
+
+
+def read_maps(path: str, pattern) -> Optional[Dict[bytes, bytes]]:
+    """Path per "device inode" mapped in a /proc/<pid>/maps file, or None if unreadable
+    
+    Sizes aren't parsed here: converting every address range costs more
+    than the rest of the scan, and shared objects are sized afterwards
+    from the file, the shm table or one mapping process.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return dict(pattern.findall(f.read()))
+    except OSError:
+        return None  # Exited, or not ours to read
+
+
+def _shared_kind(path: bytes) -> str:
+    if path.startswith(b'/SYSV'):
+        return 'sysv-shm'
+    if path.startswith((b'/dev/shm/', b'/memfd:')):
+        return 'shm'
+    if b'.so' in path.rsplit(b'/', 1)[-1]:
+        return 'library'
+    return 'file'
+
+
+def read_sysv_shm(proc_root: str = '/proc') -> Dict[int, Tuple[float, float]]:
+    """(size kB, resident kB) per SysV shared memory id, from /proc/sysvipc/shm"""
+    try:
+        with open(f"{proc_root}/sysvipc/shm", 'rb') as f:
+            lines = f.read().split(b'\n')
+    except OSError:
+        return {}
+    header = lines[0].split()
+    if not all(column in header for column in (b'shmid', b'size', b'rss')):
+        return {}
+    shmid, size, rss = header.index(b'shmid'), header.index(b'size'), header.index(b'rss')
+    segments = {}
+    for line in lines[1:]:
+        fields = line.split()
+        if len(fields) > max(shmid, size, rss):
+            segments[int(fields[shmid])] = (int(fields[size]) / 1024, int(fields[rss]) / 1024)
+    return segments
+
+
+_libc = None
+
+
+def file_resident_kb(fd: int) -> Optional[float]:
+    """kB of an open file currently in the page cache (mmap + mincore), or None if it can't be told"""
+    global _libc
+    import ctypes
+    
+    if _libc is None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int,
+                              ctypes.c_int, ctypes.c_long)
+        libc.munmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+        libc.mincore.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+        _libc = libc
+    
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return 0.0
+        # Mapping without touching it reads nothing; mincore reports the page cache
+        addr = _libc.mmap(None, size, 1, 1, fd, 0)  # PROT_READ, MAP_SHARED
+        if addr is None or addr == ctypes.c_void_p(-1).value:
+            return None
+        try:
+            page_size = int(PAGE_SIZE_KB * 1024)
+            pages = (size + page_size - 1) // page_size
+            vector = ctypes.create_string_buffer(pages)
+            if _libc.mincore(addr, size, vector) != 0:
+                return None
+            return (pages - vector.raw.count(0)) * PAGE_SIZE_KB
+        finally:
+            _libc.munmap(addr, size)
+    except OSError:
+        return None
+
+
+def _is_mapped_object(st: os.stat_result, key: bytes) -> bool:
+    """Whether st is the file a maps line's "device inode" refers to"""
+    device, inode = key.split()
+    major, minor = device.split(b':')
+    return st.st_ino == int(inode) and st.st_dev == os.makedev(int(major, 16), int(minor, 16))
+
+
+class SharedMappingIndex:
+    """Which processes map which files and shared memory segments, from /proc/<pid>/maps
+    
+    Objects are keyed by device, inode and path and numbered; each
+    process keeps only an array of the numbers it maps, so memory grows
+    with distinct objects and (process, object) pairs rather than with
+    mappings. scan() parses maps files on a thread pool with a bounded
+    number of chunks in flight.
+    """
+    
     def __init__(self):
-        self.processes: List[ProcessInfo] = []
-        self.total_mem_mb = 0
-        self.used_mem_mb = 0
-        self.free_mem_mb = 0
+        self.keys: List[Tuple[bytes, bytes]] = []   # ("device inode", path)
+        self.nprocs = array('I')
+        self.pids = array('I')
+        self.complete = True             # False when the time budget ran out
+        self._ids: Dict[Tuple[bytes, bytes], int] = {}
+        self._offsets = array('L', [0])  # Row i's objects are _objects[_offsets[i]:_offsets[i + 1]]
+        self._objects = array('I')
+    
+    def __len__(self) -> int:
+        return len(self.pids)
+    
+    def add(self, pid: int, mapped: Dict[bytes, bytes]):
+        """Record one process's maps, as returned by read_maps"""
+        ids, objects, nprocs = self._ids, self._objects, self.nprocs
+        for key in mapped.items():
+            i = ids.get(key)
+            if i is None:
+                i = ids[key] = len(self.keys)
+                self.keys.append(key)
+                nprocs.append(0)
+            nprocs[i] += 1
+            objects.append(i)
+        self.pids.append(pid)
+        self._offsets.append(len(objects))
+    
+    def scan(self, proc_root: str = '/proc', workers: int = 8, deadline: Optional[float] = None,
+             chunk_size: int = 256) -> 'SharedMappingIndex':
+        """Add every process under proc_root, stopping at deadline (time.monotonic())"""
+        import re
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
         
-    def get_system_memory(self) -> Dict[str, float]:
-        """Get system memory info from /proc/meminfo (Linux) or vm_stat (macOS)"""
+        pattern = re.compile(MAPS_PATTERN, re.M)
+        pids = [int(name) for name in os.listdir(proc_root) if name.isdigit()]
         
-        # macOS support
-        if platform.system() == 'Darwin':
-            try:
-                # Get vm_stat output
-                result = subprocess.run(['vm_stat'], capture_output=True, text=True, check=True)
-                lines = result.stdout.strip().split('\n')
-                
-                page_size = 4096
-                stats = {}
-                
-                for line in lines:
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip()
-                        value = value.strip().rstrip('.')
-                        # Handle values with spaces (like "4096 bytes")
-                        value_num = ''.join(c for c in value if c.isdigit())
-                        if value_num:
-                            stats[key] = int(value_num)
-                
-                # Get page size from first line
-                if 'page size of' in lines[0].lower():
-                    page_size = int(''.join(c for c in lines[0] if c.isdigit()))
-                
-                # Calculate memory
-                pages_free = stats.get('Pages free', 0)
-                pages_active = stats.get('Pages active', 0)
-                pages_inactive = stats.get('Pages inactive', 0)
-                pages_speculative = stats.get('Pages speculative', 0)
-                pages_wired = stats.get('Pages wired down', 0)
-                
-                free_mb = (pages_free + pages_speculative) * page_size / (1024 * 1024)
-                active_mb = pages_active * page_size / (1024 * 1024)
-                inactive_mb = pages_inactive * page_size / (1024 * 1024)
-                wired_mb = pages_wired * page_size / (1024 * 1024)
-                
-                # Get total memory
-                result = subprocess.run(['sysctl', '-n', 'hw.memsize'], capture_output=True, text=True, check=True)
-                total_bytes = int(result.stdout.strip())
-                total_mb = total_bytes / (1024 * 1024)
-                
-                used_mb = active_mb + wired_mb
-                
-                self.total_mem_mb = total_mb
-                self.used_mem_mb = used_mb
-                self.free_mem_mb = free_mb + inactive_mb
-                
-                return {
-                    'total_mb': total_mb,
-                    'used_mb': used_mb,
-                    'free_mb': free_mb + inactive_mb,
-                    'used_percent': (used_mb / total_mb * 100) if total_mb > 0 else 0
-                }
-            except Exception as e:
-                print(f"⚠️  Error reading macOS memory: {e}", file=sys.stderr)
-                # Fall through to demo data
+        def read_chunk(start: int):
+            return [(pid, read_maps(f"{proc_root}/{pid}/maps", pattern)) for pid in pids[start:start + chunk_size]]
         
-        # Linux support
+        starts = iter(range(0, len(pids), chunk_size))
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        pending = set()
         try:
-            with open('/proc/meminfo', 'r') as f:
-                lines = f.readlines()
-            
-            mem_info = {}
-            for line in lines:
-                if ':' in line:
-                    key, value = line.split(':')
-                    # Extract number (remove kB and whitespace)
-                    value_kb = int(value.strip().split()[0])
-                    mem_info[key.strip()] = value_kb / 1024  # Convert to MB
-            
-            self.total_mem_mb = mem_info.get('MemTotal', 0)
-            mem_free = mem_info.get('MemFree', 0)
-            mem_available = mem_info.get('MemAvailable', 0)
-            buffers = mem_info.get('Buffers', 0)
-            cached = mem_info.get('Cached', 0)
-            
-            self.used_mem_mb = self.total_mem_mb - mem_available
-            self.free_mem_mb = mem_available
-            
-            return {
-                'total_mb': self.total_mem_mb,
-                'used_mb': self.used_mem_mb,
-                'free_mb': self.free_mem_mb,
-                'used_percent': (self.used_mem_mb / self.total_mem_mb * 100) if self.total_mem_mb > 0 else 0
-            }
-        except FileNotFoundError:
-            # Running in container or restricted environment - use mock data
-            print("⚠️  Running in restricted environment - using demo data", file=sys.stderr)
-            self.total_mem_mb = 16384.0  # 16 GB
-            self.used_mem_mb = 12000.0   # 12 GB used
-            self.free_mem_mb = 4384.0
-            return {
-                'total_mb': self.total_mem_mb,
-                'used_mb': self.used_mem_mb,
-                'free_mb': self.free_mem_mb,
-                'used_percent': 73.2
-            }
-        except Exception as e:
-            print(f"Error reading memory info: {e}", file=sys.stderr)
-            return {}
+            while True:
+                # Keep a couple of chunks per worker queued, so results don't pile up
+                for start in starts:
+                    pending.add(pool.submit(read_chunk, start))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    self.complete = False
+                    break
+                for future in done:
+                    for pid, mapped in future.result():
+                        if mapped:
+                            self.add(pid, mapped)
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+        return self
     
-    def get_processes(self, top_n: int = 20) -> List[ProcessInfo]:
-        """Get top memory-consuming processes"""
+    def _mappers(self, wanted: Iterable[int]) -> Dict[int, int]:
+        """A pid mapping each wanted object"""
+        wanted = set(wanted)
+        mapper: Dict[int, int] = {}
+        objects, offsets = self._objects, self._offsets
+        for row, pid in enumerate(self.pids):
+            if len(mapper) == len(wanted):
+                break
+            for i in objects[offsets[row]:offsets[row + 1]]:
+                if i in wanted and i not in mapper:
+                    mapper[i] = pid
+        return mapper
+    
+    def _object_path(self, proc_root: str, pid: int, i: int) -> bytes:
+        """Object i's path as seen by pid, which may be in another mount namespace"""
+        return os.fsencode(f"{proc_root}/{pid}/root") + self.keys[i][1]
+    
+    def _mapped_kb(self, proc_root: str, mapper: Dict[int, int]) -> Dict[int, float]:
+        """Size of objects that can't be stat'ed, from the maps of the process mapping each"""
+        import re
         
-        # macOS support
-        if platform.system() == 'Darwin':
+        pattern = re.compile(MAPS_RANGE_PATTERN, re.M)
+        sizes = {}
+        for i, pid in mapper.items():
+            key = self.keys[i][0]
             try:
-                # macOS ps uses different flags
-                cmd = ['ps', '-ax', '-m', '-o', 'pid,user,rss,command']
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                
-                lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                processes = []
-                
-                for line in lines[:top_n * 2]:  # Get extra to filter
-                    parts = line.split(None, 3)
-                    if len(parts) >= 4:
-                        try:
-                            pid = int(parts[0])
-                            user = parts[1]
-                            rss_kb = float(parts[2])
-                            rss_mb = rss_kb / 1024
-                            cmd_str = parts[3]
-                            
-                            # Skip kernel threads
-                            if rss_mb < 1:
-                                continue
-                            
-                            # Get process name
-                            name = Path(cmd_str.split()[0]).name if cmd_str else 'unknown'
-                            
-                            processes.append(ProcessInfo(
-                                pid=pid,
-                                name=name,
-                                user=user,
-                                rss_mb=rss_mb,
-                                cmd=cmd_str[:100]
-                            ))
-                        except (ValueError, IndexError):
-                            continue
+                with open(f"{proc_root}/{pid}/maps", 'rb') as f:
+                    ranges = pattern.findall(f.read())
+            except OSError:
+                continue
+            sizes[i] = sum(int(end, 16) - int(start, 16) for start, end, k in ranges if k == key) / 1024
+        return sizes
+    
+    def top(self, top_n: int = 10, proc_root: str = '/proc', deadline: Optional[float] = None,
+            names: Optional[Callable[[int], str]] = None) -> Tuple[List[SharedMapping], List[List]]:
+        """The top_n objects mapped by several processes, largest in RAM first, and the
+        top_n processes by the shared memory attributed to them ([pid, name, MB])
+        
+        Objects are sized from the file, the SysV shm table or a mapping
+        process; residency is then measured for a few times top_n of the
+        largest until deadline, and split evenly between the processes
+        mapping each.
+        """
+        names = names or (lambda pid: str(pid))
+        sysv = read_sysv_shm(proc_root)
+        size: Dict[int, float] = {}
+        resident: Dict[int, Optional[float]] = {}
+        files = []
+        unsized = set()
+        for i in (i for i in range(len(self.keys)) if self.nprocs[i] >= 2):
+            key, path = self.keys[i]
+            if path.startswith(b'/SYSV'):
+                segment = sysv.get(int(key.split()[1]))
+                if segment is not None:
+                    size[i], resident[i] = segment
+                    continue
+            elif path.startswith(b'/') and not path.endswith(b' (deleted)'):
+                files.append(i)
+                continue
+            unsized.add(i)
+        
+        # Files are looked up through a mapping process's root, and only
+        # trusted if device and inode match what it maps
+        mapper = self._mappers(files + list(unsized))
+        for i in files:
+            try:
+                st = os.stat(self._object_path(proc_root, mapper[i], i))
+            except (KeyError, OSError):
+                st = None
+            if st is not None and _is_mapped_object(st, self.keys[i][0]):
+                size[i] = st.st_size / 1024
+            else:
+                unsized.add(i)
+        if unsized:
+            largest = heapq.nlargest(top_n * 5, unsized, key=self.nprocs.__getitem__)
+            size.update(self._mapped_kb(proc_root, {i: mapper[i] for i in largest if i in mapper}))
+        
+        for i in heapq.nlargest(top_n * 5, size, key=size.__getitem__):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            if i in resident or i in unsized:
+                continue
+            try:
+                fd = os.open(self._object_path(proc_root, mapper[i], i), os.O_RDONLY)
+            except OSError:
+                resident[i] = None
+                continue
+            try:
+                same = _is_mapped_object(os.fstat(fd), self.keys[i][0])
+                resident[i] = file_resident_kb(fd) if same else None
+            finally:
+                os.close(fd)
+        
+        def in_ram(i: int) -> float:
+            kb = resident.get(i)
+            return kb if kb is not None else size[i]
+        ranked = heapq.nlargest(top_n, size, key=in_ram)
+        
+        # One pass over the (process, object) pairs for both attribution and example mappers
+        share = {i: kb / self.nprocs[i] for i, kb in resident.items() if kb}
+        mappers: Dict[int, List[int]] = {i: [] for i in ranked}
+        costs = []
+        objects, offsets = self._objects, self._offsets
+        for row, pid in enumerate(self.pids):
+            total = 0.0
+            for i in objects[offsets[row]:offsets[row + 1]]:
+                if i in share:
+                    total += share[i]
+                members = mappers.get(i)
+                if members is not None and len(members) < 5:
+                    members.append(pid)
+            if total:
+                costs.append((total, pid))
+        
+        shared = []
+        for i in ranked:
+            key, path = self.keys[i]
+            device, inode = key.decode().split()
+            kb = resident.get(i)
+            shared.append(SharedMapping(
+                path=os.fsdecode(path), kind=_shared_kind(path), device=device, inode=int(inode),
+                nprocs=self.nprocs[i], size_mb=size[i] / 1024,
+                resident_mb=kb / 1024 if kb is not None else None,
+                per_process_mb=kb / 1024 / self.nprocs[i] if kb is not None else None,
+                processes=sorted({names(pid) for pid in mappers[i]})
+            ))
+        return shared, [[pid, names(pid), kb / 1024] for kb, pid in heapq.nlargest(top_n, costs)]
+
+
+class LeakDetector:
+    """Streaming per-PID memory growth detector
+    
+    Each tracked process, keyed by (pid, start_time) so a reused PID
+    starts afresh, owns a slot in a set of parallel arrays holding
+    exponentially weighted least-squares sums, so an update is O(1) per
+    process and memory stays constant no matter how many samples are
+    seen. Slots of processes that have exited are recycled.
+    """
+    
+    def __init__(self, min_slope_mb_per_hour: float = 10.0, min_samples: int = 10,
+                 min_r2: float = 0.8, min_rising: float = 0.6, decay: float = 0.995):
+        self.min_slope_mb_per_hour = min_slope_mb_per_hour
+        self.min_samples = min_samples
+        self.min_r2 = min_r2
+        self.min_rising = min_rising
+        self.decay = decay
+        
+        self._slots: Dict[Tuple[int, object], int] = {}
+        self._free: List[int] = []
+        # Per-slot columns: sample count, first-seen time, weighted sums of
+        # 1, t, y, t*t, t*y and y*y (t in hours since first seen, y in MB),
+        # last value, and counts of changed / rising steps
+        self._count = array('l')
+        self._t0 = array('d')
+        self._w = array('d')
+        self._st = array('d')
+        self._sy = array('d')
+        self._stt = array('d')
+        self._sty = array('d')
+        self._syy = array('d')
+        self._last_y = array('d')
+        self._steps = array('l')
+        self._rises = array('l')
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def _new_slot(self, timestamp: float) -> int:
+        if self._free:
+            slot = self._free.pop()
+            for column in (self._count, self._steps, self._rises):
+                column[slot] = 0
+            for column in (self._w, self._st, self._sy, self._stt, self._sty, self._syy, self._last_y):
+                column[slot] = 0.0
+            self._t0[slot] = timestamp
+            return slot
+        
+        for column in (self._count, self._steps, self._rises):
+            column.append(0)
+        for column in (self._w, self._st, self._sy, self._stt, self._sty, self._syy, self._last_y):
+            column.append(0.0)
+        self._t0.append(timestamp)
+        return len(self._t0) - 1
+    
+    def update(self, timestamp: float, values: Iterable[Tuple[Tuple[int, object], float]],
+               live: Optional[Collection[Tuple[int, object]]] = None):
+        """Add one ((pid, start_time), mem_mb) observation per process
+        
+        Processes not in live are treated as exited; without live, values
+        must cover every process and anything missing from it has exited.
+        """
+        decay = self.decay
+        seen = set()
+        
+        for key, y in values:
+            seen.add(key)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = self._new_slot(timestamp)
+            
+            t = (timestamp - self._t0[slot]) / 3600
+            self._w[slot] = self._w[slot] * decay + 1
+            self._st[slot] = self._st[slot] * decay + t
+            self._sy[slot] = self._sy[slot] * decay + y
+            self._stt[slot] = self._stt[slot] * decay + t * t
+            self._sty[slot] = self._sty[slot] * decay + t * y
+            self._syy[slot] = self._syy[slot] * decay + y * y
+            
+            if self._count[slot]:
+                last_y = self._last_y[slot]
+                if y != last_y:
+                    self._steps[slot] += 1
+                    if y > last_y:
+                        self._rises[slot] += 1
+            self._count[slot] += 1
+            self._last_y[slot] = y
+        
+        # Forget processes that have exited
+        live = seen if live is None else live
+        for key in [key for key in self._slots if key not in live]:
+            self._free.append(self._slots.pop(key))
+    
+    def samples(self, key: Tuple[int, object]) -> int:
+        """Number of observations of a (pid, start_time) so far"""
+        slot = self._slots.get(key)
+        return 0 if slot is None else self._count[slot]
+    
+    def trend(self, key: Tuple[int, object]) -> Optional[Tuple[float, float]]:
+        """Fitted (slope in MB/hour, r²) for a (pid, start_time), or None if too few samples"""
+        slot = self._slots.get(key)
+        if slot is None or self._count[slot] < 2:
+            return None
+        
+        w, st, sy = self._w[slot], self._st[slot], self._sy[slot]
+        var_t = w * self._stt[slot] - st * st
+        var_y = w * self._syy[slot] - sy * sy
+        if var_t <= 0:
+            return None
+        cov = w * self._sty[slot] - st * sy
+        slope = cov / var_t
+        r2 = min(1.0, cov * cov / (var_t * var_y)) if var_y > 0 else 0.0
+        return slope, r2
+    
+    def findings(self, available_mb: float) -> List[Dict]:
+        """PIDs with sustained growth, fastest first
+        
+        Growth is sustained when the fit explains most of the variance
+        and most of the steps where memory changed were increases.
+        """
+        results = []
+        for key, slot in self._slots.items():
+            count = self._count[slot]
+            if count < self.min_samples or not self._steps[slot]:
+                continue
+            if self._rises[slot] / self._steps[slot] < self.min_rising:
+                continue
+            fit = self.trend(key)
+            if fit is None:
+                continue
+            slope, r2 = fit
+            if slope < self.min_slope_mb_per_hour or r2 < self.min_r2:
+                continue
+            
+            results.append({
+                'pid': key[0],
+                'memory_mb': self._last_y[slot],
+                'growth_mb_per_hour': slope,
+                'r2': r2,
+                'samples': count,
+                'hours_to_exhaustion': available_mb / slope if available_mb > 0 else 0.0
+            })
+        
+        results.sort(key=lambda r: r['growth_mb_per_hour'], reverse=True)
+        return results
+
+
+class Signature(_Record):
+    """A well-known program, classified locally instead of by the LLM"""
+    __slots__ = ('names', 'bucket', 'reason', 'action', 'cmd', 'user', 'max_mb')
+    
+    def __init__(self, names: Tuple[str, ...], bucket: str, reason: str, action: str = '',
+                 cmd: Tuple[str, ...] = (), user: Optional[str] = None, max_mb: Optional[float] = None):
+        self.names = names       # Executable names (argv[0] basename)
+        self.bucket = bucket     # 'safe_to_ignore' or 'medium_priority'
+        self.reason = reason
+        self.action = action
+        self.cmd = cmd           # Tokens that must all appear in the command line
+        self.user = user         # Expected owner; anyone else is anomalous
+        self.max_mb = max_mb     # Above this it's anomalous and goes to the LLM
+
+
+SIGNATURE_BUCKETS = ('safe_to_ignore', 'medium_priority')
+
+# Built-in signatures. Anything bigger than max_mb, owned by the wrong
+# user or growing steadily is still sent to the LLM.
+SIGNATURES = (
+    Signature(('systemd',), 'safe_to_ignore', "Init system and service manager", max_mb=300),
+    Signature(('systemd-journald',), 'safe_to_ignore', "System log daemon; memory tracks its journal cache",
+              max_mb=500),
+    Signature(('systemd-logind', 'systemd-udevd', 'systemd-resolved', 'systemd-networkd',
+               'systemd-timesyncd', 'systemd-oomd', 'systemd-machined', 'systemd-userdbd'),
+              'safe_to_ignore', "Core systemd service", max_mb=150),
+    Signature(('dbus-daemon', 'dbus-broker', 'dbus-broker-launch'), 'safe_to_ignore', "D-Bus message bus",
+              max_mb=150),
+    Signature(('sshd',), 'safe_to_ignore', "OpenSSH server (one process per session)", max_mb=100),
+    Signature(('cron', 'crond', 'atd', 'anacron'), 'safe_to_ignore', "Job scheduler", max_mb=100),
+    Signature(('rsyslogd', 'syslog-ng'), 'safe_to_ignore', "Syslog daemon", max_mb=300),
+    Signature(('agetty', 'getty', 'login'), 'safe_to_ignore', "Console login", max_mb=50),
+    Signature(('bash', 'zsh', 'sh', 'dash', 'fish', 'tmux', 'screen'), 'safe_to_ignore',
+              "Interactive shell or terminal multiplexer", max_mb=200),
+    Signature(('networkmanager', 'wpa_supplicant', 'dhclient', 'dhcpcd', 'modemmanager'), 'safe_to_ignore',
+              "Network management daemon", max_mb=200),
+    Signature(('chronyd', 'ntpd', 'irqbalance', 'thermald', 'acpid', 'smartd', 'upowerd', 'udisksd',
+               'polkitd', 'accounts-daemon', 'avahi-daemon', 'multipathd', 'rtkit-daemon', 'cupsd',
+               'bluetoothd', 'lvmetad', 'auditd'),
+              'safe_to_ignore', "Standard system daemon", max_mb=200),
+    Signature(('snapd', 'packagekitd', 'unattended-upgrade'), 'safe_to_ignore', "Package manager daemon",
+              max_mb=500),
+    Signature(('containerd', 'containerd-shim', 'containerd-shim-runc-v2', 'dockerd', 'docker-proxy'),
+              'safe_to_ignore', "Container runtime (the containers' own processes are listed separately)",
+              max_mb=1024),
+    Signature(('kubelet', 'kube-proxy'), 'safe_to_ignore', "Kubernetes node agent", max_mb=1024),
+    Signature(('pipewire', 'pipewire-pulse', 'wireplumber', 'pulseaudio'), 'safe_to_ignore',
+              "Audio server", max_mb=300),
+    Signature(('xorg', 'xwayland'), 'safe_to_ignore', "Display server", max_mb=1024),
+    Signature(('nginx', 'apache2', 'httpd', 'haproxy', 'caddy'), 'safe_to_ignore',
+              "Web server or proxy (workers share most of their memory)", max_mb=512),
+    Signature(('postgres', 'postmaster'), 'medium_priority',
+              "PostgreSQL server; shared_buffers and per-connection work_mem drive its footprint",
+              action="Lower shared_buffers or max_connections if memory is tight", user='postgres'),
+    Signature(('mysqld', 'mariadbd'), 'medium_priority',
+              "MySQL/MariaDB server; mostly the InnoDB buffer pool, which is sized up front",
+              action="Lower innodb_buffer_pool_size if memory is tight", user='mysql'),
+    Signature(('redis-server', 'valkey-server'), 'medium_priority',
+              "In-memory data store; memory follows the dataset size",
+              action="Check maxmemory and the eviction policy (redis-cli INFO memory)", user='redis'),
+    Signature(('memcached',), 'medium_priority', "Memory cache sized by its -m option",
+              action="Lower -m if the hit rate allows", user='memcache'),
+    Signature(('mongod',), 'medium_priority', "MongoDB; the WiredTiger cache defaults to half of RAM minus 1 GB",
+              action="Set storage.wiredTiger.engineConfig.cacheSizeGB", user='mongodb'),
+    Signature(('java',), 'medium_priority', "Elasticsearch/OpenSearch; the JVM heap is set by -Xmx",
+              action="Lower -Xms/-Xmx in jvm.options (keep heap at or below half of RAM)",
+              cmd=('elasticsearch',)),
+    Signature(('java',), 'medium_priority', "Elasticsearch/OpenSearch; the JVM heap is set by -Xmx",
+              action="Lower -Xms/-Xmx in jvm.options (keep heap at or below half of RAM)",
+              cmd=('opensearch',)),
+    Signature(('ollama',), 'medium_priority', "Local LLM server; its memory is mostly the loaded model",
+              action="Use a smaller model or a shorter keep_alive so idle models are unloaded"),
+    Signature(('chrome', 'chromium', 'chromium-browser', 'google-chrome', 'brave', 'msedge', 'firefox',
+               'firefox-esr'),
+              'medium_priority', "Web browser; every tab and extension adds memory",
+              action="Close unused tabs or extensions"),
+    Signature(('code', 'cursor', 'slack', 'discord', 'teams', 'spotify'), 'medium_priority',
+              "Electron desktop app (a bundled Chromium per app)", action="Quit it when not in use"),
+    Signature(('gnome-shell', 'plasmashell', 'kwin_x11', 'kwin_wayland', 'xfwm4'), 'safe_to_ignore',
+              "Desktop shell or window manager", max_mb=1024),
+)
+
+
+def _exe_key(name: str) -> str:
+    """Normalised executable name: argv[0] rewrites like 'sshd:' or '-bash' are common"""
+    return name.strip().lstrip('-').rstrip(':').lower()
+
+
+def _cmd_tokens(cmd: str) -> set:
+    """Words of a command line, plus the components of any paths in it"""
+    tokens = set()
+    for word in cmd.split():
+        tokens.add(word)
+        if '/' in word:
+            tokens.update(word.split('/'))
+    return tokens
+
+
+class SignatureIndex:
+    """Signatures indexed by executable name
+    
+    Matching is a dict lookup on the name, then set checks for the few
+    signatures sharing it (most specific first), not a scan of every
+    pattern. Earlier signatures win over later ones of the same
+    specificity, so user signatures go before the built-in ones.
+    """
+    
+    def __init__(self, signatures: Iterable[Signature]):
+        self._by_name: Dict[str, List[Tuple[frozenset, Signature]]] = {}
+        for sig in signatures:
+            for name in sig.names:
+                self._by_name.setdefault(_exe_key(name), []).append((frozenset(sig.cmd), sig))
+        for rules in self._by_name.values():
+            rules.sort(key=lambda rule: (len(rule[0]), rule[1].user is not None), reverse=True)
+    
+    def match(self, name: str, cmd: str) -> Optional[Signature]:
+        rules = self._by_name.get(_exe_key(name))
+        if not rules:
+            return None
+        tokens = None
+        for required, sig in rules:
+            if required:
+                if tokens is None:
+                    tokens = _cmd_tokens(cmd)
+                if not required <= tokens:
+                    continue
+            return sig
+        return None
+    
+    def classify(self, items: List, anomalous_pids: Iterable[int] = ()) -> Tuple[Dict[str, List[Dict]], List]:
+        """Split processes (or applications) into local entries per bucket and the rest
+        
+        The rest - unknown programs, and known ones that are too big, run
+        as an unexpected user or are growing - is what the LLM should see.
+        """
+        anomalous = set(anomalous_pids)
+        classified: Dict[str, List[Dict]] = {}
+        rest = []
+        for item in items:
+            sig = self.match(item.name, item.cmd)
+            pids = getattr(item, 'pids', None) or (item.pid,)  # Applications: any member
+            if (sig is None or not anomalous.isdisjoint(pids)
+                    or (sig.user is not None and item.user != sig.user)
+                    or (sig.max_mb is not None and item.mem_mb > sig.max_mb)):
+                rest.append(item)
+                continue
+            entry = {
+                'process': item.name,
+                'pid': item.pid,
+                'memory_mb': round(item.mem_mb, 1),
+                'reason': sig.reason,
+                'source': 'signature'
+            }
+            if sig.action:
+                entry['action'] = sig.action
+            classified.setdefault(sig.bucket, []).append(entry)
+        return classified, rest
+
+
+def load_signatures(path: str) -> List[Signature]:
+    """Read extra signatures from a JSON list of objects with Signature's fields"""
+    import json
+    
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON list of signatures")
+    
+    def strings(value, field: str) -> Tuple[str, ...]:
+        # A bare string is one name or token, not a sequence of characters
+        if isinstance(value, str):
+            return (value,)
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError(f"{field} must be a string or a list of strings")
+        return tuple(value)
+    
+    signatures = []
+    for i, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            raise ValueError(f"signature {i}: expected an object")
+        try:
+            names = entry.pop('names', None) or entry.pop('name', None)
+            if not names:
+                raise ValueError("names is required")
+            sig = Signature(strings(names, 'names'), **entry)
+            sig.cmd = strings(sig.cmd, 'cmd') if sig.cmd else ()
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"signature {i}: {e}")
+        if sig.bucket not in SIGNATURE_BUCKETS:
+            raise ValueError(f"signature {i}: bucket must be one of {', '.join(SIGNATURE_BUCKETS)}")
+        if not isinstance(sig.reason, str) or not isinstance(sig.action, str):
+            raise ValueError(f"signature {i}: reason and action must be strings")
+        if sig.user is not None and not isinstance(sig.user, str):
+            raise ValueError(f"signature {i}: user must be a string")
+        if sig.max_mb is not None and (not _is_number(sig.max_mb) or sig.max_mb < 0):
+            raise ValueError(f"signature {i}: max_mb must be a non-negative number")
+        signatures.append(sig)
+    return signatures
+
+
+PRIORITY_KEYS = ('high_priority', 'medium_priority', 'safe_to_ignore')
+
+# Parts of an analysis worth asking the model again for; safe_to_ignore
+# is optional and total_reclaimable_mb is recomputed locally
+REQUIRED_KEYS = ('summary', 'high_priority', 'medium_priority')
+
+
+def parse_analysis(text: str) -> Tuple[Optional[Dict], List[str]]:
+    """Parse an LLM analysis, salvaging what it can from broken JSON
+    
+    Returns the analysis (None if nothing was usable) and the top-level
+    keys that were cut off. Text around the object and trailing commas
+    are tolerated; a truncated response keeps every value and list item
+    that was complete.
+    """
+    import json
+    import re
+    
+    start = text.find('{')
+    if start < 0:
+        return None, []
+    text = text[start:]
+    end = text.rfind('}') + 1
+    for candidate in (text, text[:end]):
+        for attempt in (candidate, re.sub(r',\s*([}\]])', r'\1', candidate)):
+            try:
+                data = json.loads(attempt)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                return data, []
+    
+    parser = StreamingJSONParser()
+    data: Dict = {}
+    for key, value in parser.feed(text):
+        if key in PRIORITY_KEYS:
+            data.setdefault(key, []).append(value)
+        else:
+            data[key] = value
+    for key in parser.finished:
+        if key in PRIORITY_KEYS:
+            data.setdefault(key, [])  # Complete but empty
+    cut = [parser.unfinished] if parser.unfinished is not None else []
+    return (data or None), cut
+
+
+def analysis_problem(analysis) -> Optional[str]:
+    """What's wrong with an LLM analysis, or None if it has the expected shape"""
+    if not isinstance(analysis, dict):
+        return "not a JSON object"
+    if not isinstance(analysis.get('summary'), str):
+        return "no summary"
+    for key in PRIORITY_KEYS:
+        if not isinstance(analysis.get(key, []), list):
+            return f"{key} is not a list"
+    return None
+
+
+def missing_fields(analysis: Optional[Dict], cut: Iterable[str] = ()) -> List[str]:
+    """Required keys an analysis lacks, has in the wrong shape, or got cut off in"""
+    if analysis is None:
+        return list(REQUIRED_KEYS)
+    cut = set(cut)
+    return [key for key in REQUIRED_KEYS
+            if key in cut or not isinstance(analysis.get(key), str if key == 'summary' else list)]
+
+
+def merge_analysis(previous: Dict, update: Dict, exited: Iterable[int] = ()) -> Dict:
+    """Apply a delta answer to the previous analysis
+    
+    Entries for exited PIDs are dropped, entries the update lists again
+    are replaced (possibly under another priority), and the summary is
+    taken from the update when it has one.
+    """
+    import copy
+    
+    merged = copy.deepcopy(previous)
+    merged.pop('validation', None)
+    fresh = {key: [entry for entry in update.get(key) or [] if isinstance(entry, dict)] for key in PRIORITY_KEYS}
+    gone = set(exited) | {entry.get('pid') for entries in fresh.values() for entry in entries}
+    for key in PRIORITY_KEYS:
+        kept = [entry for entry in merged.get(key) or [] if entry.get('pid') not in gone]
+        merged[key] = fresh[key] + kept
+    if isinstance(update.get('summary'), str):
+        merged['summary'] = update['summary']
+    return merged
+
+
+def validate_analysis(analysis: Dict, known: Dict[int, object], cached: bool = False) -> Dict[str, int]:
+    """Check an analysis against the snapshot it describes, fixing it in place
+    
+    known maps PIDs to the processes or applications the model was shown.
+    Entries naming an unknown PID are matched by name or dropped, a PID
+    listed twice is kept at its highest priority, process and memory_mb
+    are replaced by the measured values, and total_reclaimable_mb is
+    recomputed as the high and medium priority memory (USS where known).
+    For a cached analysis of an earlier snapshot a PID only matches if
+    the name does too, and commands naming a PID that moved are updated.
+    Returns counts of what was changed.
+    """
+    by_name: Dict[str, object] = {}
+    for item in sorted(known.values(), key=lambda item: item.mem_mb):
+        by_name[item.name] = item  # Largest wins
+    
+    counts = {'dropped': 0, 'corrected': 0}
+    seen = set()
+    reclaimable = 0.0
+    for key in PRIORITY_KEYS:
+        entries = analysis.get(key)
+        if not isinstance(entries, list):
+            analysis[key] = []
+            continue
+        checked = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                counts['dropped'] += 1
+                continue
+            try:
+                pid = int(entry.get('pid'))
+            except (TypeError, ValueError):
+                pid = None
+            item = known.get(pid)
+            if item is not None and cached and item.name != entry.get('process'):
+                item = None  # PID reused by another program since
+            if item is None:
+                item = by_name.get(str(entry.get('process', '')))
+            if item is None or item.pid in seen:
+                counts['dropped'] += 1
+                continue
+            seen.add(item.pid)
+            if cached and pid is not None and pid != item.pid and isinstance(entry.get('command'), str):
+                import re
+                entry['command'] = re.sub(rf'\b{pid}\b', str(item.pid), entry['command'])
+            
+            measured = round(item.mem_mb, 1)
+            claimed = entry.get('memory_mb')
+            if (entry.get('pid') != item.pid or not isinstance(claimed, (int, float))
+                    or abs(claimed - measured) > max(1.0, measured * 0.1)):
+                counts['corrected'] += 1
+            entry['pid'] = item.pid
+            entry['memory_mb'] = measured
+            entry['process'] = item.name
+            if key != 'safe_to_ignore':
+                uss = getattr(item, 'uss_mb', None)
+                reclaimable += uss if uss is not None else item.mem_mb
+            checked.append(entry)
+        analysis[key] = checked
+    
+    if not isinstance(analysis.get('summary'), str):
+        analysis['summary'] = 'No summary available'
+    analysis['total_reclaimable_mb'] = round(reclaimable, 1)
+    return counts
+
+
+def _bucket(mb: float) -> int:
+    """Geometric size bucket (~25% wide), so small drift keeps the same key"""
+    return int(math.log(mb, 1.25)) if mb >= 1 else 0
+
+
+def snapshot_fingerprint(mem_data: Dict[str, float], processes: List[ProcessInfo],
+                         model: str, extra: Tuple = ()) -> str:
+    """Stable key for a snapshot: names and bucketed sizes, model, prompt version"""
+    import hashlib
+    
+    parts = [
+        f"v{PROMPT_VERSION}",
+        model,
+        str(_bucket(mem_data.get('total_mb', 0))),
+        str(int(mem_data.get('used_percent', 0) // 5)),
+    ]
+    parts.extend(sorted(f"{proc.name}:{_bucket(proc.mem_mb)}" for proc in processes))
+    parts.extend(str(item) for item in extra)
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def cache_dir() -> str:
+    """wamr's cache directory ($XDG_CACHE_HOME/wamr)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'wamr')
+
+
+class AnalysisCache:
+    """On-disk cache of LLM analyses, one JSON file per snapshot fingerprint
+    
+    Entries expire after ttl seconds. A hit touches the file's mtime, and
+    once there are more than max_entries files the least recently used are
+    removed.
+    """
+    
+    def __init__(self, path: Optional[str] = None, ttl: float = 600, max_entries: int = 100):
+        self.path = path if path is not None else cache_dir()
+        self.ttl = ttl
+        self.max_entries = max_entries
+    
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached analysis for key, or None if missing or expired"""
+        import json
+        
+        entry = self._entry(key)
+        try:
+            with open(entry, 'r') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if time.time() - record.get('created', 0) > self.ttl:
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+            return None
+        
+        try:
+            os.utime(entry)  # Mark as recently used
+        except OSError:
+            pass
+        return record.get('analysis')
+    
+    def put(self, key: str, analysis: Dict):
+        """Store an analysis, evicting least recently used entries"""
+        import json
+        import threading
+        
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp = f"{self._entry(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump({'created': time.time(), 'analysis': analysis}, f)
+            os.replace(tmp, self._entry(key))
+            
+            entries = [e for e in os.scandir(self.path) if e.name.endswith('.json')]
+            if len(entries) > self.max_entries:
+                entries.sort(key=lambda e: e.stat().st_mtime)
+                for e in entries[:len(entries) - self.max_entries]:
+                    os.remove(e.path)
+        except OSError as e:
+            print(f"⚠️  Could not write analysis cache: {e}", file=sys.stderr)
+
+
+class AnalysisState(_Record):
+    """What an incremental analysis builds on: the last answer and Ollama's context"""
+    __slots__ = ('key', 'context', 'analysis', 'listed', 'used_mb', 'timestamp', 'deltas')
+    
+    def __init__(self, key: str, context: List[int], analysis: Dict, listed: List[List], used_mb: float,
+                 timestamp: float, deltas: int = 0):
+        self.key = key                 # Model, view and accounting it was made with
+        self.context = context         # Returned by /api/generate; continues the conversation
+        self.analysis = analysis
+        self.listed = listed           # [pid, name, mem_mb] of each entry the model was shown
+        self.used_mb = used_mb
+        self.timestamp = timestamp     # Of the last full prompt
+        self.deltas = deltas           # Delta prompts sent since then
+
+
+def load_state(path: str) -> Optional[AnalysisState]:
+    """Read a saved AnalysisState, or None if missing or unreadable"""
+    import json
+    
+    try:
+        with open(path, 'r') as f:
+            return AnalysisState(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_state(path: str, state: AnalysisState):
+    import json
+    
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(asdict(state), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️  Could not save analysis state: {e}", file=sys.stderr)
+
+
+class ModelStats:
+    """Recent latency and success of each model, persisted between runs
+    
+    Each model keeps its last `history` outcomes: the seconds a valid
+    answer took, or None for a failure or a missed deadline.
+    """
+    
+    def __init__(self, path: Optional[str] = None, history: int = 20):
+        self.path = path if path is not None else os.path.join(cache_dir(), 'stats', 'models.json')
+        self.history = history
+        self.models: Dict[str, List[Optional[float]]] = {}
+        self.load()
+    
+    def load(self):
+        import json
+        
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self.models = {model: list(outcomes)[-self.history:] for model, outcomes in data.items()
+                           if isinstance(outcomes, list)}
+    
+    def save(self):
+        import json
+        
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.models, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save model statistics: {e}", file=sys.stderr)
+    
+    def record(self, model: str, latency: Optional[float]):
+        """Add an outcome: seconds to a valid answer, or None if there was none"""
+        outcomes = self.models.setdefault(model, [])
+        outcomes.append(None if latency is None else round(latency, 3))
+        del outcomes[:-self.history]
+    
+    def success_rate(self, model: str) -> Optional[float]:
+        outcomes = self.models.get(model)
+        if not outcomes:
+            return None
+        return sum(1 for latency in outcomes if latency is not None) / len(outcomes)
+    
+    def median_latency(self, model: str) -> Optional[float]:
+        latencies = sorted(latency for latency in self.models.get(model, []) if latency is not None)
+        return latencies[len(latencies) // 2] if latencies else None
+    
+    def rank(self, models: List[str], deadline: float) -> List[str]:
+        """Order models to try: fast ones that usually succeed, then untried ones, then the rest"""
+        def key(indexed):
+            index, model = indexed
+            rate, median = self.success_rate(model), self.median_latency(model)
+            if rate is None:
+                return (1, 0.0, index)
+            if rate >= 0.5 and median is not None and median <= deadline:
+                return (0, median, index)
+            return (2, -rate, index)
+        return [model for _, model in sorted(enumerate(models), key=key)]
+
+
+class StreamingJSONParser:
+    """Incremental parser for the analysis JSON as Ollama streams it
+    
+    feed() returns (key, value) events: one for each completed top-level
+    value such as summary, and one for each completed object inside a
+    top-level list such as high_priority. Only nesting and string state
+    are tracked; each completed span is handed to json.loads.
+    """
+    
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._in_list = False
+        self._item_start: Optional[int] = None
+        self.finished: List[str] = []  # Top-level keys whose value is complete
+    
+    @property
+    def unfinished(self) -> Optional[str]:
+        """Top-level key whose value was still open at the end of the text"""
+        return self._key if self._depth >= 1 else None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """Add streamed text and return any newly completed parts"""
+        self.text += chunk
+        text = self.text
+        events = []
+        
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = self._loads(text[self._string_start:i + 1])
+                        self._expect_key = False
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == '{' or c == '[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 2 and c == '[':
+                    self._in_list = True
+                elif self._depth == 3 and self._in_list and c == '{':
+                    self._item_start = i
+            elif c == '}' or c == ']':
+                if self._depth == 3 and self._item_start is not None:
+                    item = self._loads(text[self._item_start:i + 1])
+                    if item is not None and self._key is not None:
+                        events.append((self._key, item))
+                    self._item_start = None
+                elif self._depth == 1:
+                    self._end_value(i, events)
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ':':
+                    self._value_start = i + 1
+                elif c == ',':
+                    self._end_value(i, events)
+                    self._expect_key = True
+        
+        self._pos = len(text)
+        return events
+    
+    def _end_value(self, end: int, events: List[Tuple[str, object]]):
+        """Emit the top-level value that just ended, unless it was a list"""
+        if self._key is not None:
+            self.finished.append(self._key)
+        if self._key is not None and self._value_start is not None and not self._in_list:
+            raw = self.text[self._value_start:end].strip()
+            if raw:
+                value = self._loads(raw)
+                if value is not None:
+                    events.append((self._key, value))
+        self._key = None
+        self._value_start = None
+        self._in_list = False
+    
+    @staticmethod
+    def _loads(raw: str):
+        import json
+        
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+
+class OllamaResponse:
+    """A response from OllamaClient.generate()
+    
+    Bodies are read up front unless streaming a successful response;
+    then iter_lines() reads them and hands the connection back to the
+    client once the body is finished. Until then the request counts as
+    in flight, so OllamaClient.cancel() can still abort it.
+    """
+    
+    def __init__(self, client: 'OllamaClient', conn, response, stream: bool):
+        self.status_code = response.status
+        self.content = b''
+        self._client = client
+        self._conn = conn
+        self._response = response
+        if not stream or self.status_code != 200:
+            try:
+                self.content = response.read()
+            finally:
+                self._release()
+    
+    def json(self):
+        import json
+        
+        return json.loads(self.content)
+    
+    def iter_lines(self) -> Iterable[bytes]:
+        """Body lines of a streamed response"""
+        try:
+            for line in self._response:
+                yield line.rstrip(b'\r\n')
+        finally:
+            self._release()
+    
+    def _release(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        # Only a fully read body leaves the connection reusable
+        self._client._release(conn, self._response.isclosed() and not self._response.will_close)
+
+
+class OllamaClient:
+    """Ollama HTTP client that keeps connections alive between requests
+    
+    Built on http.client: importing requests alone took longer than a
+    whole --no-llm run. Idle connections are kept for reuse (up to
+    pool_size, for concurrent callers), and keep_alive is sent with every
+    request so Ollama keeps the model loaded between calls, e.g. across
+    --watch iterations. One client may be shared between threads, e.g.
+    the warm-up thread and the main one.
+    """
+    
+    def __init__(self, url: str = OLLAMA_URL, keep_alive: str = '10m', pool_size: int = 0):
+        import threading
+        
+        self.url = url.rstrip('/')
+        self.keep_alive = keep_alive
+        self.pool_size = pool_size  # Connections kept for concurrent callers
+        self.last_connect_s = 0.0   # TCP connect time of the last request, 0 if reused
+        self._lock = threading.Lock()  # Guards the three connection sets
+        self._idle: List = []
+        self._active: set = set()     # Connections with a request in flight, until its response is released
+        self._cancelled: set = set()
+    
+    def _new_connection(self, timeout: float):
+        import http.client
+        from urllib.parse import urlsplit
+        
+        parts = urlsplit(self.url)
+        if parts.scheme == 'https':
+            return http.client.HTTPSConnection(parts.hostname, parts.port, timeout=timeout)
+        return http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    
+    def _release(self, conn, reusable: bool):
+        """Finish conn's request, keeping the connection for the next one if possible"""
+        with self._lock:
+            self._active.discard(conn)
+            cancelled = conn in self._cancelled
+            self._cancelled.discard(conn)
+            if reusable and not cancelled and len(self._idle) < max(1, self.pool_size):
+                self._idle.append(conn)
+                return
+        conn.close()
+    
+    def generate(self, payload: Dict, stream: bool = False, timeout: float = 60) -> OllamaResponse:
+        """POST to /api/generate and return the response"""
+        import json
+        
+        payload.setdefault('keep_alive', self.keep_alive)
+        body = json.dumps(payload).encode('utf-8')
+        path = self.url.split('://', 1)[-1].partition('/')[2]
+        path = f"/{path}/api/generate" if path else "/api/generate"
+        
+        while True:
+            with self._lock:
+                reused = bool(self._idle)
+                conn = self._idle.pop() if reused else self._new_connection(timeout)
+                self._active.add(conn)
+            try:
+                if conn.sock is None:
+                    started = time.perf_counter()
+                    conn.connect()
+                    self.last_connect_s = time.perf_counter() - started
+                else:
+                    conn.sock.settimeout(timeout)
+                    self.last_connect_s = 0.0
+                if conn in self._cancelled:
+                    # cancel() came before there was a socket to shut down
+                    raise ConnectionAbortedError("request cancelled")
+                conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+            except Exception as e:
+                cancelled = conn in self._cancelled
+                self._release(conn, False)
+                if isinstance(e, ConnectionError) and reused and not cancelled:
+                    continue  # The server closed an idle connection; try the next one
+                raise
+            # Stays active until the response is released
+            return OllamaResponse(self, conn, response, stream)
+    
+    def cancel(self):
+        """Abort requests in flight from other threads; Ollama stops generating when the client goes"""
+        import socket
+        
+        with self._lock:
+            active = list(self._active)
+            self._cancelled.update(active)
+        for conn in active:
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)  # Wakes up a blocked recv(), unlike close()
+                except OSError:
+                    pass
+    
+    def warm_up(self, model: str, timeout: float = 60) -> bool:
+        """Load the model without generating anything (an empty prompt only loads it)"""
+        try:
+            response = self.generate({'model': model}, timeout=timeout)
+            return response.status_code == 200
+        except Exception:
+            return False  # analyze_with_llm reports connection problems
+
+
+class Profiler:
+    """Wall and CPU time of each pipeline stage in the last run
+    
+    Hooks added with add_hook() are called as hook(stage, wall_s, cpu_s)
+    as soon as a stage finishes, e.g. to export timings elsewhere. cpu_s
+    is None for time spent outside this process, such as Ollama's own
+    load/prompt eval/eval durations.
+    """
+    
+    # Ollama response fields (nanoseconds) and the stages they're recorded as
+    OLLAMA_STAGES = (
+        ('load_duration', 'ollama_load'),
+        ('prompt_eval_duration', 'ollama_prompt_eval'),
+        ('eval_duration', 'ollama_eval'),
+    )
+    
+    def __init__(self):
+        self.stages: Dict[str, Tuple[float, Optional[float]]] = {}
+        self.counters: Dict[str, int] = {}
+        self.hooks: List[Callable[[str, float, Optional[float]], None]] = []
+    
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+    
+    def add_hook(self, hook: Callable[[str, float, Optional[float]], None]):
+        self.hooks.append(hook)
+    
+    def stage(self, name: str) -> '_Stage':
+        """Time the body of a with block as stage name"""
+        return _Stage(self, name)
+    
+    def record(self, name: str, wall_s: float, cpu_s: Optional[float] = None):
+        self.stages[name] = (wall_s, cpu_s)
+        for hook in self.hooks:
+            hook(name, wall_s, cpu_s)
+    
+    def record_ollama(self, result: Dict):
+        """Record the durations and token counts from a final /api/generate response"""
+        for key, name in self.OLLAMA_STAGES:
+            if key in result:
+                self.record(name, result[key] / 1e9)
+        for key in ('prompt_eval_count', 'eval_count'):
+            if key in result:
+                self.counters[key] = result[key]
+    
+    @property
+    def timings(self) -> Dict[str, float]:
+        """Wall time per stage in seconds"""
+        return {name: wall for name, (wall, _) in self.stages.items()}
+    
+    def to_dict(self) -> Dict:
+        """Stages in milliseconds plus counters, for --json output"""
+        return {
+            'stages': {
+                name: {
+                    'wall_ms': round(wall * 1000, 3),
+                    'cpu_ms': round(cpu * 1000, 3) if cpu is not None else None
+                }
+                for name, (wall, cpu) in self.stages.items()
+            },
+            'counters': dict(self.counters)
+        }
+
+
+class _Stage:
+    """Context manager returned by Profiler.stage()"""
+    
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+    
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+    
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu)
+
+
+class MemoryAnalyzer:
+    def __init__(self, backend: str = 'auto', proc_root: str = '/proc',
+                 accounting: str = 'rss', smaps_budget: float = 2.0,
+                 smaps_workers: int = 8, view: str = 'process',
+                 cgroup_root: str = '/sys/fs/cgroup', mappings_budget: float = 1.0,
+                 shared_budget: float = 2.0):
+        self.processes: List[ProcessInfo] = []
+        self.total_mem_mb = 0
+        self.used_mem_mb = 0
+        self.free_mem_mb = 0
+        self.backend = backend
+        self.proc_root = proc_root
+        self.accounting = accounting
+        self.smaps_budget = smaps_budget
+        self.smaps_workers = smaps_workers
+        self.view = view
+        self.applications: List[AppInfo] = []
+        self.process_table: Optional[ProcessTable] = None  # Every process from the last application scan
+        self.process_rss_total_mb = 0.0
+        self.cgroup_root = cgroup_root
+        self.cgroups: Optional[List[CgroupInfo]] = None  # None: not collected
+        self.mappings_budget = mappings_budget
+        self.mappings: Optional[List[MappingBreakdown]] = None  # None: not collected
+        self.kernel: Optional[KernelMemory] = None  # None: not collected
+        self.shared_budget = shared_budget
+        self.shared: Optional[List[SharedMapping]] = None  # None: not collected
+        self.shared_costs: List[List] = []  # [pid, name, MB] of shared memory attributed per process
+        self.block_root = '/sys/block'
+        self._meminfo: Optional[Dict[str, float]] = None
+        
+        # False for analyzers built from a saved snapshot: never look at
+        # this machine's /proc or ps
+        self.live = True
+        self._user_cache: Dict[int, str] = {}
+        
+        # Watch mode: name/user/cmd cached per PID, validated by start time
+        self.cache_static = False
+        self._static_cache: Dict[int, Tuple[int, str, str, str]] = {}
+        self.samples: deque = deque(maxlen=WATCH_HISTORY)
+        
+        # Optional growth tracking; while it's on, the last scan keeps
+        # pid -> (start time, rss_mb) for every process it saw
+        self.leak_detector: Optional[LeakDetector] = None
+        self._scanned: Optional[Dict[int, Tuple[object, float]]] = None
+        
+        # LLM results cache; refresh skips lookups but still stores results
+        self.cache: Optional[AnalysisCache] = None
+        self.refresh_cache = False
+        self.last_cache_hit = False
+        
+        # Shared Ollama connection, background model warm-up and the
+        # wall/CPU time of each pipeline stage for the last run
+        self.client = OllamaClient()
+        self._warmup = None
+        self.profiler = Profiler()
+        
+        # Well-known programs are classified locally and left out of the
+        # prompt; offline never calls the LLM and leaves unknowns unclassified
+        self.use_signatures = True
+        self.extra_signatures: List[Signature] = []
+        self._signature_index: Optional[SignatureIndex] = None
+        self.offline = False
+        self.last_local_only = False
+        
+        # Latency budget: with a deadline, --model and the hedge models are
+        # raced (fastest first, by past runs) and a local heuristic answers
+        # if none of them is in time
+        self.deadline: Optional[float] = None
+        self.hedge_models: List[str] = []
+        self.hedge_delay: Optional[float] = None
+        self.model_stats: Optional[ModelStats] = None
+        self.last_model: Optional[str] = None
+        
+        # Incremental mode: after a full analysis, send only what changed,
+        # continuing Ollama's context; state_path keeps it between runs
+        self.incremental = False
+        self.state: Optional[AnalysisState] = None
+        self.state_path: Optional[str] = None
+        self.last_delta = False
+        
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict, **kwargs) -> 'MemoryAnalyzer':
+        """Build an analyzer holding a validated snapshot instead of live data"""
+        analyzer = cls(**kwargs)
+        analyzer.live = False
+        memory = snapshot['memory']
+        analyzer.total_mem_mb = memory['total_mb']
+        analyzer.used_mem_mb = memory['used_mb']
+        analyzer.free_mem_mb = memory['free_mb']
+        analyzer.processes = [ProcessInfo(**proc) for proc in snapshot['processes']]
+        if snapshot.get('cgroups'):
+            analyzer.cgroups = [CgroupInfo(**cg) for cg in snapshot['cgroups']]
+        if snapshot.get('mappings'):
+            analyzer.mappings = [MappingBreakdown(**m) for m in snapshot['mappings']]
+        if snapshot.get('kernel'):
+            analyzer.kernel = KernelMemory(**snapshot['kernel'])
+        if snapshot.get('shared'):
+            analyzer.shared = [SharedMapping(**obj) for obj in snapshot['shared']]
+            analyzer.shared_costs = snapshot.get('shared_costs') or []
+        return analyzer
+    
+    def to_snapshot(self, mem_data: Dict[str, float]) -> Dict:
+        """Collected data as a JSON-serialisable snapshot for wamr batch"""
+        import platform
+        
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'host': platform.node(),
+            'timestamp': time.time(),
+            'memory': mem_data,
+            'processes': [asdict(proc) for proc in self.processes],
+        }
+        if self.cgroups:
+            snapshot['cgroups'] = [asdict(cg) for cg in self.cgroups]
+        if self.mappings:
+            snapshot['mappings'] = [asdict(m) for m in self.mappings]
+        if self.kernel:
+            snapshot['kernel'] = asdict(self.kernel)
+        if self.shared:
+            snapshot['shared'] = [asdict(obj) for obj in self.shared]
+            snapshot['shared_costs'] = self.shared_costs
+        return snapshot
+    
+    def get_system_memory(self) -> Dict[str, float]:
+        """Get system memory info from /proc/meminfo (Linux) or vm_stat (macOS)"""
+        
+        # macOS support
+        if sys.platform == 'darwin':
+            import subprocess
+            try:
+                # Get vm_stat output
+                result = subprocess.run(['vm_stat'], capture_output=True, text=True, check=True)
+                lines = result.stdout.strip().split('\n')
                 
-                # Sort by memory and take top_n
-                processes.sort(key=lambda p: p.rss_mb, reverse=True)
-                self.processes = processes[:top_n]
-                return self.processes
+                page_size = 4096
+                stats = {}
                 
-            except Exception as e:
-                print(f"⚠️  Error reading macOS processes: {e}", file=sys.stderr)
-                # Fall through to demo data
+                for line in lines:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        key = key.strip()
+                        value = value.strip().rstrip('.')
+                        # Handle values with spaces (like "4096 bytes")
+                        value_num = ''.join(c for c in value if c.isdigit())
+                        if value_num:
+                            stats[key] = int(value_num)
+                
+                # Get page size from first line
+                if 'page size of' in lines[0].lower():
+                    page_size = int(''.join(c for c in lines[0] if c.isdigit()))
+                
+                # Calculate memory
+                pages_free = stats.get('Pages free', 0)
+                pages_active = stats.get('Pages active', 0)
+                pages_inactive = stats.get('Pages inactive', 0)
+                pages_speculative = stats.get('Pages speculative', 0)
+                pages_wired = stats.get('Pages wired down', 0)
+                
+                free_mb = (pages_free + pages_speculative) * page_size / (1024 * 1024)
+                active_mb = pages_active * page_size / (1024 * 1024)
+                inactive_mb = pages_inactive * page_size / (1024 * 1024)
+                wired_mb = pages_wired * page_size / (1024 * 1024)
+                
+                # Get total memory
+                result = subprocess.run(['sysctl', '-n', 'hw.memsize'], capture_output=True, text=True, check=True)
+                total_bytes = int(result.stdout.strip())
+                total_mb = total_bytes / (1024 * 1024)
+                
+                used_mb = active_mb + wired_mb
+                
+                self.total_mem_mb = total_mb
+                self.used_mem_mb = used_mb
+                self.free_mem_mb = free_mb + inactive_mb
+                
+                return {
+                    'total_mb': total_mb,
+                    'used_mb': used_mb,
+                    'free_mb': free_mb + inactive_mb,
+                    'used_percent': (used_mb / total_mb * 100) if total_mb > 0 else 0
+                }
+            except Exception as e:
+                print(f"⚠️  Error reading macOS memory: {e}", file=sys.stderr)
+                # Fall through to demo data
+        
+        # Linux support
+        try:
+            with open(f"{self.proc_root}/meminfo", 'rb') as f:
+                mem_info = parse_meminfo(f.read())
+            self._meminfo = mem_info  # Kept for get_kernel_memory
+            
+            self.total_mem_mb = mem_info.get('MemTotal', 0)
+            mem_available = mem_info.get('MemAvailable', 0)
+            
+            self.used_mem_mb = self.total_mem_mb - mem_available
+            self.free_mem_mb = mem_available
+            
+            return {
+                'total_mb': self.total_mem_mb,
+                'used_mb': self.used_mem_mb,
+                'free_mb': self.free_mem_mb,
+                'used_percent': (self.used_mem_mb / self.total_mem_mb * 100) if self.total_mem_mb > 0 else 0
+            }
+        except FileNotFoundError:
+            # Running in container or restricted environment - use mock data
+            print("⚠️  Running in restricted environment - using demo data", file=sys.stderr)
+            self.total_mem_mb = 16384.0  # 16 GB
+            self.used_mem_mb = 12000.0   # 12 GB used
+            self.free_mem_mb = 4384.0
+            return {
+                'total_mb': self.total_mem_mb,
+                'used_mb': self.used_mem_mb,
+                'free_mb': self.free_mem_mb,
+                'used_percent': 73.2
+            }
+        except Exception as e:
+            print(f"Error reading memory info: {e}", file=sys.stderr)
+            return {}
+    
+    def get_processes(self, top_n: int = 20) -> List[ProcessInfo]:
+        """Get top memory-consuming processes"""
+        if self.accounting != 'pss':
+            return self._collect_processes(top_n)
+        
+        # Rank by RSS first, then read smaps_rollup for the candidates only
+        candidates = self._collect_processes(top_n * PSS_CANDIDATE_FACTOR)
+        self.collect_pss(candidates)
+        candidates.sort(key=lambda p: p.mem_mb, reverse=True)
+        self.processes = candidates[:top_n]
+        return self.processes
+    
+    def collect_pss(self, processes: List[ProcessInfo]) -> int:
+        """Fill in PSS/USS/swap from smaps_rollup within the time budget
+        
+        Reads are spread over a bounded thread pool. Processes whose read
+        doesn't finish before the budget runs out keep plain RSS. Returns
+        the number of processes that got PSS data.
+        """
+        rollups = self._read_rollups([proc.pid for proc in processes])
+        for proc in processes:
+            result = rollups.get(proc.pid)
+            if result is not None:
+                proc.pss_mb, proc.uss_mb, proc.swap_mb = result
+        return len(rollups)
+    
+    def _read_rollups(self, pids: List[int]) -> Dict[int, Tuple[float, float, float]]:
+        """Read smaps_rollup for pids on a bounded thread pool within the time budget"""
+        if not pids:
+            return {}
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        workers = max(1, min(self.smaps_workers, len(pids)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            pool.submit(read_smaps_rollup, f"{self.proc_root}/{pid}/smaps_rollup"): pid
+            for pid in pids
+        }
+        done, not_done = wait(futures, timeout=self.smaps_budget)
+        for future in not_done:
+            future.cancel()
+        pool.shutdown(wait=False)
+        
+        if not_done:
+            print(f"⚠️  smaps_rollup budget of {self.smaps_budget:.1f}s exceeded, "
+                  f"{len(not_done)} processes left at RSS", file=sys.stderr)
+        
+        rollups = {}
+        for future in done:
+            result = future.result()
+            if result is not None:
+                rollups[futures[future]] = result
+        return rollups
+    
+    def get_applications(self, top_n: int = 10) -> List[AppInfo]:
+        """Get the top applications, grouping processes by executable and parent tree"""
+        with self.profiler.stage('aggregate'):
+            return self._get_applications(top_n)
+    
+    def _get_applications(self, top_n: int) -> List[AppInfo]:
+        table = None
+        if self.live and sys.platform != 'darwin' and self.backend != 'ps' and os.path.isdir(self.proc_root):
+            try:
+                table = self._scan_proc_tree()
+            except OSError:
+                table = None
+        if not table and self.live:
+            table = self._ps_tree()
+        if not table:
+            # Fall back to whatever get_processes found (e.g. demo data)
+            table = ProcessTable.from_processes(self.processes)
+        self.process_table = table
+        
+        all_apps = aggregate_processes(table.rows())
+        self.process_rss_total_mb = sum(app.rss_mb for app in all_apps)
+        apps = all_apps[:top_n]
+        
+        if self.accounting == 'pss':
+            rollups = self._read_rollups([pid for app in apps for pid in app.pids])
+            rss = dict(zip(table.pid, table.rss_mb))
+            for app in apps:
+                # Members we couldn't read count at their full RSS
+                app.pss_mb = sum(rollups[pid][0] if pid in rollups else rss[pid] for pid in app.pids)
+            apps.sort(key=lambda a: a.mem_mb, reverse=True)
+        
+        # Describe each application by its root process
+        known = {proc.pid: proc for proc in self.processes}
+        for app in apps:
+            proc = known.get(app.pid)
+            if proc is None and self.live and os.path.isdir(self.proc_root):
+                proc = self._read_proc_info(app.pid, 0.0)
+            if proc is not None:
+                app.name = proc.name  # comm is truncated to 15 characters
+                app.user = proc.user
+                app.cmd = proc.cmd
+        
+        self.applications = apps
+        return apps
+    
+    def get_mappings(self, top_n: int = 3) -> List[MappingBreakdown]:
+        """Break the top_n processes' memory down by mapping type (Linux only)
+        
+        Reads the full /proc/<pid>/smaps of each, largest first, until
+        mappings_budget seconds have passed; a file cut short by the
+        budget is reported with complete=False.
+        """
+        with self.profiler.stage('mappings'):
+            return self._get_mappings(top_n)
+    
+    def _get_mappings(self, top_n: int) -> List[MappingBreakdown]:
+        self.mappings = []
+        if not self.live or sys.platform == 'darwin' or not os.path.isdir(self.proc_root):
+            return self.mappings
+        
+        deadline = time.monotonic() + self.mappings_budget
+        top = sorted(self.processes, key=lambda p: p.mem_mb, reverse=True)[:top_n]
+        for i, proc in enumerate(top):
+            if time.monotonic() > deadline:
+                print(f"⚠️  smaps budget of {self.mappings_budget:.1f}s exceeded, "
+                      f"{len(top) - i} processes not broken down", file=sys.stderr)
+                break
+            result = read_smaps(f"{self.proc_root}/{proc.pid}/smaps", deadline)
+            if result is None or not result[1]:
+                continue
+            totals, count, complete = result
+            categories = {
+                category: {'rss_mb': rss / 1024, 'pss_mb': pss / 1024, 'swap_mb': swap / 1024}
+                for category, (rss, pss, swap) in sorted(totals.items(), key=lambda t: t[1][0], reverse=True)
+            }
+            self.mappings.append(MappingBreakdown(
+                pid=proc.pid, name=proc.name, categories=categories, mappings=count, complete=complete
+            ))
+        return self.mappings
+    
+    def get_shared(self, top_n: int = 10) -> List[SharedMapping]:
+        """Find the files and shared memory mapped by several processes (Linux only)
+        
+        Indexes /proc/<pid>/maps of every process on smaps_workers
+        threads, then measures the largest objects' resident size, all
+        within shared_budget seconds. Without root, only our own
+        processes' maps are readable.
+        """
+        with self.profiler.stage('shared'):
+            return self._get_shared(top_n)
+    
+    def _get_shared(self, top_n: int) -> List[SharedMapping]:
+        self.shared = []
+        self.shared_costs = []
+        if not self.live or sys.platform == 'darwin' or not os.path.isdir(self.proc_root):
+            return self.shared
+        
+        deadline = time.monotonic() + self.shared_budget
+        index = SharedMappingIndex().scan(self.proc_root, self.smaps_workers, deadline)
+        if not index.complete:
+            print(f"⚠️  Shared mapping budget of {self.shared_budget:.1f}s exceeded, "
+                  f"{len(index)} processes indexed", file=sys.stderr)
+        
+        known = {proc.pid: proc.name for proc in self.processes}
+        
+        def name(pid: int) -> str:
+            if pid not in known:
+                try:
+                    with open(f"{self.proc_root}/{pid}/comm", 'rb') as f:
+                        known[pid] = f.read().strip().decode('utf-8', 'replace')
+                except OSError:
+                    known[pid] = str(pid)
+            return known[pid]
+        
+        # Residency gets whatever is left of the budget, but at least a moment
+        self.shared, self.shared_costs = index.top(top_n, self.proc_root, max(deadline, time.monotonic() + 0.2), name)
+        return self.shared
+    
+    def get_kernel_memory(self) -> Optional[KernelMemory]:
+        """Break down memory held by the kernel rather than processes (Linux only)
+        
+        Uses the /proc/meminfo read by the last get_system_memory, plus
+        vmstat, slabinfo and zram's mm_stat, and compares system used
+        memory with the RSS of every process: what no process accounts
+        for is reported as unattributed.
+        """
+        with self.profiler.stage('kernel'):
+            return self._get_kernel_memory()
+    
+    def _get_kernel_memory(self) -> Optional[KernelMemory]:
+        self.kernel = None
+        if not self.live or sys.platform == 'darwin' or not os.path.isdir(self.proc_root):
+            return None
+        
+        categories, reclaim, slab_top, zram = read_kernel_memory(self.proc_root, self.block_root, self._meminfo)
+        if self._scanned is not None:
+            process_rss_mb = sum(rss_mb for _, rss_mb in self._scanned.values())
+        else:
+            try:
+                process_rss_mb = sum(self._scan_proc_tree().rss_mb)
+            except OSError:
+                process_rss_mb = sum(proc.rss_mb for proc in self.processes)
+        self.kernel = KernelMemory(
+            categories=categories, process_rss_mb=process_rss_mb,
+            unattributed_mb=max(0.0, self.used_mem_mb - process_rss_mb),
+            reclaim=reclaim, zram=zram, slab_top=slab_top
+        )
+        return self.kernel
+    
+    def get_cgroups(self, top_n: int = 10) -> List[CgroupInfo]:
+        """Get the cgroups holding the most memory (cgroup v2 only)
+        
+        Walks the hierarchy once reading cgroup.procs and memory.current,
+        then reads memory.stat and memory.max for the top_n only. Only
+        cgroups that directly contain processes are reported, since
+        their parents' counters already include them.
+        """
+        with self.profiler.stage('cgroups'):
+            return self._get_cgroups(top_n)
+    
+    def _get_cgroups(self, top_n: int) -> List[CgroupInfo]:
+        root = self.cgroup_root
+        if not os.path.exists(os.path.join(root, 'cgroup.controllers')):
+            self.cgroups = []
+            return []  # Not a cgroup v2 (unified) hierarchy
+        
+        candidates: List[Tuple[int, str, List[int]]] = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                with open(os.path.join(directory, 'cgroup.procs'), 'rb') as f:
+                    pids = [int(pid) for pid in f.read().split()]
+                if not pids or directory == root:
+                    continue
+                with open(os.path.join(directory, 'memory.current'), 'rb') as f:
+                    current = int(f.read())
+            except (OSError, ValueError):
+                continue  # Removed mid-walk, or no memory controller here
+            candidates.append((current, directory, pids))
+        
+        top = heapq.nlargest(top_n, candidates, key=lambda c: c[0])
+        names = {proc.pid: proc.name for proc in self.processes}
+        
+        cgroups = []
+        for current, directory, pids in top:
+            path = os.path.relpath(directory, root)
+            info = CgroupInfo(
+                path=path,
+                label=cgroup_label(path),
+                current_mb=current / (1024 * 1024),
+                nprocs=len(pids),
+                top_processes=[names[pid] for pid in pids if pid in names][:5]
+            )
+            try:
+                with open(os.path.join(directory, 'memory.max'), 'rb') as f:
+                    limit = f.read().strip()
+                if limit != b'max':
+                    info.max_mb = int(limit) / (1024 * 1024)
+                with open(os.path.join(directory, 'memory.stat'), 'rb') as f:
+                    for line in f:
+                        key, _, value = line.partition(b' ')
+                        if key in (b'anon', b'file', b'kernel', b'shmem'):
+                            setattr(info, f"{key.decode()}_mb", int(value) / (1024 * 1024))
+            except (OSError, ValueError):
+                pass  # Keep what we have
+            cgroups.append(info)
+        
+        self.cgroups = cgroups
+        return cgroups
+    
+    def _scan_proc_tree(self) -> ProcessTable:
+        """pid, ppid, comm and rss_mb of every process with resident memory"""
+        table = ProcessTable()
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open(f"{entry.path}/stat", 'rb') as f:
+                        stat = f.read()
+                    # comm may contain spaces, so count fields after its closing paren
+                    close = stat.rindex(b')')
+                    fields = stat[close + 2:].split()
+                    rss_pages = int(fields[21])
+                    ppid = int(fields[1])
+                except (OSError, ValueError, IndexError):
+                    continue  # Process exited mid-scan
+                if rss_pages == 0:
+                    continue
+                comm = stat[stat.index(b'(') + 1:close].decode('utf-8', 'replace')
+                table.append(int(entry.name), comm, '', rss_pages * PAGE_SIZE_KB / 1024, ppid=ppid)
+        return table
+    
+    def _ps_tree(self) -> ProcessTable:
+        """pid, ppid, comm, rss_mb and user of every process, from ps"""
+        import subprocess
+        
+        try:
+            cmd = ['ps', '-A', '-o', 'pid=,ppid=,rss=,user=,comm=']
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except Exception:
+            return ProcessTable()
+        
+        table = ProcessTable()
+        for line in result.stdout.splitlines():
+            parts = line.split(None, 4)
+            if len(parts) < 5:
+                continue
+            try:
+                rss_mb = float(parts[2]) / 1024
+                if rss_mb > 0:
+                    # macOS reports the full executable path as comm
+                    table.append(int(parts[0]), os.path.basename(parts[4]), parts[3], rss_mb, ppid=int(parts[1]))
+            except ValueError:
+                continue
+        return table
+    
+    def _collect_processes(self, top_n: int) -> List[ProcessInfo]:
+        """Get top processes by RSS from the platform backend"""
+        
+        # macOS support
+        if sys.platform == 'darwin':
+            import subprocess
+            try:
+                # macOS ps uses different flags; lstart is five words
+                cmd = ['ps', '-ax', '-m', '-o', 'pid,user,rss,lstart,command']
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+                
+                lines = result.stdout.strip().split('\n')[1:]  # Skip header
+                processes = []
+                scanned = {} if self.leak_detector is not None else None
+                
+                for i, line in enumerate(lines):
+                    if i >= top_n * 2 and scanned is None:  # Get extra to filter
+                        break
+                    parts = line.split(None, 8)
+                    if len(parts) >= 9:
+                        try:
+                            pid = int(parts[0])
+                            user = parts[1]
+                            rss_kb = float(parts[2])
+                            rss_mb = rss_kb / 1024
+                            cmd_str = parts[8]
+                            if scanned is not None and rss_kb > 0:
+                                scanned[pid] = (' '.join(parts[3:8]), rss_mb)
+                            
+                            # Skip kernel threads
+                            if rss_mb < 1 or i >= top_n * 2:
+                                continue
+                            
+                            # Get process name
+                            name = os.path.basename(cmd_str.split()[0]) if cmd_str else 'unknown'
+                            
+                            processes.append(ProcessInfo(
+                                pid=pid,
+                                name=name,
+                                user=user,
+                                rss_mb=rss_mb,
+                                cmd=cmd_str[:100]
+                            ))
+                        except (ValueError, IndexError):
+                            continue
+                
+                # Sort by memory and take top_n
+                processes.sort(key=lambda p: p.rss_mb, reverse=True)
+                self._scanned = scanned
+                self.processes = processes[:top_n]
+                return self.processes
+                
+            except Exception as e:
+                print(f"⚠️  Error reading macOS processes: {e}", file=sys.stderr)
+                # Fall through to demo data
+        
+        # Linux support - read /proc directly unless ps was requested
+        if self.backend != 'ps' and os.path.isdir(self.proc_root):
+            try:
+                processes = self._scan_proc(top_n)
+                if processes:
+                    self.processes = processes
+                    return processes
+            except OSError as e:
+                if self.backend == 'proc':
+                    print(f"⚠️  Error scanning {self.proc_root}: {e}", file=sys.stderr)
+                # Fall through to ps
+        
+        import subprocess
+        try:
+            # Use ps to get process info
+            cmd = ['ps', 'aux', '--sort=-rss']
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            
+            lines = result.stdout.strip().split('\n')[1:]  # Skip header
+            processes = []
+            scanned = {} if self.leak_detector is not None else None
+            
+            for i, line in enumerate(lines):
+                if i >= top_n and scanned is None:
+                    break
+                parts = line.split(None, 10)  # Split on whitespace, max 11 parts
+                if len(parts) >= 11:
+                    user = parts[0]
+                    pid = int(parts[1])
+                    # RSS is in KB on most systems
+                    rss_kb = float(parts[5])
+                    rss_mb = rss_kb / 1024
+                    cmd_parts = parts[10]
+                    if scanned is not None and rss_kb > 0:
+                        # START is coarse, but tells most reused PIDs apart
+                        scanned[pid] = (parts[8], rss_mb)
+                    if i >= top_n:
+                        continue
+                    
+                    # Get process name from command
+                    name = os.path.basename(cmd_parts.split()[0]) if cmd_parts else 'unknown'
+                    
+                    processes.append(ProcessInfo(
+                        pid=pid,
+                        name=name,
+                        user=user,
+                        rss_mb=rss_mb,
+                        cmd=cmd_parts[:100]  # Truncate long commands
+                    ))
+            
+            self._scanned = scanned
+            self.processes = processes
+            return processes
+            
+        except Exception as e:
+            # If ps fails, provide mock data for demo
+            print(f"⚠️  Could not read processes - using demo data", file=sys.stderr)
+            mock_processes = [
+                ProcessInfo(12091, "chrome", "username", 3276.8, "/usr/bin/chrome --type=renderer"),
+                ProcessInfo(8432, "docker-compose", "username", 2150.4, "docker-compose up"),
+                ProcessInfo(15678, "code", "username", 1024.5, "/usr/share/code/code"),
+                ProcessInfo(14233, "node", "username", 1482.3, "node server.js"),
+                ProcessInfo(9876, "ollama", "username", 1150.0, "ollama serve"),
+                ProcessInfo(7654, "slack", "username", 856.2, "/usr/bin/slack"),
+                ProcessInfo(3421, "postgres", "username", 642.8, "postgres: main"),
+                ProcessInfo(5234, "redis-server", "username", 324.5, "redis-server *:6379"),
+            ]
+            self.processes = mock_processes
+            return mock_processes
+    
+    def _scan_proc(self, top_n: int) -> List[ProcessInfo]:
+        """Get the top_n processes by RSS straight from /proc/<pid>/statm"""
+        
+        # Keep a few spare candidates in case a winner exits before we
+        # read its status/cmdline
+        keep = top_n + 4
+        heap: List[Tuple[int, int]] = []  # min-heap of (rss_pages, pid)
+        seen = set()
+        scanned = {} if self.leak_detector is not None else None
+        
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                if self.cache_static:
+                    seen.add(int(entry.name))
+                try:
+                    if scanned is None:
+                        with open(f"{entry.path}/statm", 'rb') as f:
+                            rss_pages = int(f.read().split()[1])
+                    else:
+                        # stat has the start time as well, to tell reused PIDs apart
+                        with open(f"{entry.path}/stat", 'rb') as f:
+                            stat = f.read()
+                        fields = stat[stat.rindex(b')') + 2:].split()
+                        start_time, rss_pages = int(fields[19]), int(fields[21])
+                except (OSError, ValueError, IndexError):
+                    continue  # Process exited mid-scan
+                
+                # Kernel threads have no resident user memory
+                if rss_pages == 0:
+                    continue
+                
+                item = (rss_pages, int(entry.name))
+                if scanned is not None:
+                    scanned[item[1]] = (start_time, rss_pages * PAGE_SIZE_KB / 1024)
+                if len(heap) < keep:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        
+        processes = []
+        for rss_pages, pid in sorted(heap, reverse=True):
+            proc = self._read_proc_info(pid, rss_pages * PAGE_SIZE_KB / 1024)
+            if proc is not None:
+                processes.append(proc)
+                if len(processes) == top_n:
+                    break
+        
+        # Forget processes that have exited since the last scan
+        if self.cache_static:
+            for pid in [pid for pid in self._static_cache if pid not in seen]:
+                del self._static_cache[pid]
+        
+        self._scanned = scanned
+        return processes
+    
+    def _read_proc_info(self, pid: int, rss_mb: float) -> Optional[ProcessInfo]:
+        """Build a ProcessInfo from /proc/<pid>/status and cmdline"""
+        base = f"{self.proc_root}/{pid}"
+        
+        if self.cache_static:
+            start_time = self._start_time(pid)
+            if start_time is None:
+                return None  # Process exited mid-scan
+            cached = self._static_cache.get(pid)
+            if cached is not None and cached[0] == start_time:
+                _, name, user, cmd = cached
+                return ProcessInfo(pid=pid, name=name, user=user, rss_mb=rss_mb, cmd=cmd)
+        
+        try:
+            with open(f"{base}/status", 'rb') as f:
+                status = f.read()
+            with open(f"{base}/cmdline", 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            return None  # Process exited mid-scan
+        
+        comm = ''
+        uid = -1
+        for line in status.split(b'\n'):
+            if line.startswith(b'Name:'):
+                comm = line[5:].strip().decode('utf-8', 'replace')
+            elif line.startswith(b'Uid:'):
+                uid = int(line.split()[1])
+                break  # Uid comes after Name
+        
+        args = cmdline.rstrip(b'\0').split(b'\0')
+        cmd_str = b' '.join(args).decode('utf-8', 'replace').strip()
+        if cmd_str:
+            name = os.path.basename(cmd_str.split()[0])
+        else:
+            cmd_str = f"[{comm}]"
+            name = comm or 'unknown'
+        
+        proc = ProcessInfo(
+            pid=pid,
+            name=name,
+            user=self._username(uid),
+            rss_mb=rss_mb,
+            cmd=cmd_str[:100]
+        )
+        if self.cache_static:
+            self._static_cache[pid] = (start_time, proc.name, proc.user, proc.cmd)
+        return proc
+    
+    def _start_time(self, pid: int) -> Optional[int]:
+        """Process start time in clock ticks, to tell reused PIDs apart"""
+        try:
+            with open(f"{self.proc_root}/{pid}/stat", 'rb') as f:
+                stat = f.read()
+            # comm may contain spaces, so count fields after its closing paren
+            return int(stat[stat.rindex(b')') + 2:].split()[19])
+        except (OSError, ValueError, IndexError):
+            return None
+    
+    def sample(self, top_n: int = 20) -> Tuple[Dict[str, float], List[ProcessInfo]]:
+        """Collect memory and processes and append them to the sample ring buffer"""
+        self._scanned = None
+        self.profiler.reset()
+        with self.profiler.stage('system_memory'):
+            mem_data = self.get_system_memory()
+        with self.profiler.stage('processes'):
+            processes = self.get_processes(top_n)
+        now = time.time()
+        self.samples.append(Sample(
+            timestamp=now,
+            used_mb=mem_data.get('used_mb', 0.0),
+            top=tuple((proc.pid, proc.mem_mb) for proc in processes)
+        ))
+        
+        if self.leak_detector is not None:
+            scanned = self._scanned
+            live = None
+            if scanned is None:
+                # No whole-system listing (demo data): the top processes are all we know
+                values = [(self.process_key(proc.pid), proc.mem_mb) for proc in processes]
+            elif self.accounting == 'pss':
+                # PSS is only known for the ranked candidates; the others
+                # keep their history for as long as they're running
+                values = [(self.process_key(proc.pid), proc.pss_mb) for proc in processes
+                          if proc.pss_mb is not None and proc.pid in scanned]
+                live = {(pid, start) for pid, (start, _) in scanned.items()}
+            else:
+                values = [((pid, start), rss_mb) for pid, (start, rss_mb) in scanned.items()]
+            self.leak_detector.update(now, values, live)
+        
+        return mem_data, processes
+    
+    def process_key(self, pid: int) -> Tuple[int, object]:
+        """(pid, start time) as tracked by the leak detector"""
+        entry = self._scanned.get(pid) if self._scanned else None
+        return pid, entry[0] if entry is not None else None
+    
+    def start_warmup(self, model: str):
+        """Load the model in a worker thread while data is being collected"""
+        if self._warmup is not None:
+            return
+        import threading
+        
+        def run():
+            started = time.perf_counter()
+            self.client.warm_up(model)
+            # Wall time only: process CPU time would include the main thread's
+            self.profiler.record('warmup', time.perf_counter() - started)
+        
+        # Daemon thread: a cache hit shouldn't wait for the model to load
+        self._warmup = threading.Thread(target=run, name='wamr-warmup', daemon=True)
+        self._warmup.start()
+    
+    def _wait_warmup(self):
+        """Block until a pending warm-up has finished, recording the wait"""
+        if self._warmup is None:
+            return
+        with self.profiler.stage('warmup_wait'):
+            self._warmup.join()
+        self._warmup = None
+    
+    def detect_leaks(self) -> List[Dict]:
+        """Processes with sustained memory growth, with names filled in"""
+        if self.leak_detector is None:
+            return []
+        
+        names = {proc.pid: proc.name for proc in self.processes}
+        findings = self.leak_detector.findings(self.free_mem_mb)
+        for finding in findings:
+            pid = finding['pid']
+            name = names.get(pid)
+            if name is None:
+                cached = self._static_cache.get(pid)
+                if cached is not None:
+                    name = cached[1]
+                else:
+                    proc = self._read_proc_info(pid, finding['memory_mb'])
+                    name = proc.name if proc is not None else 'unknown'
+            finding['process'] = name
+        return findings
+    
+    def _username(self, uid: int) -> str:
+        """Resolve a uid to a user name, caching lookups"""
+        user = self._user_cache.get(uid)
+        if user is None:
+            try:
+                import pwd
+                user = pwd.getpwuid(uid).pw_name
+            except (ImportError, KeyError):
+                user = str(uid)
+            self._user_cache[uid] = user
+        return user
+    
+    def build_prompt(self, mem_data: Dict[str, float], processes: List[ProcessInfo],
+                     leaks: List[Dict], apps: Optional[List[AppInfo]] = None,
+                     classified: Optional[Dict[str, List[Dict]]] = None) -> str:
+        """Build the analysis prompt for the LLM"""
+        prompt = f"""You are a system administrator analyzing memory usage on a Linux system.
+
+SYSTEM MEMORY:
+- Total: {mem_data['total_mb']:.1f} MB
+- Used: {mem_data['used_mb']:.1f} MB ({mem_data['used_percent']:.1f}%)
+- Free: {mem_data['free_mb']:.1f} MB
+"""
+        
+        if apps is not None:
+            prompt += self._apps_prompt(apps)
+        else:
+            prompt += "\nTOP MEMORY CONSUMERS:\n"
+            for i, proc in enumerate(processes[:10], 1):
+                prompt += f"{i}. {proc.name} (PID {proc.pid}) - {proc.rss_mb:.1f} MB - User: {proc.user}\n"
+                if proc.pss_mb is not None:
+                    prompt += f"   PSS: {proc.pss_mb:.1f} MB, USS: {proc.uss_mb:.1f} MB, Swap: {proc.swap_mb:.1f} MB\n"
+                prompt += f"   Command: {proc.cmd}\n"
+        
+        local = [item for items in (classified or {}).values() for item in items]
+        if local:
+            prompt += (f"\n{len(local)} more well-known processes "
+                       f"({sum(item['memory_mb'] for item in local):.1f} MB) were classified separately; "
+                       f"don't list them.\n")
+        
+        if apps is None and any(proc.pss_mb is not None for proc in processes[:10]):
+            prompt += """
+RSS counts shared pages once per process. PSS splits shared pages between
+the processes mapping them, and USS is memory private to the process (what
+killing it would free). Base total_reclaimable_mb on USS, not RSS.
+"""
+        
+        if self.cgroups:
+            prompt += "\nCGROUPS (memory charged per systemd unit or container, includes page cache):\n"
+            for cg in self.cgroups:
+                limit = f"limit {cg.max_mb:.1f} MB" if cg.max_mb is not None else "no limit"
+                prompt += (f"- {cg.label} ({cg.path}) - {cg.current_mb:.1f} MB, {limit} - "
+                           f"anon {cg.anon_mb:.1f} MB, page cache {cg.file_mb:.1f} MB - {cg.nprocs} processes")
+                if cg.top_processes:
+                    prompt += f" incl. {', '.join(cg.top_processes)}"
+                prompt += "\n"
+        
+        if self.mappings:
+            prompt += ("\nMEMORY BY MAPPING TYPE (largest processes, RSS/PSS/swap per type; heap and anon "
+                       "are private allocations, file is mostly reclaimable mapped files and libraries, "
+                       "shmem is shared memory that can outlive the process):\n")
+            for m in self.mappings:
+                parts = ", ".join(
+                    f"{category} {sizes['rss_mb']:.1f}/{sizes['pss_mb']:.1f}/{sizes['swap_mb']:.1f} MB"
+                    for category, sizes in m.categories.items() if sizes['rss_mb'] + sizes['swap_mb'] >= 0.1
+                )
+                partial = " (partial, time budget ran out)" if not m.complete else ""
+                prompt += f"- {m.name} (PID {m.pid}, {m.mappings} mappings{partial}): {parts}\n"
+        
+        if self.shared:
+            prompt += ("\nSHARED MAPPINGS (files and shared memory mapped by several processes; resident size "
+                       "is counted once, per-process share is resident split evenly):\n")
+            for obj in self.shared:
+                resident = (f"{obj.resident_mb:.1f} MB resident, {obj.per_process_mb:.1f} MB each"
+                            if obj.resident_mb is not None else f"{obj.size_mb:.1f} MB, residency unknown")
+                prompt += (f"- {obj.path} ({obj.kind}) - {obj.nprocs} processes, {resident}"
+                           f" - e.g. {', '.join(obj.processes)}\n")
+        
+        if self.kernel:
+            kernel = self.kernel
+            prompt += (f"\nKERNEL MEMORY: {kernel.unattributed_mb:.1f} MB of used memory is not in any "
+                       f"process's RSS (all processes together: {kernel.process_rss_mb:.1f} MB RSS).\n")
+            parts = ", ".join(f"{name.replace('_', ' ')} {mb:.1f} MB"
+                              for name, mb in kernel.categories.items() if mb >= 1)
+            prompt += f"- Held by the kernel: {parts}\n"
+            if kernel.slab_top:
+                prompt += f"- Largest slab caches: {', '.join(f'{name} {mb:.1f} MB' for name, mb in kernel.slab_top)}\n"
+            if kernel.zram.get('orig_mb'):
+                prompt += (f"- zram: {kernel.zram['orig_mb']:.1f} MB of swapped data compressed into "
+                           f"{kernel.zram['used_mb']:.1f} MB of RAM\n")
+            if kernel.reclaim:
+                r = kernel.reclaim
+                prompt += (f"- Since boot: {r['allocstall']} allocation stalls in direct reclaim, "
+                           f"{r['pgscan_direct']} pages scanned directly vs {r['pgscan_kswapd']} by kswapd, "
+                           f"{r['workingset_refault']} refaults, {r['pswpout']} pages swapped out, "
+                           f"{r['oom_kill']} OOM kills\n")
+            prompt += ("Page cache and reclaimable slab are freed under pressure (most page cache isn't "
+                       "counted as used); shmem/tmpfs, unreclaimable slab and hugepages are not. "
+                       "Mention unattributed memory if it is large.\n")
+        
+        # Growth measured locally over time; a single snapshot can't show leaks
+        if leaks:
+            prompt += "\nSUSTAINED GROWTH (measured over time):\n"
+            for leak in leaks[:5]:
+                prompt += (f"- {leak['process']} (PID {leak['pid']}) growing "
+                           f"{leak['growth_mb_per_hour']:.1f} MB/hour, now {leak['memory_mb']:.1f} MB\n")
+        
+        prompt += """
+Analyze this memory usage and provide:
+1. Identify which processes are suspicious or unusual
+2. Suggest which processes can be safely reduced/killed
+3. Explain any sustained growth listed above (don't guess leaks from this snapshot alone)
+4. Provide actionable recommendations
+
+Respond in JSON format with this structure:
+{
+  "summary": "brief overall assessment",
+  "high_priority": [
+    {
+      "process": "name",
+      "pid": 1234,
+      "memory_mb": 100.0,
+      "reason": "why this is concerning",
+      "action": "what to do",
+      "command": "actual shell command to fix it (optional)"
+    }
+  ],
+  "medium_priority": [...same structure...],
+  "safe_to_ignore": [...same structure...],
+  "total_reclaimable_mb": 1234.5
+}
+
+Only return valid JSON, no other text.
+"""
+        
+        return prompt
+    
+    def _apps_prompt(self, apps: List[AppInfo]) -> str:
+        """Prompt section listing applications instead of single processes"""
+        text = "\nTOP APPLICATIONS (processes grouped by executable and parent tree):\n"
+        for i, app in enumerate(apps, 1):
+            text += f"{i}. {app.name} (root PID {app.pid}) - {app.count} processes - {app.rss_mb:.1f} MB RSS"
+            if app.pss_mb is not None:
+                text += f", {app.pss_mb:.1f} MB PSS"
+            text += f" - User: {app.user}\n   Command: {app.cmd}\n"
+        
+        covered = sum(app.rss_mb for app in apps)
+        if self.process_rss_total_mb > 0:
+            text += (f"\nThese {len(apps)} applications hold {covered:.1f} MB of the "
+                     f"{self.process_rss_total_mb:.1f} MB resident in all processes "
+                     f"({covered / self.process_rss_total_mb * 100:.0f}%).\n")
+        text += "Use the root PID as \"pid\" and the application name as \"process\".\n"
+        return text
+    
+    def analyze_with_llm(self, model: str = "llama3.2:3b",
+                         mem_data: Optional[Dict[str, float]] = None,
+                         processes: Optional[List[ProcessInfo]] = None,
+                         on_event: Optional[Callable[[str, object], None]] = None,
+                         apps: Optional[List[AppInfo]] = None) -> Optional[Dict]:
+        """Send data to Ollama for analysis
+        
+        With on_event, the response is streamed and on_event(key, value) is
+        called for the summary and each priority item as soon as it's complete.
+        In the app view, applications are listed instead of single processes.
+        """
+        # Prepare data for LLM, reusing anything the caller already collected
+        if mem_data is None:
+            mem_data = self.get_system_memory()
+        if processes is None:
+            processes = self.get_processes()
+        
+        if apps is None and self.view == 'app':
+            apps = self.get_applications()
+        
+        leaks = self.detect_leaks()
+        
+        # Known programs are answered locally; only the rest goes to the LLM
+        listed = apps if apps is not None else processes[:10]
+        classified: Dict[str, List[Dict]] = {}
+        if self.use_signatures:
+            with self.profiler.stage('classify'):
+                classified, listed = self.signature_index().classify(
+                    listed, (leak['pid'] for leak in leaks)
+                )
+        
+        self.last_cache_hit = False
+        self.last_local_only = not listed or self.offline
+        if self.last_local_only:
+            return self._attach_local_findings(self._local_analysis(classified, listed), leaks, classified)
+        
+        # Incremental: only what changed since the last answer, in its context
+        # (main() rejects --incremental with --deadline, which races several models)
+        delta = None
+        self.last_delta = False
+        if self.incremental and self.deadline is None:
+            delta = self._delta(model, mem_data, listed)
+            if delta is not None:
+                self.last_delta = True
+                if not any(delta.values()):
+                    analysis = merge_analysis(self.state.analysis, {})
+                    self._validate(analysis, processes, apps)
+                    return self._attach_local_findings(analysis, leaks, classified)
+        
+        # Build prompt
+        with self.profiler.stage('prompt_build'):
+            if delta is not None:
+                prompt = self.build_delta_prompt(mem_data, delta)
+            elif apps is not None:
+                prompt = self.build_prompt(mem_data, processes, leaks, listed, classified)
+            else:
+                prompt = self.build_prompt(mem_data, listed, leaks, None, classified)
+        self.profiler.counters['prompt_chars'] = len(prompt)
+        
+        cache_key = None
+        if self.cache is not None and delta is None:
+            cache_key = snapshot_fingerprint(
+                mem_data, listed, model if self.deadline is None else '+'.join([model] + self.hedge_models),
+                extra=(self.accounting, self.view, 'signatures' if self.use_signatures else '')
+                + tuple(leak['process'] for leak in leaks[:5])
+                + tuple(f"{cg.path}:{_bucket(cg.current_mb)}" for cg in self.cgroups or [])
+                + tuple(f"{m.name}:{category}:{_bucket(sizes['rss_mb'])}"
+                        for m in self.mappings or [] for category, sizes in m.categories.items())
+                + tuple(f"{obj.path}:{obj.nprocs}:{_bucket(obj.resident_mb or obj.size_mb)}"
+                        for obj in self.shared or [])
+                + (tuple(f"kernel:{name}:{_bucket(mb)}" for name, mb in self.kernel.categories.items())
+                   + (f"unattributed:{_bucket(self.kernel.unattributed_mb)}",) if self.kernel else ())
+            )
+            if not self.refresh_cache:
+                analysis = self.cache.get(cache_key)
+                if analysis is not None:
+                    self.last_cache_hit = True
+                    self._validate(analysis, processes, apps, cached=True)  # PIDs may have changed since
+                    return self._attach_local_findings(analysis, leaks, classified)
+        
+        if self.deadline is not None:
+            analysis = self._race(model, prompt)
+            if analysis is None:
+                return self._attach_local_findings(self._heuristic_analysis(mem_data, listed, self.deadline),
+                                                   leaks, classified)
+            self._validate(analysis, processes, apps)
+            if cache_key is not None:
+                self.cache.put(cache_key, analysis)
+            return self._attach_local_findings(analysis, leaks, classified)
+        
+        try:
+            # Call Ollama API
+            self._wait_warmup()
+            llm_started = time.perf_counter()
+            llm_cpu = time.process_time()
+            stream = on_event is not None
+            payload = {
+                'model': model,
+                'prompt': prompt,
+                'stream': stream,
+                'format': 'json'
+            }
+            if delta is not None:
+                payload['context'] = self.state.context
+            response = self.client.generate(payload, stream=stream)
+            self.profiler.record('http_connect', self.client.last_connect_s)
+            
+            if response.status_code == 200:
+                if stream:
+                    analysis_text, result = self._read_stream(response, on_event)
+                else:
+                    result = response.json()
+                    analysis_text = result.get('response', '{}')
+                self.profiler.record('llm', time.perf_counter() - llm_started, time.process_time() - llm_cpu)
+                self.profiler.record_ollama(result)
+                
+                # Parse JSON from response, keeping whatever is usable
+                with self.profiler.stage('parse'):
+                    analysis, cut = parse_analysis(analysis_text)
+                # A delta answer has the full structure too, so it's checked before merging
+                missing = missing_fields(analysis, cut)
+                if missing:
+                    print(f"⚠️  LLM response incomplete ({', '.join(missing)}), asking for just that",
+                          file=sys.stderr)
+                    with self.profiler.stage('requery'):
+                        analysis = self._requery(model, prompt, analysis, missing,
+                                                 self.state.context if delta is not None else None)
+                if analysis is None:
+                    print("Error parsing LLM response as JSON", file=sys.stderr)
+                    print(f"Raw response: {analysis_text[:500]}", file=sys.stderr)
+                    return None
+                if delta is not None:
+                    analysis = merge_analysis(self.state.analysis, analysis, (pid for pid, _ in delta['exited']))
+                counts = self._validate(analysis, processes, apps)
+                if missing or counts['dropped'] or counts['corrected']:
+                    analysis['validation'] = dict(counts, requeried=missing)
+                if cache_key is not None and not missing_fields(analysis):
+                    self.cache.put(cache_key, analysis)
+                if self.incremental:
+                    self._remember(model, result.get('context'), analysis, listed, mem_data, delta is not None)
+                return self._attach_local_findings(analysis, leaks, classified)
+            else:
+                print(f"Ollama API error: {response.status_code}", file=sys.stderr)
+                return None
+                
+        except ConnectionError:
+            print("Error: Cannot connect to Ollama. Make sure Ollama is running (ollama serve)", file=sys.stderr)
+            return None
+        except Exception as e:
+            print(f"Error calling Ollama: {e}", file=sys.stderr)
+            return None
+    
+    def _state_key(self, model: str) -> str:
+        return f"{model}|{self.view}|{self.accounting}"
+    
+    def _delta(self, model: str, mem_data: Dict[str, float], listed: List) -> Optional[Dict]:
+        """What changed since the saved state, or None when a full prompt is due
+        
+        The result has 'new' (entries), 'exited' ((pid, name) pairs),
+        'changed' ((entry, previous mb) pairs) and 'used' (previous used
+        MB, only if it moved by 5% of RAM or more); all empty means the
+        previous answer still holds.
+        """
+        if self.state is None and self.state_path:
+            self.state = load_state(self.state_path)
+        state = self.state
+        if (state is None or not state.context or state.key != self._state_key(model) or self.refresh_cache
+                or state.deltas >= INCREMENTAL_FULL_EVERY or time.time() - state.timestamp > INCREMENTAL_MAX_AGE):
+            return None
+        
+        previous = {pid: (name, mem_mb) for pid, name, mem_mb in state.listed}
+        current = {item.pid: item for item in listed}
+        delta = {
+            'new': [item for item in listed if item.pid not in previous],
+            'exited': [(pid, name) for pid, (name, _) in previous.items() if pid not in current],
+            'changed': [(item, previous[item.pid][1]) for item in listed if item.pid in previous
+                        and abs(item.mem_mb - previous[item.pid][1]) >= max(DELTA_MIN_MB,
+                                                                             previous[item.pid][1] * DELTA_MIN_RATIO)],
+            'used': [],
+        }
+        if abs(mem_data['used_mb'] - state.used_mb) >= mem_data['total_mb'] * 0.05:
+            delta['used'] = [state.used_mb]
+        if len(delta['new']) + len(delta['exited']) > max(2, len(listed) // 2):
+            return None  # Mostly different processes: start over
+        return delta
+    
+    def build_delta_prompt(self, mem_data: Dict[str, float], delta: Dict) -> str:
+        """Follow-up prompt listing only what changed since the previous answer"""
+        prompt = "\nUPDATE since your last analysis:\n"
+        previous = f" (was {delta['used'][0]:.1f} MB)" if delta['used'] else ""
+        prompt += (f"SYSTEM MEMORY: used {mem_data['used_mb']:.1f} MB "
+                   f"({mem_data['used_percent']:.1f}%){previous}\n")
+        if delta['new']:
+            prompt += "NEW:\n"
+            for item in delta['new']:
+                prompt += (f"- {item.name} (PID {item.pid}) - {item.mem_mb:.1f} MB - User: {item.user}\n"
+                           f"  Command: {item.cmd}\n")
+        if delta['changed']:
+            prompt += "CHANGED:\n"
+            for item, before in delta['changed']:
+                prompt += f"- {item.name} (PID {item.pid}) {before:.1f} MB -> {item.mem_mb:.1f} MB\n"
+        if delta['exited']:
+            prompt += "EXITED: " + ", ".join(f"{name} (PID {pid})" for pid, name in delta['exited']) + "\n"
+        prompt += (
+            "\nReply in the same JSON structure with only the NEW and CHANGED processes above "
+            "and a \"summary\" of the whole system now.\n"
+        )
+        return prompt
+    
+    def _remember(self, model: str, context: Optional[List[int]], analysis: Dict, listed: List,
+                  mem_data: Dict[str, float], was_delta: bool):
+        """Keep what the next incremental analysis builds on"""
+        import copy
+        
+        if not context:
+            self.state = None  # Nothing to continue from
+            return
+        previous = self.state
+        self.state = AnalysisState(
+            key=self._state_key(model),
+            context=list(context),
+            analysis=copy.deepcopy(analysis),
+            listed=[[item.pid, item.name, round(item.mem_mb, 1)] for item in listed],
+            used_mb=mem_data['used_mb'],
+            timestamp=previous.timestamp if was_delta else time.time(),
+            deltas=previous.deltas + 1 if was_delta else 0,
+        )
+        if self.state_path:
+            save_state(self.state_path, self.state)
+    
+    def _validate(self, analysis: Dict, processes: List[ProcessInfo],
+                  apps: Optional[List[AppInfo]], cached: bool = False) -> Dict[str, int]:
+        """validate_analysis against what the model was shown (applications by root PID)"""
+        known = {proc.pid: proc for proc in self.processes}
+        known.update((proc.pid, proc) for proc in processes)
+        known.update((app.pid, app) for app in apps or [])
+        return validate_analysis(analysis, known, cached)
+    
+    def _requery(self, model: str, prompt: str, analysis: Optional[Dict], missing: List[str],
+                 context: Optional[List[int]] = None) -> Optional[Dict]:
+        """Ask the model again for just the missing keys and merge them in
+        
+        context continues the conversation a delta prompt was sent in.
+        Entries that were complete in a list that got cut off are kept,
+        and the answer's entries for that list are added to them.
+        """
+        prompt += f"\nYour previous answer was cut off. Respond with a JSON object containing only: {', '.join(missing)}.\n"
+        listed = [f"{entry.get('process')} (PID {entry.get('pid')})"
+                  for key in PRIORITY_KEYS
+                  for entry in (analysis or {}).get(key) or [] if isinstance(entry, dict)]
+        if listed:
+            prompt += f"Don't list these again, they are already covered: {', '.join(listed)}\n"
+        
+        payload = {'model': model, 'prompt': prompt, 'stream': False, 'format': 'json'}
+        if context is not None:
+            payload['context'] = context
+        try:
+            response = self.client.generate(payload)
+            extra = None
+            if response.status_code == 200:
+                extra, _ = parse_analysis(response.json().get('response', ''))
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"⚠️  Follow-up request failed: {e}", file=sys.stderr)
+            extra = None
+        
+        if extra is None:
+            return analysis
+        if analysis is None:
+            return extra
+        for key in missing:
+            if key not in extra:
+                continue
+            if key in PRIORITY_KEYS and isinstance(analysis.get(key), list) and isinstance(extra[key], list):
+                analysis[key] = analysis[key] + extra[key]
+            else:
+                analysis[key] = extra[key]
+        return analysis
+    
+    def _race(self, model: str, prompt: str) -> Optional[Dict]:
+        """First valid analysis from model or the hedge models within self.deadline
+        
+        The model that has usually been fastest goes first; each further
+        one starts hedge_delay later, or at once when a request fails.
+        The losers' requests are cancelled, and every outcome is added
+        to model_stats.
+        """
+        import queue
+        import threading
+        
+        if self.model_stats is None:
+            self.model_stats = ModelStats()
+        stats = self.model_stats
+        models = stats.rank([model] + [m for m in self.hedge_models if m != model], self.deadline)
+        delay = self.hedge_delay
+        if delay is None:
+            usual = stats.median_latency(models[0])
+            delay = min(usual * 1.5, self.deadline / 2) if usual is not None else self.deadline / 3
+        
+        results = queue.Queue()
+        
+        def attempt(name: str, client: OllamaClient):
+            try:
+                response = client.generate(
+                    {'model': name, 'prompt': prompt, 'stream': False, 'format': 'json'}, timeout=self.deadline
+                )
+                if response.status_code != 200:
+                    raise ValueError(f"Ollama API error: {response.status_code}")
+                analysis, cut = parse_analysis(response.json().get('response', ''))
+                problem = analysis_problem(analysis) or (f"cut off in {cut[0]}" if cut else None)
+                if problem:
+                    raise ValueError(f"invalid analysis: {problem}")
+                results.put((name, analysis, None))
+            except Exception as e:
+                results.put((name, None, e))
+        
+        clients: List[OllamaClient] = []
+        started: Dict[str, float] = {}
+        
+        def launch():
+            name = models[len(clients)]
+            # Each request gets its own client: cancelling the losers mustn't
+            # abort a warm-up still running on self.client
+            client = OllamaClient(url=self.client.url, keep_alive=self.client.keep_alive)
+            clients.append(client)
+            started[name] = time.monotonic()
+            threading.Thread(target=attempt, args=(name, client), name=f"wamr-{name}", daemon=True).start()
+        
+        race_started = time.monotonic()
+        end = race_started + self.deadline
+        launch()
+        next_launch = race_started + delay
+        winner = None
+        running = 1
+        while running or len(clients) < len(models):
+            now = time.monotonic()
+            if now >= end:
+                break
+            if len(clients) < len(models) and now >= next_launch:
+                launch()
+                running += 1
+                next_launch = now + delay
+                continue
+            wake = end if len(clients) == len(models) else min(end, next_launch)
+            try:
+                name, analysis, error = results.get(timeout=wake - now)
+            except queue.Empty:
+                continue
+            running -= 1
+            launched = started.pop(name)
+            if error is not None:
+                stats.record(name, None)
+                print(f"⚠️  {name}: {error}", file=sys.stderr)
+                next_launch = time.monotonic()  # Replace it right away
+                continue
+            stats.record(name, time.monotonic() - launched)
+            winner = (name, analysis)
+            break
+        
+        for client in clients:
+            client.cancel()
+        for name in started:
+            stats.record(name, None)  # Still running at the deadline, or lost the race
+        stats.save()
+        self.profiler.record('llm', time.monotonic() - race_started)
+        self.profiler.counters['models_tried'] = len(clients)
+        
+        if winner is None:
+            self.last_model = None
+            print(f"⚠️  No model answered within {self.deadline:g}s; using local heuristics", file=sys.stderr)
+            return None
+        self.last_model, analysis = winner
+        analysis['model'] = self.last_model
+        return analysis
+    
+    @staticmethod
+    def _heuristic_analysis(mem_data: Dict[str, float], items: List, deadline: float) -> Dict:
+        """Fallback analysis from sizes alone, for when no model met the deadline"""
+        total = mem_data.get('total_mb') or 1.0
+        analysis = {
+            'summary': f"No model answered within {deadline:g}s; processes were judged by size alone.",
+            'high_priority': [], 'medium_priority': [], 'safe_to_ignore': [],
+            'total_reclaimable_mb': 0, 'source': 'heuristic'
+        }
+        for item in items:
+            share = item.mem_mb / total * 100
+            key = 'high_priority' if share >= 25 else 'medium_priority' if share >= 5 else 'safe_to_ignore'
+            entry = {'process': item.name, 'pid': item.pid, 'memory_mb': round(item.mem_mb, 1),
+                     'reason': f"Uses {share:.1f}% of RAM", 'source': 'heuristic'}
+            if key != 'safe_to_ignore':
+                entry['action'] = "Check whether this much memory is expected for it"
+            analysis[key].append(entry)
+        return analysis
+    
+    def signature_index(self) -> SignatureIndex:
+        """Index of the extra signatures followed by the built-in ones, built on first use"""
+        if self._signature_index is None:
+            self._signature_index = SignatureIndex(list(self.extra_signatures) + list(SIGNATURES))
+        return self._signature_index
+    
+    @staticmethod
+    def _local_analysis(classified: Dict[str, List[Dict]], unknown: List) -> Dict:
+        """Analysis for when the LLM isn't asked: known processes only"""
+        known = sum(len(items) for items in classified.values())
+        summary = f"{known} well-known processes classified locally"
+        if unknown:
+            summary += f"; {len(unknown)} not recognised (offline, no LLM analysis)"
+        analysis = {'summary': summary + ".", 'high_priority': [], 'medium_priority': [],
+                    'safe_to_ignore': [], 'total_reclaimable_mb': 0}
+        if unknown:
+            analysis['unclassified'] = [
+                {'process': item.name, 'pid': item.pid, 'memory_mb': round(item.mem_mb, 1),
+                 'reason': f"Unknown program, run by {item.user}"}
+                for item in unknown
+            ]
+        return analysis
+    
+    def _attach_local_findings(self, analysis: Dict, leaks: List[Dict],
+                               classified: Optional[Dict[str, List[Dict]]] = None) -> Dict:
+        """Add results computed locally (not by the LLM) to an analysis"""
+        for key, items in (classified or {}).items():
+            analysis[key] = list(analysis.get(key) or []) + items
+        if leaks:
+            analysis['leak_suspects'] = leaks
+        if self.cgroups:
+            analysis['cgroups'] = [asdict(cg) for cg in self.cgroups]
+        if self.mappings:
+            analysis['mappings'] = [asdict(m) for m in self.mappings]
+        if self.kernel:
+            analysis['kernel'] = asdict(self.kernel)
+        if self.shared:
+            analysis['shared'] = [asdict(obj) for obj in self.shared]
+            analysis['shared_costs'] = self.shared_costs
+        return analysis
+    
+    @staticmethod
+    def _read_stream(response, on_event: Callable[[str, object], None]) -> Tuple[str, Dict]:
+        """Consume a streamed /api/generate response, reporting parts as they complete
+        
+        Returns the full text and the final chunk, which carries Ollama's stats.
+        """
+        import json
+        
+        parser = StreamingJSONParser()
+        chunk: Dict = {}
+        # Read past the final (done) chunk to the end of the body, so the
+        # connection can be reused
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            for key, value in parser.feed(chunk.get('response', '')):
+                on_event(key, value)
+        return parser.text or '{}', chunk
+
+
+def format_bytes(bytes_val: float) -> str:
+    """Format bytes into human-readable format"""
+    if bytes_val < 1024:
+        return f"{bytes_val:.1f} MB"
+    else:
+        return f"{bytes_val/1024:.1f} GB"
+
+
+def print_process_table(mem_data: Dict, processes: List[ProcessInfo], accounting: str = 'rss'):
+    """Print the --no-llm process table"""
+    print(f"\nMemory: {mem_data['used_mb']:.1f}/{mem_data['total_mb']:.1f} MB ({mem_data['used_percent']:.1f}%)\n")
+    if accounting == 'pss':
+        print(f"{'PID':<8} {'USER':<12} {'RSS':<10} {'PSS':<10} {'USS':<10} {'COMMAND'}")
+        print("-" * 70)
+        for proc in processes[:15]:
+            pss = format_bytes(proc.pss_mb) if proc.pss_mb is not None else '-'
+            uss = format_bytes(proc.uss_mb) if proc.uss_mb is not None else '-'
+            print(f"{proc.pid:<8} {proc.user:<12} {format_bytes(proc.rss_mb):<10} {pss:<10} {uss:<10} {proc.cmd[:24]}")
+    else:
+        print(f"{'PID':<8} {'USER':<12} {'MEMORY':<12} {'COMMAND'}")
+        print("-" * 70)
+        for proc in processes[:15]:
+            print(f"{proc.pid:<8} {proc.user:<12} {format_bytes(proc.rss_mb):<12} {proc.cmd[:40]}")
+    print()
+
+
+def print_app_table(mem_data: Dict, apps: List[AppInfo], process_rss_total_mb: float = 0.0):
+    """Print the --no-llm application table"""
+    print(f"\nMemory: {mem_data['used_mb']:.1f}/{mem_data['total_mb']:.1f} MB ({mem_data['used_percent']:.1f}%)\n")
+    print(f"{'PID':<8} {'PROCS':<6} {'USER':<12} {'MEMORY':<12} {'APPLICATION'}")
+    print("-" * 70)
+    for app in apps:
+        print(f"{app.pid:<8} {app.count:<6} {app.user:<12} {format_bytes(app.mem_mb):<12} {app.name[:30]}")
+    if process_rss_total_mb > 0:
+        covered = sum(app.rss_mb for app in apps)
+        print(f"\n{len(apps)} applications hold {covered / process_rss_total_mb * 100:.0f}% of process RSS")
+    print()
+
+
+def print_cgroups(cgroups: List[Dict]):
+    """Print memory charged per cgroup"""
+    if not cgroups:
+        return
+    print(f"\n📦 CGROUPS ({len(cgroups)} largest)")
+    print("-" * 70)
+    for cg in cgroups:
+        limit = f" of {format_bytes(cg['max_mb'])} limit" if cg.get('max_mb') is not None else ""
+        print(f"• {cg['label']} - {format_bytes(cg['current_mb'])}{limit} "
+              f"(anon {format_bytes(cg['anon_mb'])}, cache {format_bytes(cg['file_mb'])}, {cg['nprocs']} procs)")
+
+
+def print_mappings(mappings: List[Dict]):
+    """Print the largest processes' memory by mapping type"""
+    if not mappings:
+        return
+    print(f"\n🗺️  MEMORY BY MAPPING TYPE ({len(mappings)} largest processes, RSS)")
+    print("-" * 70)
+    for m in mappings:
+        parts = ", ".join(f"{category} {format_bytes(sizes['rss_mb'])}"
+                          for category, sizes in m['categories'].items() if sizes['rss_mb'] >= 0.1)
+        swap = sum(sizes['swap_mb'] for sizes in m['categories'].values())
+        if swap >= 0.1:
+            parts += f"; swapped {format_bytes(swap)}"
+        partial = " (partial)" if not m.get('complete', True) else ""
+        print(f"• {m['name']} (PID {m['pid']}){partial} - {parts}")
+
+
+def print_shared(shared: List[Dict], costs: Optional[List[List]] = None):
+    """Print the largest objects mapped by several processes and who they're charged to"""
+    if not shared:
+        return
+    print(f"\n🔗 SHARED MAPPINGS ({len(shared)} largest mapped by several processes)")
+    print("-" * 70)
+    for obj in shared:
+        if obj.get('resident_mb') is not None:
+            size = f"{format_bytes(obj['resident_mb'])} resident, {format_bytes(obj['per_process_mb'])} per process"
+        else:
+            size = f"{format_bytes(obj['size_mb'])}, residency unknown"
+        print(f"• {obj['path']} ({obj['kind']}) - {obj['nprocs']} processes, {size}")
+        if obj.get('processes'):
+            print(f"  e.g. {', '.join(obj['processes'])}")
+    if costs:
+        print("  Most shared memory attributed to: " +
+              ", ".join(f"{name} (PID {pid}) {format_bytes(mb)}" for pid, name, mb in costs[:5]))
+
+
+def print_kernel(kernel: Optional[Dict]):
+    """Print memory held by the kernel and what no process accounts for"""
+    if not kernel:
+        return
+    print(f"\n🧠 KERNEL MEMORY ({format_bytes(kernel['unattributed_mb'])} of used memory in no process's RSS)")
+    print("-" * 70)
+    parts = [f"{name.replace('_', ' ')} {format_bytes(mb)}" for name, mb in kernel['categories'].items() if mb >= 1]
+    print(f"• {', '.join(parts) or 'nothing notable'}")
+    if kernel.get('slab_top'):
+        print(f"• Largest slab caches: {', '.join(f'{name} {format_bytes(mb)}' for name, mb in kernel['slab_top'])}")
+    zram = kernel.get('zram') or {}
+    if zram.get('orig_mb'):
+        print(f"• zram: {format_bytes(zram['orig_mb'])} stored in {format_bytes(zram['used_mb'])} of RAM")
+    reclaim = kernel.get('reclaim') or {}
+    if reclaim.get('allocstall') or reclaim.get('oom_kill'):
+        print(f"• Since boot: {reclaim['allocstall']} direct reclaim stalls, {reclaim['oom_kill']} OOM kills")
+
+
+def print_leaks(leaks: List[Dict]):
+    """Print processes flagged by the leak detector"""
+    if not leaks:
+        return
+    print(f"\n📈 SUSTAINED GROWTH ({len(leaks)} possible leaks)")
+    print("-" * 70)
+    for leak in leaks:
+        print(f"\n• {leak.get('process', 'Unknown')} (PID {leak['pid']}) - {format_bytes(leak['memory_mb'])}, "
+              f"+{leak['growth_mb_per_hour']:.1f} MB/hour over {leak['samples']} samples (r²={leak['r2']:.2f})")
+        hours = leak['hours_to_exhaustion']
+        if hours < 48:
+            print(f"  ⏳ Memory exhausted in ~{hours:.1f} hours at this rate")
+
+
+# Priority lists in the analysis JSON, in print order: (key, title, noun)
+PRIORITY_SECTIONS = (
+    ('high_priority', "🔴 HIGH PRIORITY", "issues"),
+    ('medium_priority', "🟡 MEDIUM PRIORITY", "issues"),
+    ('safe_to_ignore', "🟢 SAFE TO IGNORE", "processes"),
+    ('unclassified', "⚪ NOT CLASSIFIED", "processes"),
+)
+
+
+def _print_header(mem_data: Dict):
+    """Print the banner and overall memory status"""
+    print("\n" + "="*70)
+    print("💾 WhoAteMyRAM - Memory Analysis")
+    print("="*70)
+    
+    # System overview
+    used_percent = mem_data['used_percent']
+    if used_percent >= 80:
+        status = "🔴 CRITICAL"
+    elif used_percent >= 60:
+        status = "🟡 WARNING"
+    else:
+        status = "🟢 HEALTHY"
+    
+    print(f"\n{status} - {used_percent:.1f}% used ({format_bytes(mem_data['used_mb'])} / {format_bytes(mem_data['total_mb'])})")
+
+
+def _print_section_header(key: str, count: Optional[int] = None):
+    """Print a priority section title, with its size when known"""
+    for section_key, title, noun in PRIORITY_SECTIONS:
+        if section_key == key:
+            print(f"\n{title} ({count} {noun})" if count is not None else f"\n{title}")
+            print("-" * 70)
+            return
+
+
+def _print_item(key: str, item: Dict):
+    """Print one entry of a priority section"""
+    if key in ('safe_to_ignore', 'unclassified'):
+        print(f"• {item.get('process', 'Unknown')} ({format_bytes(item.get('memory_mb', 0))}) - {item.get('reason', 'N/A')}")
+        return
+    print(f"\n• {item.get('process', 'Unknown')} ({format_bytes(item.get('memory_mb', 0))})")
+    print(f"  Reason: {item.get('reason', 'N/A')}")
+    print(f"  Action: {item.get('action', 'N/A')}")
+    if item.get('command'):
+        print(f"  💻 Command: {item['command']}")
+
+
+def _print_footer(analysis: Dict):
+    """Print locally computed findings and the reclaimable total"""
+    # Leak detector findings and cgroups (computed locally, not by the LLM)
+    print_leaks(analysis.get('leak_suspects', []))
+    print_cgroups(analysis.get('cgroups', []))
+    print_mappings(analysis.get('mappings', []))
+    print_shared(analysis.get('shared', []), analysis.get('shared_costs'))
+    print_kernel(analysis.get('kernel'))
+    
+    # Total reclaimable
+    reclaimable = analysis.get('total_reclaimable_mb', 0)
+    if reclaimable > 0:
+        print(f"\n💰 Total Reclaimable: ~{format_bytes(reclaimable)}")
+    
+    print("\n" + "="*70 + "\n")
+
+
+def print_analysis(analysis: Dict, mem_data: Dict):
+    """Pretty print the analysis results"""
+    _print_header(mem_data)
+    
+    # Summary
+    summary = analysis.get('summary', 'No summary available')
+    print(f"\n📊 Summary: {summary}")
+    
+    # High priority, medium priority, safe to ignore
+    for key, _, _ in PRIORITY_SECTIONS:
+        items = analysis.get(key, [])
+        if items:
+            _print_section_header(key, len(items))
+            for item in items:
+                _print_item(key, item)
+    
+    _print_footer(analysis)
+
+
+class StreamingRenderer:
+    """Print analysis parts with print_analysis's layout as they stream in
+    
+    Section sizes aren't known while streaming, so section titles are
+    printed without counts. Entries are printed before the analysis is
+    validated: finish() lists the ones validation dropped or corrected,
+    then prints whatever didn't arrive through on_event (for example on
+    a cache hit, or entries added locally) and the footer.
+    """
+    
+    def __init__(self, mem_data: Dict):
+        self.mem_data = mem_data
+        self.started = time.monotonic()
+        self.first_output_s: Optional[float] = None
+        self._summary_done = False
+        self._printed: Dict[str, List[Dict]] = {}  # Section -> entries as printed
+    
+    def start(self):
+        self.started = time.monotonic()
+        _print_header(self.mem_data)
+    
+    def on_event(self, key: str, value):
+        """Render one completed part of the streamed analysis"""
+        if key == 'summary' and not self._summary_done:
+            print(f"\n📊 Summary: {value}", flush=True)
+            self._summary_done = True
+        elif key in self._section_keys() and isinstance(value, dict):
+            if key not in self._printed:
+                _print_section_header(key)
+                self._printed[key] = []
+            _print_item(key, value)
+            self._printed[key].append(value)
+            sys.stdout.flush()
+        else:
+            return
+        if self.first_output_s is None:
+            self.first_output_s = time.monotonic() - self.started
+    
+    def finish(self, analysis: Dict):
+        """Print corrections to streamed entries and any parts that weren't streamed, then the footer
+        
+        analysis is the validated result.
+        """
+        if not self._summary_done:
+            print(f"\n📊 Summary: {analysis.get('summary', 'No summary available')}")
+        corrections = []
+        for key, title, _ in PRIORITY_SECTIONS:
+            items = analysis.get(key, [])
+            printed = self._printed.get(key)
+            if printed is None and items:
+                _print_section_header(key, len(items))
+            shown = set()  # id() of validated entries already on screen
+            for entry in printed or ():
+                item = self._match(entry, items, shown)
+                where = f"{entry.get('process', 'Unknown')} (PID {entry.get('pid')}) in {title}"
+                if item is None:
+                    corrections.append(f"✗ {where}: dropped, no such process")
+                    continue
+                shown.add(id(item))
+                claimed, measured = entry.get('memory_mb'), item.get('memory_mb', 0)
+                if (str(entry.get('pid')) != str(item.get('pid')) or entry.get('process') != item.get('process')
+                        or not isinstance(claimed, (int, float)) or abs(claimed - measured) > max(1.0, measured * 0.1)):
+                    corrections.append(f"✎ {where}: is {item.get('process', 'Unknown')} (PID {item.get('pid')}, "
+                                       f"{format_bytes(measured)})")
+            for item in items:
+                if id(item) not in shown:
+                    _print_item(key, item)
+        if corrections:
+            print("\n⚠️  Corrected after checking against the process list:")
+            for line in corrections:
+                print(f"  {line}")
+        _print_footer(analysis)
+    
+    @staticmethod
+    def _match(entry: Dict, items: List[Dict], shown: set) -> Optional[Dict]:
+        """The validated entry a streamed one became: same PID, else same process name"""
+        for same in (lambda item: str(item.get('pid')) == str(entry.get('pid')),
+                     lambda item: item.get('process') == entry.get('process')):
+            for item in items:
+                if id(item) not in shown and same(item):
+                    return item
+        return None
+    
+    @staticmethod
+    def _section_keys() -> Tuple[str, ...]:
+        return tuple(key for key, _, _ in PRIORITY_SECTIONS)
+
+
+def print_profile(profiler: Profiler):
+    """Print per-stage wall and CPU times and token counts to stderr"""
+    timings = profiler.timings
+    print("\n⏱️  Stage timings:", file=sys.stderr)
+    print(f"  {'stage':<18} {'wall ms':>9} {'cpu ms':>9}", file=sys.stderr)
+    for stage, (wall, cpu) in profiler.stages.items():
+        if stage == 'warmup':
+            note = " (overlapped with collection)"
+        elif stage.startswith('ollama_'):
+            note = " (reported by Ollama)"
+        elif stage == 'http_connect' and wall == 0.0:
+            note = " (kept-alive connection reused)"
+        else:
+            note = ""
+        cpu_text = f"{cpu * 1000:>9.1f}" if cpu is not None else f"{'-':>9}"
+        print(f"  {stage:<18} {wall * 1000:>9.1f} {cpu_text}{note}", file=sys.stderr)
+    
+    # Warm-up runs alongside collection and prompt building; whatever it
+    # didn't make us wait for is time a serial run would have spent
+    if 'warmup' in timings:
+        saved = timings['warmup'] - timings.get('warmup_wait', 0.0)
+        print(f"  {'overlap saved':<18} {saved * 1000:>9.1f}", file=sys.stderr)
+    
+    counters = profiler.counters
+    if 'prompt_chars' in counters:
+        tokens = counters.get('prompt_eval_count')
+        print(f"  prompt: {counters['prompt_chars']} chars"
+              + (f", {tokens} tokens" if tokens is not None else ""), file=sys.stderr)
+    if counters.get('eval_count') and timings.get('ollama_eval'):
+        rate = counters['eval_count'] / timings['ollama_eval']
+        print(f"  generated: {counters['eval_count']} tokens ({rate:.1f} tokens/s)", file=sys.stderr)
+
+
+def watch(analyzer: MemoryAnalyzer, args):
+    """Re-sample every args.watch seconds until interrupted"""
+    import json
+    
+    analyzer.cache_static = True
+    analyzer.leak_detector = LeakDetector(min_slope_mb_per_hour=args.leak_slope)
+    interval = max(args.watch, 0.1)
+    
+    # Keep the model resident for at least two intervals
+    analyzer.client.keep_alive = f"{int(max(600, interval * 2))}s"
+    if not args.no_llm and not args.no_warmup and not args.offline:
+        analyzer.start_warmup(args.model)
+    
+    try:
+        while True:
+            started = time.monotonic()
+            mem_data, processes = analyzer.sample()
+            leaks = analyzer.detect_leaks()
+            if args.cgroups:
+                analyzer.get_cgroups()
+            if args.mappings:
+                analyzer.get_mappings(args.mappings)
+            if args.kernel:
+                analyzer.get_kernel_memory()
+            if args.shared:
+                analyzer.get_shared(args.shared)
+            
+            if not mem_data or not processes:
+                print("⚠️  Could not read memory information, retrying", file=sys.stderr)
+            elif args.no_llm:
+                if args.json:
+                    print(json.dumps({
+                        'memory': mem_data,
+                        'leak_suspects': leaks,
+                        'cgroups': [asdict(cg) for cg in analyzer.cgroups or []],
+                        'mappings': [asdict(m) for m in analyzer.mappings or []],
+                        'kernel': asdict(analyzer.kernel) if analyzer.kernel else None,
+                        'shared': [asdict(obj) for obj in analyzer.shared or []],
+                        'shared_costs': analyzer.shared_costs
+                    }), flush=True)
+                else:
+                    print(time.strftime('\n[%H:%M:%S]'), end='')
+                    if args.view == 'app':
+                        print_app_table(mem_data, analyzer.get_applications(), analyzer.process_rss_total_mb)
+                    else:
+                        print_process_table(mem_data, processes, args.accounting)
+                    print_leaks(leaks)
+                    print_cgroups([asdict(cg) for cg in analyzer.cgroups or []])
+                    print_mappings([asdict(m) for m in analyzer.mappings or []])
+                    print_shared([asdict(obj) for obj in analyzer.shared or []], analyzer.shared_costs)
+                    print_kernel(asdict(analyzer.kernel) if analyzer.kernel else None)
+            else:
+                analysis = analyzer.analyze_with_llm(model=args.model, mem_data=mem_data, processes=processes)
+                if not analysis:
+                    print("⚠️  LLM analysis failed, will retry next interval", file=sys.stderr)
+                elif args.json:
+                    if args.profile:
+                        analysis['profile'] = analyzer.profiler.to_dict()
+                    print(json.dumps(analysis), flush=True)
+                else:
+                    print(time.strftime('\n[%H:%M:%S]'), end='')
+                    with analyzer.profiler.stage('render'):
+                        print_analysis(analysis, mem_data)
+            if args.profile:
+                print_profile(analyzer.profiler)
+            
+            sys.stdout.flush()
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print()
+
+
+def _load_for_batch(path: str) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """Process pool worker: (path, snapshot, error)"""
+    try:
+        return path, load_snapshot(path), None
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+
+
+def analyze_snapshot(snapshot: Dict, model: str, client: OllamaClient,
+                     cache: Optional[AnalysisCache] = None, view: str = 'process',
+                     retries: int = 3, backoff: float = 1.0) -> Tuple[Optional[Dict], int]:
+    """Analyze one snapshot, retrying with exponential backoff and jitter
+    
+    Returns (analysis, attempts); analysis is None if every attempt failed.
+    """
+    import random
+    
+    analyzer = MemoryAnalyzer.from_snapshot(snapshot, view=view)
+    analyzer.client = client
+    analyzer.cache = cache
+    
+    attempts = 0
+    while True:
+        attempts += 1
+        analysis = analyzer.analyze_with_llm(model=model, mem_data=snapshot['memory'], processes=analyzer.processes)
+        if analysis is not None or attempts > retries:
+            return analysis, attempts
+        time.sleep(backoff * 2 ** (attempts - 1) * random.uniform(0.5, 1.0))
+
+
+def batch_main(argv: List[str]):
+    """wamr batch: analyze many snapshot files, streaming results as JSONL"""
+    import argparse
+    import json
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    
+    parser = argparse.ArgumentParser(
+        prog='wamr batch',
+        description='Analyze snapshots saved with --snapshot from many hosts'
+    )
+    parser.add_argument('files', nargs='+', help='Snapshot files to analyze')
+    parser.add_argument('-o', '--output', default='-', help='JSONL output file (default: stdout)')
+    parser.add_argument('--model', default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Maximum LLM requests in flight (default: 4)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per host after a failure (default: 3)')
+    parser.add_argument('--backoff', type=float, default=1.0, metavar='SECONDS',
+                        help='Initial retry delay, doubled on each retry (default: 1.0)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes used to load and validate snapshots (default: CPU count)')
+    parser.add_argument('--view', choices=VIEWS, default='process',
+                        help='List single processes or applications (default: process)')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help=f'Ollama server (default: {OLLAMA_URL})')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the LLM')
+    args = parser.parse_args(argv)
+    
+    concurrency = max(1, args.concurrency)
+    client = OllamaClient(url=args.ollama_url, pool_size=concurrency)
+    cache = None if args.no_cache else AnalysisCache()
+    out = sys.stdout if args.output == '-' else open(args.output, 'a')
+    
+    started = time.monotonic()
+    done = failed = 0
+    
+    def write(record: Dict):
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+    
+    def run(snapshot: Dict) -> Dict:
+        # Never raises, so one bad host can't stop the batch
+        task_started = time.monotonic()
+        record = {'host': snapshot['host']}
+        try:
+            analysis, attempts = analyze_snapshot(
+                snapshot, args.model, client, cache, args.view, args.retries, args.backoff
+            )
+        except Exception as e:
+            record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        else:
+            record.update(ok=analysis is not None, attempts=attempts)
+            if analysis is not None:
+                record['analysis'] = analysis
+            else:
+                record['error'] = 'LLM analysis failed'
+        record['seconds'] = round(time.monotonic() - task_started, 3)
+        return record
+    
+    try:
+        # Load and validate in a process pool; analyze in a bounded thread
+        # pool as snapshots become available
+        with ProcessPoolExecutor(max_workers=args.workers) as loaders, \
+                ThreadPoolExecutor(max_workers=concurrency) as scheduler:
+            pending = []
+            for path, snapshot, error in loaders.map(_load_for_batch, args.files, chunksize=8):
+                if snapshot is None:
+                    failed += 1
+                    write({'file': path, 'ok': False, 'error': f"invalid snapshot: {error}"})
+                    continue
+                pending.append(scheduler.submit(run, snapshot))
+            
+            for future in as_completed(pending):
+                record = future.result()
+                if record['ok']:
+                    done += 1
+                else:
+                    failed += 1
+                write(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    elapsed = time.monotonic() - started
+    rate = (done + failed) / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"📦 {done} hosts analyzed, {failed} failed in {elapsed:.1f}s ({rate:.1f} hosts/minute)",
+          file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+class SnapshotReader:
+    """Memory-mapped reader for files written by wamr record
+    
+    Opening a file walks the block headers once to index sample offsets
+    and timestamps; sample and string contents are only decoded when a
+    sample is read, so large histories don't need to fit in memory.
+    """
+    
+    def __init__(self, path: str):
+        import mmap
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(RECORD_MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a wamr recording")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a wamr recording")
+        
+        self.offsets = array('q')      # Payload offset of each sample
+        self.timestamps = array('d')
+        self._strings = array('q')     # Offset of each string, by id
+        self._decoded: Dict[int, str] = {}
+        self.end = self._index()       # End of the last complete block
+    
+    def _index(self) -> int:
+        data = self._map
+        pos = len(RECORD_MAGIC)
+        size = len(data)
+        while pos + _BLOCK_HEADER.size <= size:
+            tag, length = _BLOCK_HEADER.unpack_from(data, pos)
+            payload = pos + _BLOCK_HEADER.size
+            if payload + length > size:
+                break  # Truncated by a crash mid-write; ignore the tail
+            if tag == b'S':
+                self._strings.append(payload)
+            elif tag == b'R':
+                self.offsets.append(payload)
+                self.timestamps.append(_SAMPLE_HEADER.unpack_from(data, payload)[0])
+            pos = payload + length
+        return pos
+    
+    def __len__(self) -> int:
+        return len(self.offsets)
+    
+    def string(self, string_id: int) -> str:
+        text = self._decoded.get(string_id)
+        if text is None:
+            offset = self._strings[string_id]
+            (length,) = _STRING_HEADER.unpack_from(self._map, offset)
+            start = offset + _STRING_HEADER.size
+            text = self._decoded[string_id] = self._map[start:start + length].decode('utf-8', 'replace')
+        return text
+    
+    def find(self, timestamp: float) -> int:
+        """Index of the last sample taken at or before timestamp
+        
+        Raises ValueError if every sample is later.
+        """
+        import bisect
+        index = bisect.bisect_right(self.timestamps, timestamp) - 1
+        if index < 0:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+            raise ValueError(f"no sample at or before {when}")
+        return index
+    
+    def read(self, index: int) -> Dict:
+        """Sample index as a snapshot dict, in the format --snapshot writes"""
+        offset = self.offsets[index]
+        timestamp, total_mb, used_mb, free_mb, count = _SAMPLE_HEADER.unpack_from(self._map, offset)
+        
+        # Columns follow the header: pid, name, user and cmd ids, then
+        # rss, pss, uss and swap (NaN when not collected)
+        columns = []
+        pos = offset + _SAMPLE_HEADER.size
+        for code in _SAMPLE_COLUMNS:
+            columns.append(struct.unpack_from(f"<{count}{code}", self._map, pos))
+            pos += count * struct.calcsize(code)
+        pids, names, users, cmds, rss, pss, uss, swap = columns
+        
+        def optional(value: float) -> Optional[float]:
+            return None if math.isnan(value) else value
+        
+        return {
+            'version': SNAPSHOT_VERSION,
+            'host': '',
+            'timestamp': timestamp,
+            'memory': {
+                'total_mb': total_mb,
+                'used_mb': used_mb,
+                'free_mb': free_mb,
+                'used_percent': used_mb / total_mb * 100 if total_mb > 0 else 0.0,
+            },
+            'processes': [
+                {
+                    'pid': pids[i],
+                    'name': self.string(names[i]),
+                    'user': self.string(users[i]),
+                    'rss_mb': rss[i],
+                    'cmd': self.string(cmds[i]),
+                    'pss_mb': optional(pss[i]),
+                    'uss_mb': optional(uss[i]),
+                    'swap_mb': optional(swap[i]),
+                }
+                for i in range(count)
+            ],
+        }
+    
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class SnapshotWriter:
+    """Append-only writer for wamr record files
+    
+    The file is a magic header followed by blocks of (tag, length,
+    payload). 'S' blocks add one string to the string table; 'R' blocks
+    hold one sample as a fixed header plus fixed-width columns that refer
+    to names, users and commands by string id.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._ids: Dict[str, int] = {}
+        
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Continue the existing string table, dropping any torn tail
+            reader = SnapshotReader(path)
+            try:
+                for string_id in range(len(reader._strings)):
+                    self._ids[reader.string(string_id)] = string_id
+                end = reader.end
+            finally:
+                reader.close()
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(RECORD_MAGIC)
+    
+    def _string_id(self, text: str, blocks: List[bytes]) -> int:
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self._ids)
+            data = text.encode('utf-8')
+            if len(data) > _STRING_MAX:
+                # Command lines can be longer; cut at a character boundary
+                data = data[:_STRING_MAX].decode('utf-8', 'ignore').encode('utf-8')
+            blocks.append(_BLOCK_HEADER.pack(b'S', _STRING_HEADER.size + len(data)))
+            blocks.append(_STRING_HEADER.pack(len(data)) + data)
+        return string_id
+    
+    def append(self, timestamp: float, mem_data: Dict[str, float], processes: List[ProcessInfo]):
+        """Append one sample, adding any new strings first"""
+        blocks: List[bytes] = []
+        nan = float('nan')
+        count = len(processes)
+        columns = (
+            [proc.pid for proc in processes],
+            [self._string_id(proc.name, blocks) for proc in processes],
+            [self._string_id(proc.user, blocks) for proc in processes],
+            [self._string_id(proc.cmd, blocks) for proc in processes],
+            [proc.rss_mb for proc in processes],
+            [nan if proc.pss_mb is None else proc.pss_mb for proc in processes],
+            [nan if proc.uss_mb is None else proc.uss_mb for proc in processes],
+            [nan if proc.swap_mb is None else proc.swap_mb for proc in processes],
+        )
+        payload = [_SAMPLE_HEADER.pack(
+            timestamp, mem_data.get('total_mb', 0.0), mem_data.get('used_mb', 0.0),
+            mem_data.get('free_mb', 0.0), count
+        )]
+        for code, values in zip(_SAMPLE_COLUMNS, columns):
+            payload.append(struct.pack(f"<{count}{code}", *values))
+        payload_bytes = b''.join(payload)
+        
+        blocks.append(_BLOCK_HEADER.pack(b'R', len(payload_bytes)))
+        blocks.append(payload_bytes)
+        self._file.write(b''.join(blocks))
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+
+
+def _parse_time(value: str) -> float:
+    """Epoch seconds, or a local 'YYYY-MM-DD HH:MM[:SS]' time"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"can't parse time '{value}'")
+
+
+def record_main(argv: List[str]):
+    """wamr record: append samples to a recording file"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog='wamr record', description='Record memory snapshots to a file')
+    parser.add_argument('-o', '--output', default='wamr.rec', help='Recording file to append to (default: wamr.rec)')
+    parser.add_argument('--interval', type=float, default=10.0, metavar='SECONDS',
+                        help='Time between samples (default: 10)')
+    parser.add_argument('--count', type=int, default=0, help='Stop after this many samples (default: run until interrupted)')
+    parser.add_argument('--top', type=int, default=50, help='Processes kept per sample (default: 50)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Process collection backend')
+    parser.add_argument('--accounting', choices=ACCOUNTING_MODES, default='rss', help='Memory accounting mode')
+    args = parser.parse_args(argv)
+    
+    analyzer = MemoryAnalyzer(backend=args.backend, accounting=args.accounting)
+    analyzer.cache_static = True
+    try:
+        writer = SnapshotWriter(args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    recorded = 0
+    print(f"⏺️  Recording to {args.output} every {args.interval:g}s (Ctrl+C to stop)", file=sys.stderr)
+    
+    try:
+        while True:
+            started = time.monotonic()
+            mem_data, processes = analyzer.sample(top_n=args.top)
+            writer.append(time.time(), mem_data, processes)
+            recorded += 1
+            if args.count and recorded >= args.count:
+                break
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    print(f"⏹️  Recorded {recorded} samples", file=sys.stderr)
+
+
+def replay_main(argv: List[str]):
+    """wamr replay: analyze a sample from a recording file"""
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(prog='wamr replay', description='Re-analyze a recorded snapshot offline')
+    parser.add_argument('file', help='Recording written by wamr record')
+    parser.add_argument('--at', metavar='TIME',
+                        help="Use the last sample at or before TIME (epoch or 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument('--index', type=int, help='Use sample number INDEX (negative counts from the end)')
+    parser.add_argument('--list', action='store_true', help='List recorded samples and exit')
+    parser.add_argument('--model', default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')
+    parser.add_argument('--no-llm', action='store_true', help='Just show the recorded process list')
+    parser.add_argument('--json', action='store_true', help='Output raw JSON instead of formatted text')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help=f'Ollama server (default: {OLLAMA_URL})')
+    args = parser.parse_args(argv)
+    
+    try:
+        reader = SnapshotReader(args.file)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not len(reader):
+        print(f"Error: {args.file} has no samples", file=sys.stderr)
+        sys.exit(1)
+    
+    if args.list:
+        for i, timestamp in enumerate(reader.timestamps):
+            memory = reader.read(i)['memory']
+            print(f"{i:<8} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}  "
+                  f"{memory['used_percent']:5.1f}% used")
+        return
+    
+    if args.at:
+        try:
+            index = reader.find(_parse_time(args.at))
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.index is not None:
+        if not -len(reader) <= args.index < len(reader):
+            print(f"Error: --index {args.index} is out of range, {args.file} has {len(reader)} samples",
+                  file=sys.stderr)
+            sys.exit(1)
+        index = args.index % len(reader)
+    else:
+        index = len(reader) - 1
+    
+    snapshot = validate_snapshot(reader.read(index))
+    analyzer = MemoryAnalyzer.from_snapshot(snapshot)
+    analyzer.client = OllamaClient(url=args.ollama_url)
+    analyzer.cache = AnalysisCache()
+    mem_data = snapshot['memory']
+    when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['timestamp']))
+    print(f"⏪ Replaying sample {index} from {when}", file=sys.stderr)
+    
+    if args.no_llm:
+        print_process_table(mem_data, analyzer.processes)
+        return
+    
+    analysis = analyzer.analyze_with_llm(model=args.model, mem_data=mem_data, processes=analyzer.processes)
+    if not analysis:
+        print("Error: LLM analysis failed. Try --no-llm to see the recorded data.", file=sys.stderr)
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(analysis, indent=2))
+    else:
+        print_analysis(analysis, mem_data)
+
+
+# HELP text for wamr serve's own metrics
+SERVE_STATS_HELP = {
+    'collections_total': 'Collections run since start',
+    'collection_errors_total': 'Collections that failed',
+    'collection_duration_seconds': 'Time taken by the last collection',
+    'collection_timestamp_seconds': 'When the last collection finished',
+    'analyses_total': 'LLM analyses completed since start',
+    'analysis_errors_total': 'LLM analyses that failed',
+    'analysis_duration_seconds': 'Time taken by the last LLM analysis',
+    'analysis_timestamp_seconds': 'When the last LLM analysis finished',
+}
+
+
+def _metric_label(value) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(mem_data: Dict[str, float], processes: List[ProcessInfo], apps: List[AppInfo],
+                   analysis: Optional[Dict] = None, stats: Optional[Dict[str, float]] = None) -> bytes:
+    """Prometheus text exposition of a collection and the latest analysis"""
+    mb = 1024 * 1024
+    lines: List[str] = []
+    
+    def metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, float]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value:.17g}")
+    
+    for key in ('total', 'used', 'free'):
+        metric(f"wamr_memory_{key}_bytes", 'gauge', f"System memory {key}",
+               [('', mem_data.get(f'{key}_mb', 0.0) * mb)])
+    
+    proc_labels = [(f'{{pid="{proc.pid}",name="{_metric_label(proc.name)}",user="{_metric_label(proc.user)}"}}', proc)
+                   for proc in processes]
+    metric('wamr_process_resident_bytes', 'gauge', 'Resident set size of the top processes',
+           [(labels, proc.rss_mb * mb) for labels, proc in proc_labels])
+    if any(proc.pss_mb is not None for proc in processes):
+        metric('wamr_process_pss_bytes', 'gauge', 'Proportional set size of the top processes',
+               [(labels, proc.pss_mb * mb) for labels, proc in proc_labels if proc.pss_mb is not None])
+    
+    app_labels = [(f'{{name="{_metric_label(app.name)}",pid="{app.pid}",user="{_metric_label(app.user)}"}}', app)
+                  for app in apps]
+    metric('wamr_application_resident_bytes', 'gauge', 'Resident set size of the top applications',
+           [(labels, app.rss_mb * mb) for labels, app in app_labels])
+    metric('wamr_application_processes', 'gauge', 'Processes in each of the top applications',
+           [(labels, app.count) for labels, app in app_labels])
+    
+    if analysis is not None:
+        metric('wamr_analysis_items', 'gauge', 'Processes in each priority of the latest LLM analysis',
+               [(f'{{priority="{key}"}}', len(analysis.get(key) or [])) for key, _, _ in PRIORITY_SECTIONS])
+        metric('wamr_analysis_reclaimable_bytes', 'gauge', 'Reclaimable memory estimated by the latest LLM analysis',
+               [('', float(analysis.get('total_reclaimable_mb') or 0) * mb)])
+    
+    for name, value in (stats or {}).items():
+        kind = 'counter' if name.endswith('_total') else 'gauge'
+        metric(f"wamr_{name}", kind, SERVE_STATS_HELP.get(name, name), [('', value)])
+    
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class MetricsExporter:
+    """Collects on a schedule and serves the result as Prometheus metrics
+    
+    Collection and LLM analysis run in their own threads at their own
+    intervals and publish a pre-rendered page, so a scrape only returns
+    bytes: concurrent scrapes never start a /proc scan or a model call.
+    """
+    
+    def __init__(self, analyzer: MemoryAnalyzer, model: str, interval: float = 15.0,
+                 llm_interval: float = 300.0, top_n: int = 20, use_llm: bool = True):
+        import threading
+        
+        self.analyzer = analyzer
+        self.model = model
+        self.interval = interval
+        self.llm_interval = llm_interval
+        self.top_n = top_n
+        self.use_llm = use_llm
+        self.body = b''
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._collected: Optional[Tuple[Dict[str, float], List[ProcessInfo], List[AppInfo]]] = None
+        self._analysis: Optional[Dict] = None
+        self._stats: Dict[str, float] = {'collections_total': 0, 'collection_errors_total': 0,
+                                         'analyses_total': 0, 'analysis_errors_total': 0}
+    
+    def collect(self):
+        """Scan once and publish the result"""
+        started = time.perf_counter()
+        mem_data, processes = self.analyzer.sample(self.top_n)
+        apps = self.analyzer.get_applications(self.top_n)
+        with self._lock:
+            self._collected = (mem_data, processes, apps)
+            self._stats['collections_total'] += 1
+            self._stats['collection_duration_seconds'] = time.perf_counter() - started
+            self._stats['collection_timestamp_seconds'] = time.time()
+            self._publish()
+    
+    def analyze(self):
+        """Analyze the latest collection with the LLM and publish the counts"""
+        with self._lock:
+            collected = self._collected
+        if collected is None:
+            return
+        mem_data, processes, apps = collected
+        
+        # Work on a copy so collection can carry on meanwhile
+        offline = MemoryAnalyzer.from_snapshot(
+            {'memory': mem_data, 'processes': [asdict(proc) for proc in processes]},
+            accounting=self.analyzer.accounting, view=self.analyzer.view
+        )
+        offline.client = self.analyzer.client
+        offline.cache = self.analyzer.cache
+        offline.process_rss_total_mb = self.analyzer.process_rss_total_mb
+        started = time.perf_counter()
+        analysis = offline.analyze_with_llm(
+            model=self.model, mem_data=mem_data, processes=processes,
+            apps=apps if offline.view == 'app' else None
+        )
+        with self._lock:
+            if analysis is None:
+                self._stats['analysis_errors_total'] += 1
+            else:
+                self._analysis = analysis
+                self._stats['analyses_total'] += 1
+                self._stats['analysis_duration_seconds'] = time.perf_counter() - started
+                self._stats['analysis_timestamp_seconds'] = time.time()
+            self._publish()
+    
+    def _publish(self):
+        mem_data, processes, apps = self._collected
+        self.body = render_metrics(mem_data, processes, apps, self._analysis, self._stats)
+    
+    def _loop(self, step: Callable[[], None], interval: float, what: str, errors: str):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                print(f"⚠️  {what} failed: {e}", file=sys.stderr)
+                with self._lock:
+                    self._stats[errors] += 1
+            self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    
+    def start(self):
+        """Collect once, then keep collecting (and analyzing) in daemon threads"""
+        import threading
         
-        # Linux support
-        try:
-            # Use ps to get process info
-            cmd = ['ps', 'aux', '--sort=-rss']
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            processes = []
-            
-            for line in lines[:top_n]:
-                parts = line.split(None, 10)  # Split on whitespace, max 11 parts
-                if len(parts) >= 11:
-                    user = parts[0]
-                    pid = int(parts[1])
-                    # RSS is in KB on most systems
-                    rss_kb = float(parts[5])
-                    rss_mb = rss_kb / 1024
-                    cmd_parts = parts[10]
-                    
-                    # Get process name from command
-                    name = Path(cmd_parts.split()[0]).name if cmd_parts else 'unknown'
-                    
-                    processes.append(ProcessInfo(
-                        pid=pid,
-                        name=name,
-                        user=user,
-                        rss_mb=rss_mb,
-                        cmd=cmd_parts[:100]  # Truncate long commands
-                    ))
-            
-            self.processes = processes
-            return processes
-            
-        except Exception as e:
-            # If ps fails, provide mock data for demo
-            print(f"⚠️  Could not read processes - using demo data", file=sys.stderr)
-            mock_processes = [
-                ProcessInfo(12091, "chrome", "username", 3276.8, "/usr/bin/chrome --type=renderer"),
-                ProcessInfo(8432, "docker-compose", "username", 2150.4, "docker-compose up"),
-                ProcessInfo(15678, "code", "username", 1024.5, "/usr/share/code/code"),
-                ProcessInfo(14233, "node", "username", 1482.3, "node server.js"),
-                ProcessInfo(9876, "ollama", "username", 1150.0, "ollama serve"),
-                ProcessInfo(7654, "slack", "username", 856.2, "/usr/bin/slack"),
-                ProcessInfo(3421, "postgres", "username", 642.8, "postgres: main"),
-                ProcessInfo(5234, "redis-server", "username", 324.5, "redis-server *:6379"),
-            ]
-            self.processes = mock_processes
-            return mock_processes
+        self.collect()
+        threads = [threading.Thread(
+            target=self._loop, args=(self.collect, self.interval, 'Collection', 'collection_errors_total'),
+            name='wamr-collect', daemon=True
+        )]
+        if self.use_llm:
+            threads.append(threading.Thread(
+                target=self._loop, args=(self.analyze, self.llm_interval, 'Analysis', 'analysis_errors_total'),
+                name='wamr-analyze', daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+    
+    def stop(self):
+        self._stop.set()
     
-    def analyze_with_llm(self, model: str = "llama3.2:3b") -> Optional[Dict]:
-        """Send data to Ollama for analysis"""
+    def handler(self):
+        """Request handler class serving this exporter's metrics"""
+        from http.server import BaseHTTPRequestHandler
+        exporter = self
         
-        # Prepare data for LLM
-        mem_data = self.get_system_memory()
-        processes = self.get_processes()
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics':
+                    body = exporter.body
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/':
+                    body = b'<html><body><a href="/metrics">metrics</a></body></html>\n'
+                    content_type = 'text/html'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
         
-        # Build prompt
-        prompt = f"""You are a system administrator analyzing memory usage on a Linux system.
+        return Handler
 
-SYSTEM MEMORY:
-- Total: {mem_data['total_mb']:.1f} MB
-- Used: {mem_data['used_mb']:.1f} MB ({mem_data['used_percent']:.1f}%)
-- Free: {mem_data['free_mb']:.1f} MB
 
-TOP MEMORY CONSUMERS:
-"""
-        
-        for i, proc in enumerate(processes[:10], 1):
-            prompt += f"{i}. {proc.name} (PID {proc.pid}) - {proc.rss_mb:.1f} MB - User: {proc.user}\n"
-            prompt += f"   Command: {proc.cmd}\n"
-        
-        prompt += """
-Analyze this memory usage and provide:
-1. Identify which processes are suspicious or unusual
-2. Suggest which processes can be safely reduced/killed
-3. Detect any potential memory leaks
-4. Provide actionable recommendations
+def serve_main(argv: List[str]):
+    """wamr serve: expose memory and analysis results as Prometheus metrics"""
+    import argparse
+    from http.server import ThreadingHTTPServer
+    
+    parser = argparse.ArgumentParser(prog='wamr serve', description='Serve Prometheus metrics on /metrics')
+    parser.add_argument('--port', type=int, default=9877, help='Port to listen on (default: 9877)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Address to listen on; use 0.0.0.0 for remote scrapers (default: 127.0.0.1)")
+    parser.add_argument('--interval', type=float, default=15.0, metavar='SECONDS',
+                        help='Time between collections (default: 15)')
+    parser.add_argument('--llm-interval', type=float, default=300.0, metavar='SECONDS',
+                        help='Time between LLM analyses (default: 300)')
+    parser.add_argument('--top', type=int, default=20, help='Processes and applications exported (default: 20)')
+    parser.add_argument('--model', default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')
+    parser.add_argument('--no-llm', action='store_true', help='Only export collected memory data')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Process collection backend')
+    parser.add_argument('--accounting', choices=ACCOUNTING_MODES, default='rss', help='Memory accounting mode')
+    parser.add_argument('--view', choices=VIEWS, default='process',
+                        help='What the LLM is shown: single processes or applications (default: process)')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help=f'Ollama server (default: {OLLAMA_URL})')
+    args = parser.parse_args(argv)
+    
+    analyzer = MemoryAnalyzer(backend=args.backend, accounting=args.accounting, view=args.view)
+    analyzer.cache_static = True
+    # Keep the model resident between analyses
+    analyzer.client = OllamaClient(url=args.ollama_url, keep_alive=f"{int(max(600, args.llm_interval * 2))}s")
+    analyzer.cache = AnalysisCache(ttl=args.llm_interval)
+    
+    exporter = MetricsExporter(analyzer, args.model, interval=max(args.interval, 0.1),
+                               llm_interval=max(args.llm_interval, 1.0), top_n=args.top,
+                               use_llm=not args.no_llm)
+    
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128  # Room for bursts of concurrent scrapes
+    
+    try:
+        server = Server((args.host, args.port), exporter.handler())
+    except OSError as e:
+        print(f"Error: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    exporter.start()
+    print(f"📈 Serving metrics on http://{args.host}:{args.port}/metrics (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+        server.server_close()
 
-Respond in JSON format with this structure:
-{
-  "summary": "brief overall assessment",
-  "high_priority": [
-    {
-      "process": "name",
-      "pid": 1234,
-      "memory_mb": 100.0,
-      "reason": "why this is concerning",
-      "action": "what to do",
-      "command": "actual shell command to fix it (optional)"
-    }
-  ],
-  "medium_priority": [...same structure...],
-  "safe_to_ignore": [...same structure...],
-  "total_reclaimable_mb": 1234.5
-}
 
-Only return valid JSON, no other text.
-"""
+def parse_pressure(text: str) -> Dict[str, Dict[str, float]]:
+    """Parse a PSI file ('some avg10=0.00 avg60=0.00 avg300=0.00 total=0' lines)"""
+    pressure = {}
+    for line in text.splitlines():
+        kind, _, fields = line.partition(' ')
+        if kind in ('some', 'full'):
+            pressure[kind] = {key: float(value) for key, _, value in
+                              (field.partition('=') for field in fields.split())}
+    return pressure
+
+
+class PressureTrigger:
+    """A kernel PSI trigger: wait() blocks until memory stall time crosses a threshold
+    
+    Writing "some|full <stall us> <window us>" to a pressure file asks
+    the kernel to raise POLLPRI when tasks stall on memory for at least
+    that long within the window, so waiting is a single poll() with no
+    polling loop. The kernel reports at most one event per window.
+    """
+    
+    def __init__(self, stall_ms: float = 150, window_s: float = 2.0, kind: str = 'some',
+                 path: str = '/proc/pressure/memory'):
+        self.stall_ms = stall_ms
+        self.window_s = window_s
+        self.kind = kind
+        self.path = path
+        self._fd: Optional[int] = None
+        self._poller = None
+    
+    def open(self):
+        """Register the trigger; raises OSError if the kernel refuses it"""
+        import select
         
+        self._fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
         try:
-            # Call Ollama API
-            import requests
+            os.write(self._fd, f"{self.kind} {int(self.stall_ms * 1000)} {int(self.window_s * 1e6)}\0".encode())
+        except OSError:
+            self.close()
+            raise
+        self._poller = select.poll()
+        self._poller.register(self._fd, select.POLLPRI)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the threshold is crossed (True) or timeout seconds pass (False)"""
+        import select
+        
+        events = self._poller.poll(None if timeout is None else max(0, int(timeout * 1000)))
+        for _, mask in events:
+            if mask & select.POLLERR:
+                raise OSError(f"pressure trigger on {self.path} was removed")
+            if mask & select.POLLPRI:
+                return True
+        return False
+    
+    def read(self) -> Dict[str, Dict[str, float]]:
+        """Current averages and totals from the pressure file"""
+        with open(self.path, 'r') as f:
+            return parse_pressure(f.read())
+    
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def trigger_main(argv: List[str]):
+    """wamr trigger: snapshot and analyze when the kernel reports memory pressure"""
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(prog='wamr trigger',
+                                     description='Wait for memory pressure (PSI), then snapshot and analyze')
+    parser.add_argument('--stall-ms', type=float, default=150, metavar='MS',
+                        help='Stall time within the window that counts as pressure (default: 150)')
+    parser.add_argument('--window', type=float, default=2.0, metavar='SECONDS',
+                        help='PSI window, 0.5-10s; must be a multiple of 2s unless root (default: 2)')
+    parser.add_argument('--full', action='store_true',
+                        help="Trigger on 'full' stalls (all tasks stalled) instead of 'some'")
+    parser.add_argument('--pressure-file', default='/proc/pressure/memory', metavar='FILE',
+                        help="PSI file to watch, e.g. a cgroup's memory.pressure (default: /proc/pressure/memory)")
+    parser.add_argument('--debounce', type=float, default=5.0, metavar='SECONDS',
+                        help='Fold further triggers this long after the first into one analysis (default: 5)')
+    parser.add_argument('--cooldown', type=float, default=300.0, metavar='SECONDS',
+                        help='Ignore triggers for this long after an analysis (default: 300)')
+    parser.add_argument('--count', type=int, default=0,
+                        help='Stop after this many analyses (default: run until interrupted)')
+    parser.add_argument('--model', default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')
+    parser.add_argument('--no-llm', action='store_true', help='Only print the snapshot taken under pressure')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per analysis')
+    parser.add_argument('--top', type=int, default=20, help='Processes kept per snapshot (default: 20)')
+    parser.add_argument('--mappings', type=int, default=0, metavar='N',
+                        help='Also break the N largest processes down by mapping type')
+    parser.add_argument('--cgroups', action='store_true', help='Also capture memory per cgroup')
+    parser.add_argument('--kernel', action='store_true',
+                        help='Also capture kernel memory (slab, shmem, hugepages, zram) and reclaim counters')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Process collection backend')
+    parser.add_argument('--accounting', choices=ACCOUNTING_MODES, default='rss', help='Memory accounting mode')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help=f'Ollama server (default: {OLLAMA_URL})')
+    args = parser.parse_args(argv)
+    
+    analyzer = MemoryAnalyzer(backend=args.backend, accounting=args.accounting)
+    analyzer.cache_static = True
+    client = OllamaClient(url=args.ollama_url)
+    trigger = PressureTrigger(stall_ms=args.stall_ms, window_s=args.window,
+                              kind='full' if args.full else 'some', path=args.pressure_file)
+    try:
+        trigger.open()
+    except OSError as e:
+        print(f"Error: cannot register a pressure trigger on {args.pressure_file}: {e}", file=sys.stderr)
+        print("PSI needs Linux 5.2+ with CONFIG_PSI; without root the window must be a multiple of 2s.",
+              file=sys.stderr)
+        sys.exit(1)
+    
+    # Fill the static cache now, so the snapshot under pressure is a quick rescan
+    analyzer.sample(top_n=args.top)
+    print(f"⏳ Waiting for {trigger.kind} memory stalls of {args.stall_ms:g}ms per {args.window:g}s "
+          f"on {args.pressure_file} (Ctrl+C to stop)", file=sys.stderr)
+    
+    pending: Optional[Dict] = None
+    pending_at = 0.0
+    cooldown_until = 0.0
+    triggers = suppressed = analyses = 0
+    try:
+        while True:
+            timeout = None if pending is None else pending_at + args.debounce - time.monotonic()
+            fired = trigger.wait(timeout)
+            now = time.monotonic()
+            if fired:
+                triggers += 1
+                if now < cooldown_until:
+                    suppressed += 1
+                elif pending is None:
+                    # Snapshot at the moment of pressure, before any LLM work
+                    pressure = trigger.read()
+                    mem_data, _ = analyzer.sample(top_n=args.top)
+                    if args.cgroups:
+                        analyzer.get_cgroups()
+                    if args.mappings:
+                        analyzer.get_mappings(args.mappings)
+                    if args.kernel:
+                        analyzer.get_kernel_memory()
+                    pending = analyzer.to_snapshot(mem_data)
+                    pending['pressure'] = pressure
+                    pending_at = now
+                    print(time.strftime('⚠️  [%H:%M:%S] Memory pressure: ') +
+                          f"{trigger.kind} avg10={pressure[trigger.kind]['avg10']:.2f}%, "
+                          f"{mem_data['used_percent']:.1f}% used", file=sys.stderr)
             
-            response = requests.post(
-                'http://localhost:11434/api/generate',
-                json={
-                    'model': model,
-                    'prompt': prompt,
-                    'stream': False,
-                    'format': 'json'
-                },
-                timeout=60
-            )
+            if pending is None or time.monotonic() < pending_at + args.debounce:
+                continue
             
-            if response.status_code == 200:
-                result = response.json()
-                analysis_text = result.get('response', '{}')
-                
-                # Parse JSON from response
-                try:
-                    analysis = json.loads(analysis_text)
-                    return analysis
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing LLM response as JSON: {e}", file=sys.stderr)
-                    print(f"Raw response: {analysis_text[:500]}", file=sys.stderr)
-                    return None
+            snapshot, pending = pending, None
+            offline = MemoryAnalyzer.from_snapshot(snapshot, accounting=args.accounting)
+            offline.client = client
+            analysis = None
+            if not args.no_llm:
+                analysis = offline.analyze_with_llm(model=args.model, mem_data=snapshot['memory'],
+                                                    processes=offline.processes)
+                if analysis is None:
+                    print("⚠️  LLM analysis failed; the snapshot is printed instead", file=sys.stderr)
+            
+            if args.json:
+                print(json.dumps({'timestamp': snapshot['timestamp'], 'pressure': snapshot['pressure'],
+                                  'snapshot': snapshot, 'analysis': analysis}), flush=True)
+            elif analysis is not None:
+                print_analysis(analysis, snapshot['memory'])
             else:
-                print(f"Ollama API error: {response.status_code}", file=sys.stderr)
-                return None
-                
-        except ImportError:
-            print("Error: 'requests' library not installed. Install with: pip install requests", file=sys.stderr)
-            return None
-        except requests.exceptions.ConnectionError:
-            print("Error: Cannot connect to Ollama. Make sure Ollama is running (ollama serve)", file=sys.stderr)
-            return None
-        except Exception as e:
-            print(f"Error calling Ollama: {e}", file=sys.stderr)
-            return None
+                print_process_table(snapshot['memory'], offline.processes, args.accounting)
+                print_cgroups(snapshot.get('cgroups', []))
+                print_mappings(snapshot.get('mappings', []))
+                print_kernel(snapshot.get('kernel'))
+            sys.stdout.flush()
+            
+            analyses += 1
+            cooldown_until = time.monotonic() + args.cooldown
+            if args.count and analyses >= args.count:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        trigger.close()
+    print(f"⏹️  {triggers} triggers, {analyses} analyses, {suppressed} ignored during cooldown", file=sys.stderr)
 
 
-def format_bytes(bytes_val: float) -> str:
-    """Format bytes into human-readable format"""
-    if bytes_val < 1024:
-        return f"{bytes_val:.1f} MB"
-    else:
-        return f"{bytes_val/1024:.1f} GB"
+# Verdict column of wamr top, per analysis section
+TOP_VERDICTS = {'high_priority': 'HIGH', 'medium_priority': 'MEDIUM', 'safe_to_ignore': 'ok', 'unclassified': '?'}
 
 
-def print_analysis(analysis: Dict, mem_data: Dict):
-    """Pretty print the analysis results"""
+def _changed_span(old: str, new: str) -> Tuple[int, int]:
+    """[start, end) of the part of two equally long strings that differs"""
+    n = len(new)
+    start = 0
+    while start < n and old[start] == new[start]:
+        start += 1
+    if start == n:
+        return n, n
+    end = n
+    while old[end - 1] == new[end - 1]:
+        end -= 1
+    return start, end
+
+
+class ScreenDiff:
+    """Draws frames of (text, style) lines on a curses window, writing only changed cells
     
-    # Header
-    print("\n" + "="*70)
-    print("💾 WhoAteMyRAM - Memory Analysis")
-    print("="*70)
+    The previous frame is kept, and each line is compared with what is
+    already on screen: unchanged lines are skipped and changed ones are
+    rewritten from their first to their last differing cell, so a steady
+    table costs a handful of cells per refresh.
+    """
     
-    # System overview
-    used_percent = mem_data['used_percent']
-    if used_percent >= 80:
-        status = "🔴 CRITICAL"
-    elif used_percent >= 60:
-        status = "🟡 WARNING"
-    else:
-        status = "🟢 HEALTHY"
+    def __init__(self, window, styles: Dict[str, int]):
+        self.window = window
+        self.styles = styles
+        self.cells = 0  # Written by the last draw
+        self._shown: List[Tuple[str, str]] = []
     
-    print(f"\n{status} - {used_percent:.1f}% used ({format_bytes(mem_data['used_mb'])} / {format_bytes(mem_data['total_mb'])})")
+    def reset(self):
+        """Forget what is on screen (e.g. after a resize), so the next draw repaints it all"""
+        self.window.erase()
+        self._shown = []
     
-    # Summary
-    summary = analysis.get('summary', 'No summary available')
-    print(f"\n📊 Summary: {summary}")
+    def draw(self, lines: List[Tuple[str, str]]):
+        import curses
+        
+        height, width = self.window.getmaxyx()
+        width -= 1  # Writing the bottom-right cell would scroll the window
+        frame = [(text[:width].ljust(width), style) for text, style in lines[:height]]
+        frame += [(' ' * width, '')] * (min(len(self._shown), height) - len(frame))
+        
+        self.cells = 0
+        for y, (text, style) in enumerate(frame):
+            old = self._shown[y] if y < len(self._shown) else None
+            if old is None or old[1] != style or len(old[0]) != len(text):
+                start, end = 0, len(text)
+            else:
+                start, end = _changed_span(old[0], text)
+                if start == end:
+                    continue
+            try:
+                self.window.addstr(y, start, text[start:end], self.styles.get(style, 0))
+            except curses.error:
+                pass  # Shrunk mid-draw; the resize repaints everything
+            self.cells += end - start
+        self._shown = frame
+        self.window.noutrefresh()
+        curses.doupdate()
+
+
+class _LastLines:
+    """Stands in for stderr while curses owns the terminal, keeping the last few lines"""
     
-    # High priority issues
-    high_priority = analysis.get('high_priority', [])
-    if high_priority:
-        print(f"\n🔴 HIGH PRIORITY ({len(high_priority)} issues)")
-        print("-" * 70)
-        for item in high_priority:
-            print(f"\n• {item.get('process', 'Unknown')} ({format_bytes(item.get('memory_mb', 0))})")
-            print(f"  Reason: {item.get('reason', 'N/A')}")
-            print(f"  Action: {item.get('action', 'N/A')}")
-            if item.get('command'):
-                print(f"  💻 Command: {item['command']}")
-    
-    # Medium priority
-    medium_priority = analysis.get('medium_priority', [])
-    if medium_priority:
-        print(f"\n🟡 MEDIUM PRIORITY ({len(medium_priority)} issues)")
-        print("-" * 70)
-        for item in medium_priority:
-            print(f"\n• {item.get('process', 'Unknown')} ({format_bytes(item.get('memory_mb', 0))})")
-            print(f"  Reason: {item.get('reason', 'N/A')}")
-            print(f"  Action: {item.get('action', 'N/A')}")
-            if item.get('command'):
-                print(f"  💻 Command: {item['command']}")
-    
-    # Safe to ignore
-    safe = analysis.get('safe_to_ignore', [])
-    if safe:
-        print(f"\n🟢 SAFE TO IGNORE ({len(safe)} processes)")
-        print("-" * 70)
-        for item in safe:
-            print(f"• {item.get('process', 'Unknown')} ({format_bytes(item.get('memory_mb', 0))}) - {item.get('reason', 'N/A')}")
+    def __init__(self, keep: int = 20):
+        self.lines = deque(maxlen=keep)
     
-    # Total reclaimable
-    reclaimable = analysis.get('total_reclaimable_mb', 0)
-    if reclaimable > 0:
-        print(f"\n💰 Total Reclaimable: ~{format_bytes(reclaimable)}")
+    def write(self, text: str) -> int:
+        self.lines.extend(line.strip() for line in text.splitlines() if line.strip())
+        return len(text)
     
-    print("\n" + "="*70 + "\n")
+    def flush(self):
+        pass
 
 
-def main():
-    """Main entry point"""
+def _own_usage() -> Tuple[float, float]:
+    """(CPU seconds, resident MB) of this process"""
+    times = os.times()
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            rss_mb = int(f.read().split()[1]) * PAGE_SIZE_KB / 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak rather than current, in bytes on macOS and KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_mb = peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+    return times.user + times.system, rss_mb
+
+
+class Dashboard:
+    """State and layout of wamr top
+    
+    collect() samples in the calling thread; LLM analysis runs in a
+    daemon thread on a copy of the latest sample (as in wamr serve), and
+    its result is picked up by the next lines() call, so the screen never
+    waits for the model.
+    """
+    
+    def __init__(self, analyzer: MemoryAnalyzer, model: str, use_llm: bool = True):
+        import threading
+        
+        self.analyzer = analyzer
+        self.model = model
+        self.use_llm = use_llm
+        self.mem_data: Dict[str, float] = {}
+        self.processes: List[ProcessInfo] = []
+        self.apps: List[AppInfo] = []
+        self.leaks: List[Dict] = []
+        self.analysis: Optional[Dict] = None
+        self.analyzed_at = 0.0         # Wall time the shown analysis was made
+        self.analysis_note = ''        # 'saved', or why the last analysis failed
+        self.collect_ms = 0.0
+        self.cpu_percent = 0.0
+        self.rss_mb = 0.0
+        self._verdicts: Dict[int, Tuple[str, str]] = {}
+        self._analyzing_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._usage: Optional[Tuple[float, float]] = None
+    
+    def load_saved(self):
+        """Show the analysis --incremental saved last, if it's recent and for this model and view"""
+        path = os.path.join(cache_dir(), 'state', 'incremental.json')
+        state = load_state(path)
+        if state is None or state.key != self.analyzer._state_key(self.model):
+            return
+        if time.time() - state.timestamp > INCREMENTAL_MAX_AGE:
+            return
+        self._set_analysis(state.analysis, state.timestamp, 'saved')
+    
+    def set_view(self, view: str):
+        """Switch between processes and applications, dropping verdicts made for the other"""
+        self.analyzer.view = view
+        self.apps = []
+        with self._lock:
+            self.analysis = None
+            self.analysis_note = ''
+            self._verdicts = {}
+    
+    def _set_analysis(self, analysis: Dict, when: float, note: str = ''):
+        verdicts = {}
+        for key in TOP_VERDICTS:
+            for item in analysis.get(key) or []:
+                pid = item.get('pid') if isinstance(item, dict) else None
+                if isinstance(pid, int) and pid not in verdicts:
+                    verdicts[pid] = (key, str(item.get('reason', '')))
+        with self._lock:
+            self.analysis = analysis
+            self.analyzed_at = when
+            self.analysis_note = note
+            self._verdicts = verdicts
+    
+    def collect(self, top_n: int):
+        """Sample memory, processes (or applications) and growth"""
+        started = time.perf_counter()
+        self.mem_data, self.processes = self.analyzer.sample(top_n)
+        if self.analyzer.view == 'app':
+            self.apps = self.analyzer.get_applications(top_n)
+        self.leaks = self.analyzer.detect_leaks()
+        self.collect_ms = (time.perf_counter() - started) * 1000
+        
+        # CPU use since the previous collection, so startup isn't counted
+        now, cpu, self.rss_mb = (time.monotonic(),) + _own_usage()
+        if self._usage is not None and now > self._usage[0]:
+            self.cpu_percent = (cpu - self._usage[1]) / (now - self._usage[0]) * 100
+        self._usage = (now, cpu)
+    
+    @property
+    def analyzing(self) -> bool:
+        return self._analyzing_since is not None
+    
+    def start_analysis(self):
+        """Analyze the latest sample in a daemon thread, unless one is already running"""
+        import threading
+        
+        if not self.use_llm or self.analyzing or not self.mem_data or not self.processes:
+            return
+        mem_data, processes, view = self.mem_data, self.processes, self.analyzer.view
+        apps = self.apps if view == 'app' else None
+        
+        def run():
+            try:
+                # Work on a copy so sampling can carry on meanwhile
+                offline = MemoryAnalyzer.from_snapshot(
+                    {'memory': mem_data, 'processes': [asdict(proc) for proc in processes]},
+                    accounting=self.analyzer.accounting, view=view
+                )
+                offline.client = self.analyzer.client
+                offline.cache = self.analyzer.cache
+                offline.process_rss_total_mb = self.analyzer.process_rss_total_mb
+                analysis = offline.analyze_with_llm(model=self.model, mem_data=mem_data,
+                                                    processes=processes, apps=apps)
+            except Exception as e:
+                analysis = None
+                print(f"⚠️  Analysis failed: {e}", file=sys.stderr)
+            try:
+                if view != self.analyzer.view:
+                    pass  # Switched views meanwhile
+                elif analysis is not None:
+                    self._set_analysis(analysis, time.time())
+                else:
+                    with self._lock:
+                        self.analysis_note = 'failed'
+            finally:
+                self._analyzing_since = None
+        
+        self._analyzing_since = time.monotonic()
+        threading.Thread(target=run, name='wamr-analyze', daemon=True).start()
+    
+    def _growth(self, pids: Iterable[int]) -> Optional[float]:
+        """Fitted growth in MB/hour, summed over pids (least-squares slopes add up)
+        
+        PIDs seen fewer than the detector's min_samples times are left
+        out: over a few seconds the slope is mostly noise.
+        """
+        detector = self.analyzer.leak_detector
+        if detector is None:
+            return None
+        total = None
+        for pid in pids:
+            key = self.analyzer.process_key(pid)
+            fit = detector.trend(key) if detector.samples(key) >= detector.min_samples else None
+            if fit is not None:
+                total = (total or 0.0) + fit[0]
+        return total
+    
+    def lines(self, width: int, height: int, interval: float, warning: str = '') -> List[Tuple[str, str]]:
+        """The screen as (text, style) lines"""
+        mem = self.mem_data
+        view = self.analyzer.view
+        lines = [(f"wamr top - {time.strftime('%H:%M:%S')}  every {interval:g}s  view: {view}"
+                  f"    q quit  v view  l analyze now", 'title')]
+        if mem:
+            filled = int(round(mem['used_percent'] / 5))
+            style = 'high' if mem['used_percent'] >= 80 else 'medium' if mem['used_percent'] >= 60 else ''
+            lines.append((f"Memory [{'#' * filled}{'.' * (20 - filled)}] {mem['used_percent']:5.1f}%  "
+                          f"used {format_bytes(mem['used_mb'])} of {format_bytes(mem['total_mb'])}, "
+                          f"free {format_bytes(mem['free_mb'])}", style))
+        else:
+            lines.append(("Memory: could not be read", 'high'))
+        
+        with self._lock:
+            analysis, analyzed_at, note, verdicts = self.analysis, self.analyzed_at, self.analysis_note, self._verdicts
+        if not self.use_llm:
+            status = "LLM: off (--no-llm)"
+        elif analysis is None:
+            status = "LLM: no analysis yet"
+        else:
+            age = max(0, int(time.time() - analyzed_at))
+            origin = f"{analysis.get('model', self.model)}, {age}s ago" + (f", {note}" if note else '')
+            status = f"LLM ({origin}): {analysis.get('summary', '')}"
+        if self._analyzing_since is not None:
+            status += f"  [analyzing {time.monotonic() - self._analyzing_since:.0f}s]"
+        elif note == 'failed' and analysis is not None:
+            status += "  [last attempt failed]"
+        lines.append((status, 'dim'))
+        lines.append(('', ''))
+        
+        leak_pids = {leak['pid'] for leak in self.leaks}
+        if view == 'app':
+            lines.append((f"{'PID':<8} {'PROCS':<6} {'USER':<10} {'MEMORY':<10} {'GROWTH/h':>9}  "
+                          f"{'VERDICT':<7} {'APPLICATION':<30} REASON", 'head'))
+            rows = [(app.pid, f"{app.count:<6} ", app.user, app.mem_mb, self._growth(app.pids),
+                     app.name, any(pid in leak_pids for pid in app.pids)) for app in self.apps]
+        else:
+            lines.append((f"{'PID':<8} {'USER':<10} {'MEMORY':<10} {'GROWTH/h':>9}  "
+                          f"{'VERDICT':<7} {'COMMAND':<30} REASON", 'head'))
+            rows = [(proc.pid, '', proc.user, proc.mem_mb, self._growth((proc.pid,)),
+                     proc.cmd or proc.name, proc.pid in leak_pids) for proc in self.processes]
+        
+        for pid, extra, user, mem_mb, growth, label, leaking in rows[:max(0, height - len(lines) - 1)]:
+            key, reason = verdicts.get(pid, (None, ''))
+            verdict = TOP_VERDICTS.get(key, '')
+            style = 'high' if key == 'high_priority' else 'medium' if key == 'medium_priority' else ''
+            if leaking:
+                verdict = verdict or 'LEAK'
+                reason = reason or 'sustained growth'
+                style = style or 'leak'
+            growth_text = f"{growth:+9.1f}" if growth is not None and abs(growth) >= 0.05 else f"{'':>9}"
+            lines.append((f"{pid:<8} {extra}{user[:10]:<10} {format_bytes(mem_mb):<10} {growth_text}  "
+                          f"{verdict:<7} {label[:30]:<30} {reason}", style))
+        
+        lines += [('', '')] * (height - len(lines) - 1)
+        footer = (f"wamr: {self.cpu_percent:.1f}% CPU, {self.rss_mb:.0f} MB, "
+                  f"sample {self.collect_ms:.0f} ms")
+        lines.append((footer + (f"  | {warning}" if warning else ''), 'dim'))
+        return lines
+
+
+def top_main(argv: List[str]):
+    """wamr top: full-screen live view of memory, growth and LLM verdicts"""
     import argparse
     
-    parser = argparse.ArgumentParser(
-        description='WhoAteMyRAM - LLM-powered memory analysis',
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        '--model',
-        default='llama3.2:3b',
-        help='Ollama model to use (default: llama3.2:3b)'
-    )
-    parser.add_argument(
-        '--json',
-        action='store_true',
-        help='Output raw JSON instead of formatted text'
-    )
-    parser.add_argument(
-        '--no-llm',
-        action='store_true',
-        help='Skip LLM analysis, just show process list'
-    )
-    parser.add_argument(
-        '--demo',
-        action='store_true',
-        help='Run in demo mode with mock data (no system access required)'
-    )
+    parser = argparse.ArgumentParser(prog='wamr top', description='Live memory dashboard (q quits)')
+    parser.add_argument('--interval', type=duration, default=1.0, metavar='TIME',
+                        help='Time between refreshes (default: 1s)')
+    parser.add_argument('--llm-interval', type=duration, default=60.0, metavar='TIME',
+                        help='Time between background LLM analyses (default: 60s)')
+    parser.add_argument('--view', choices=VIEWS, default='process',
+                        help='Show single processes or applications (default: process)')
+    parser.add_argument('--model', default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')
+    parser.add_argument('--no-llm', action='store_true', help='Only show collected data')
+    parser.add_argument('--leak-slope', type=float, default=10.0, metavar='MB_PER_HOUR',
+                        help='Growth flagged as a leak (default: 10)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Process collection backend')
+    parser.add_argument('--accounting', choices=ACCOUNTING_MODES, default='rss', help='Memory accounting mode')
+    parser.add_argument('--ollama-url', default=OLLAMA_URL, help=f'Ollama server (default: {OLLAMA_URL})')
+    args = parser.parse_args(argv)
+    
+    try:
+        import curses
+    except ImportError:
+        print("Error: wamr top needs the curses module", file=sys.stderr)
+        sys.exit(1)
+    if not sys.stdout.isatty():
+        print("Error: wamr top needs a terminal; use --watch for plain output", file=sys.stderr)
+        sys.exit(1)
+    
+    interval = max(args.interval, 0.1)
+    llm_interval = max(args.llm_interval, 1.0)
+    analyzer = MemoryAnalyzer(backend=args.backend, accounting=args.accounting, view=args.view)
+    analyzer.cache_static = True
+    analyzer.leak_detector = LeakDetector(min_slope_mb_per_hour=args.leak_slope)
+    # Keep the model resident between analyses
+    analyzer.client = OllamaClient(url=args.ollama_url, keep_alive=f"{int(max(600, llm_interval * 2))}s")
+    analyzer.cache = AnalysisCache(ttl=llm_interval)
+    dashboard = Dashboard(analyzer, args.model, use_llm=not args.no_llm)
+    dashboard.load_saved()
+    
+    def run(stdscr):
+        styles = {'title': curses.A_REVERSE, 'head': curses.A_BOLD, 'dim': curses.A_DIM}
+        if curses.has_colors():
+            curses.use_default_colors()
+            for pair, (style, color) in enumerate((('high', curses.COLOR_RED), ('medium', curses.COLOR_YELLOW),
+                                                  ('leak', curses.COLOR_MAGENTA)), start=1):
+                curses.init_pair(pair, color, -1)
+                styles[style] = curses.color_pair(pair)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        screen = ScreenDiff(stdscr, styles)
+        
+        next_sample = next_analysis = 0.0
+        while True:
+            height, width = stdscr.getmaxyx()
+            now = time.monotonic()
+            if now >= next_sample:
+                dashboard.collect(max(20, height))
+                next_sample = now + interval
+            if now >= next_analysis:
+                dashboard.start_analysis()
+                next_analysis = now + llm_interval
+            warning = stderr.lines[-1] if stderr.lines else ''
+            screen.draw(dashboard.lines(width, height, interval, warning))
+            
+            stdscr.timeout(max(1, int((next_sample - time.monotonic()) * 1000)))
+            key = stdscr.getch()
+            if key in (ord('q'), ord('Q'), 27):
+                return
+            if key == curses.KEY_RESIZE:
+                screen.reset()
+            elif key == ord('v'):
+                dashboard.set_view('app' if analyzer.view == 'process' else 'process')
+                next_sample = next_analysis = 0.0
+            elif key == ord('l'):
+                next_analysis = 0.0
+    
+    # Warnings would scribble over the screen; keep them for the footer instead
+    real_stderr, stderr = sys.stderr, _LastLines()
+    sys.stderr = stderr
+    try:
+        curses.wrapper(run)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stderr = real_stderr
+
+
+# Subcommands: wamr <command> [options]
+COMMANDS = {
+    'batch': batch_main,
+    'record': record_main,
+    'replay': replay_main,
+    'serve': serve_main,
+    'top': top_main,
+    'trigger': trigger_main,
+}
+
+
+def duration(value: str) -> float:
+    """Seconds from '5', '5s', '500ms' or '2m'"""
+    value = value.strip().lower()
+    for suffix, scale in (('ms', 0.001), ('s', 1.0), ('m', 60.0)):
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * scale
+    return float(value)
+
+
+# Options of the main command, as (flags, add_argument keywords), so
+# common invocations can be parsed without importing argparse
+MAIN_OPTIONS = (
+    (('--model',), dict(default='llama3.2:3b', help='Ollama model to use (default: llama3.2:3b)')),
+    (('--deadline',), dict(type=duration, metavar='TIME',
+        help='Latency budget for the LLM, e.g. 5s: race --model and --hedge models, '
+             'falling back to local heuristics if none answers in time (not with --incremental or --stream)')),
+    (('--hedge',), dict(default='', metavar='MODELS',
+        help='Comma-separated models to race against --model under --deadline')),
+    (('--hedge-delay',), dict(type=duration, metavar='TIME',
+        help='Start each further model this long after the previous one (default: from past latencies)')),
+    (('--json',), dict(action='store_true', help='Output raw JSON instead of formatted text')),
+    (('--no-llm',), dict(action='store_true', help='Skip LLM analysis, just show process list')),
+    (('--demo',), dict(action='store_true',
+        help='Run in demo mode with mock data (no system access required)')),
+    (('--backend',), dict(choices=BACKENDS, default='auto',
+        help='Process collection backend: read /proc directly or fork ps (default: auto)')),
+    (('--accounting',), dict(choices=ACCOUNTING_MODES, default='rss',
+        help='Memory accounting: plain RSS, or PSS/USS from smaps_rollup (default: rss)')),
+    (('--smaps-budget',), dict(type=float, default=2.0, metavar='SECONDS',
+        help='Total time allowed for reading smaps_rollup in pss mode (default: 2.0)')),
+    (('--cgroups',), dict(action='store_true',
+        help='Include memory charged per cgroup v2 group (systemd units, containers)')),
+    (('--mappings',), dict(type=int, default=0, metavar='N',
+        help='Break the N largest processes down by mapping type (heap, anon, file, ...) from smaps')),
+    (('--mappings-budget',), dict(type=float, default=1.0, metavar='SECONDS',
+        help='Total time allowed for reading smaps for --mappings (default: 1.0)')),
+    (('--shared',), dict(type=int, default=0, metavar='N',
+        help='Index /proc/*/maps and show the N largest files and shm segments mapped by several processes')),
+    (('--shared-budget',), dict(type=float, default=2.0, metavar='SECONDS',
+        help='Total time allowed for building the --shared index (default: 2.0)')),
+    (('--kernel',), dict(action='store_true',
+        help='Break down memory held by the kernel (slab, shmem, hugepages, page cache, zram) '
+             'and report what no process accounts for')),
+    (('--view',), dict(choices=VIEWS, default='process',
+        help='List single processes or applications grouped by process tree (default: process)')),
+    (('--watch',), dict(type=float, metavar='SECONDS', help='Keep running and re-sample every SECONDS')),
+    (('--leak-slope',), dict(type=float, default=10.0, metavar='MB_PER_HOUR',
+        help='Growth rate --watch reports as a possible leak (default: 10.0)')),
+    (('--stream',), dict(action='store_true',
+        help='Stream the LLM response and print each part as soon as it is ready')),
+    (('--snapshot',), dict(metavar='FILE',
+        help="Save the collected data as JSON for 'wamr batch' ('-' for stdout)")),
+    (('--ollama-url',), dict(default=OLLAMA_URL, help=f'Ollama server to use (default: {OLLAMA_URL})')),
+    (('--no-warmup',), dict(action='store_true',
+        help="Don't load the model in the background while collecting data")),
+    (('--profile', '--timings'), dict(action='store_true', dest='profile',
+        help='Print wall/CPU time per stage to stderr (and add it to --json output)')),
+    (('--incremental',), dict(action='store_true',
+        help="After a full analysis, send only what changed, continuing the model's context "
+             "(across --watch iterations and between runs)")),
+    (('--no-cache',), dict(action='store_true',
+        help='Always call the LLM and leave the analysis cache alone')),
+    (('--refresh',), dict(action='store_true', help='Ignore cached analyses but store the new result')),
+    (('--cache-ttl',), dict(type=float, default=600, metavar='SECONDS',
+        help='How long a cached analysis stays valid (default: 600)')),
+    (('--signatures',), dict(metavar='FILE',
+        help='JSON file of extra known-process signatures, checked before the built-in ones')),
+    (('--no-signatures',), dict(action='store_true',
+        help='Send every listed process to the LLM instead of classifying known ones locally')),
+    (('--offline',), dict(action='store_true',
+        help='Classify known processes locally and never call the LLM')),
+)
+
+
+def _parse_args_quick(argv: List[str]):
+    """Parse argv against MAIN_OPTIONS, or return None to leave it to argparse
+    
+    Only exact flags with valid values are handled here; --help,
+    abbreviations and anything invalid go to argparse, which reports them.
+    """
+    from types import SimpleNamespace
     
-    args = parser.parse_args()
+    args = SimpleNamespace()
+    options = {}
+    for flags, kwargs in MAIN_OPTIONS:
+        dest = kwargs.get('dest', flags[0].lstrip('-').replace('-', '_'))
+        flag_only = kwargs.get('action') == 'store_true'
+        setattr(args, dest, False if flag_only else kwargs.get('default'))
+        for flag in flags:
+            options[flag] = (dest, flag_only, kwargs)
+    
+    remaining = iter(argv)
+    for arg in remaining:
+        flag, has_value, value = arg.partition('=')
+        if flag not in options:
+            return None
+        dest, flag_only, kwargs = options[flag]
+        if flag_only:
+            if has_value:
+                return None
+            setattr(args, dest, True)
+            continue
+        if not has_value:
+            value = next(remaining, None)
+            if value is None or value.startswith('-'):
+                return None
+        try:
+            value = kwargs.get('type', str)(value)
+        except ValueError:
+            return None
+        if value not in kwargs.get('choices', (value,)):
+            return None
+        setattr(args, dest, value)
+    return args
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
+    args = _parse_args_quick(sys.argv[1:])
+    if args is None:
+        import argparse
+        
+        parser = argparse.ArgumentParser(
+            description='WhoAteMyRAM - LLM-powered memory analysis',
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog='commands:\n'
+                   '  wamr batch FILE...    analyze snapshots from many hosts\n'
+                   '  wamr record           append snapshots to a recording file\n'
+                   '  wamr replay FILE      re-analyze a recorded snapshot offline\n'
+                   '  wamr serve            serve Prometheus metrics on /metrics\n'
+                   '  wamr top              live full-screen dashboard with background LLM verdicts\n'
+                   '  wamr trigger          analyze when the kernel reports memory pressure\n'
+                   "run 'wamr <command> --help' for a command's options"
+        )
+        for flags, kwargs in MAIN_OPTIONS:
+            parser.add_argument(*flags, **kwargs)
+        args = parser.parse_args()
+    # A race isn't streamed, and a delta only continues one model's context
+    for flag in ('--incremental', '--stream'):
+        if args.deadline is not None and getattr(args, flag[2:]):
+            print(f"wamr: error: argument --deadline: not allowed with argument {flag}", file=sys.stderr)
+            sys.exit(2)
     
     # Demo mode - just run the demo script logic
     if args.demo:
         print("🎬 Running in DEMO mode (using mock data)\n")
         import importlib.util
-        demo_path = Path(__file__).parent / "demo.py"
-        if demo_path.exists():
+        demo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo.py")
+        if os.path.exists(demo_path):
             spec = importlib.util.spec_from_file_location("demo", demo_path)
             demo = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(demo)
@@ -442,10 +5350,43 @@ def main():
             print("Demo file not found. Install wamr properly to use demo mode.", file=sys.stderr)
         return
     
-    analyzer = MemoryAnalyzer()
+    analyzer = MemoryAnalyzer(
+        backend=args.backend,
+        accounting=args.accounting,
+        smaps_budget=args.smaps_budget,
+        view=args.view,
+        mappings_budget=args.mappings_budget,
+        shared_budget=args.shared_budget
+    )
+    analyzer.client = OllamaClient(url=args.ollama_url)
+    if not args.no_cache:
+        analyzer.cache = AnalysisCache(ttl=args.cache_ttl)
+        analyzer.refresh_cache = args.refresh
+    analyzer.deadline = args.deadline
+    if args.incremental:
+        analyzer.incremental = True
+        analyzer.state_path = os.path.join(cache_dir(), 'state', 'incremental.json')
+    analyzer.hedge_models = [model for model in args.hedge.split(',') if model]
+    analyzer.hedge_delay = args.hedge_delay
+    analyzer.use_signatures = not args.no_signatures or args.offline
+    analyzer.offline = args.offline
+    if args.signatures:
+        try:
+            analyzer.extra_signatures = load_signatures(args.signatures)
+        except (OSError, ValueError) as e:
+            print(f"Error: can't load signatures from {args.signatures}: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    if args.watch:
+        watch(analyzer, args)
+        return
+    
+    # Load the model while we collect, so the first request doesn't pay for it
+    if not args.no_llm and not args.no_warmup and not args.offline:
+        analyzer.start_warmup(args.model)
     
-    # Get system info (will use mock data if /proc unavailable)
-    mem_data = analyzer.get_system_memory()
+    # Get system info and processes (will use mock data if /proc or ps unavailable)
+    mem_data, processes = analyzer.sample()
     
     if not mem_data:
         print("Error: Could not read system memory information", file=sys.stderr)
@@ -453,29 +5394,76 @@ def main():
         print("  wamr --demo", file=sys.stderr)
         sys.exit(1)
     
-    # Get processes (will use mock data if ps unavailable)
-    processes = analyzer.get_processes()
-    
     if not processes:
         print("Error: Could not read process information", file=sys.stderr)
         print("\nTry running with --demo flag to see example output:", file=sys.stderr)
         print("  wamr --demo", file=sys.stderr)
         sys.exit(1)
     
+    if args.cgroups:
+        analyzer.get_cgroups()
+    if args.mappings:
+        analyzer.get_mappings(args.mappings)
+    if args.kernel:
+        analyzer.get_kernel_memory()
+    if args.shared:
+        analyzer.get_shared(args.shared)
+    
+    if args.snapshot:
+        import json
+        snapshot = json.dumps(analyzer.to_snapshot(mem_data), indent=2)
+        if args.snapshot == '-':
+            print(snapshot)
+            return
+        with open(args.snapshot, 'w') as f:
+            f.write(snapshot + '\n')
+    
     # No LLM mode - just show top processes
     if args.no_llm:
-        print(f"\nMemory: {mem_data['used_mb']:.1f}/{mem_data['total_mb']:.1f} MB ({mem_data['used_percent']:.1f}%)\n")
-        print(f"{'PID':<8} {'USER':<12} {'MEMORY':<12} {'COMMAND'}")
-        print("-" * 70)
-        for proc in processes[:15]:
-            print(f"{proc.pid:<8} {proc.user:<12} {format_bytes(proc.rss_mb):<12} {proc.cmd[:40]}")
-        print()
+        if args.view == 'app':
+            print_app_table(mem_data, analyzer.get_applications(), analyzer.process_rss_total_mb)
+        else:
+            print_process_table(mem_data, processes, args.accounting)
+        if analyzer.cgroups:
+            print_cgroups([asdict(cg) for cg in analyzer.cgroups])
+            print()
+        if analyzer.mappings:
+            print_mappings([asdict(m) for m in analyzer.mappings])
+            print()
+        if analyzer.shared:
+            print_shared([asdict(obj) for obj in analyzer.shared], analyzer.shared_costs)
+            print()
+        if analyzer.kernel:
+            print_kernel(asdict(analyzer.kernel))
+            print()
+        if args.profile:
+            print_profile(analyzer.profiler)
         return
     
-    # Analyze with LLM
-    print("🤖 Analyzing memory usage with LLM...", end='', flush=True)
-    analysis = analyzer.analyze_with_llm(model=args.model)
-    print(" Done!\n")
+    # Analyze with LLM, rendering parts as they arrive when streaming
+    renderer = None
+    if args.offline:
+        if not args.json:
+            print("🔎 Classifying known processes locally (offline)...\n", flush=True)
+        analysis = analyzer.analyze_with_llm(model=args.model, mem_data=mem_data, processes=processes)
+    elif args.stream and not args.json:
+        print("🤖 Analyzing memory usage with LLM (streaming)...", flush=True)
+        renderer = StreamingRenderer(mem_data)
+        renderer.start()
+        analysis = analyzer.analyze_with_llm(
+            model=args.model, mem_data=mem_data, processes=processes, on_event=renderer.on_event
+        )
+    else:
+        print("🤖 Analyzing memory usage with LLM...", end='', flush=True)
+        analysis = analyzer.analyze_with_llm(model=args.model, mem_data=mem_data, processes=processes)
+        if analyzer.last_local_only:
+            print(" Done! (all known, LLM not needed)\n")
+        elif analyzer.last_delta:
+            print(" Done! (changes only)\n")
+        elif args.deadline is not None and not analyzer.last_cache_hit:
+            print(f" Done! ({analyzer.last_model or 'local heuristics'})\n")
+        else:
+            print(" Done! (cached)\n" if analyzer.last_cache_hit else " Done!\n")
     
     if not analysis:
         print("Error: LLM analysis failed. Try --no-llm flag to see raw data.", file=sys.stderr)
@@ -487,9 +5475,22 @@ def main():
     
     # Output
     if args.json:
+        import json
+        if args.profile:
+            analysis['profile'] = analyzer.profiler.to_dict()
         print(json.dumps(analysis, indent=2))
+    elif renderer is not None:
+        with analyzer.profiler.stage('render'):
+            renderer.finish(analysis)
+        total = time.monotonic() - renderer.started
+        first = renderer.first_output_s if renderer.first_output_s is not None else total
+        print(f"⏱️  First output after {first:.2f}s, full analysis after {total:.2f}s", file=sys.stderr)
     else:
-        print_analysis(analysis, mem_data)
+        with analyzer.profiler.stage('render'):
+            print_analysis(analysis, mem_data)
+    
+    if args.profile:
+        print_profile(analyzer.profiler)
 
 
 if __name__ == '__main__':